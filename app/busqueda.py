@@ -0,0 +1,162 @@
+# /app/busqueda.py
+# Búsqueda de texto completo (y por facetas) en el catálogo de vacantes abiertas.
+# - vacantes.busqueda (tsvector) se mantiene desde la app: título (peso A), razón social
+#   de la empresa (B) y descripción (C), con la configuración 'sip_es' (español sin tildes).
+# - Si la búsqueda de texto no encuentra nada, se intenta por similitud de trigramas
+#   (tolera errores de digitación: "desarollo" -> "desarrollo").
+from typing import Optional
+
+from sqlalchemy import DDL, Float, event, func, inspect, literal, literal_column, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+from .crud import CARGA_EMPRESA
+from .database import Base
+from .pagination import Pagina, paginar, paginar_resultados
+
+CONFIG_BUSQUEDA = literal_column("'sip_es'::regconfig")
+LIMITE_POR_DEFECTO = 20  # Resultados por página si no se envía 'limit'
+MAX_FACETAS = 50
+MODO_TEXTO = "texto"
+MODO_APROXIMADO = "aproximado"
+
+
+# --- DDL: extensiones y configuración de texto (antes de crear las tablas) ---
+
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS unaccent"))
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+event.listen(Base.metadata, "before_create", DDL("""
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'sip_es') THEN
+        CREATE TEXT SEARCH CONFIGURATION sip_es (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION sip_es
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END
+$$
+"""))
+
+
+# --- Mantenimiento de vacantes.busqueda ---
+
+def _vector(columna, peso: str):
+    return func.setweight(func.to_tsvector(CONFIG_BUSQUEDA, func.coalesce(columna, "")), peso)
+
+def sql_actualizar_busqueda(*condiciones):
+    """UPDATE que recalcula el tsvector de las vacantes que cumplan las condiciones."""
+    vector = _vector(models.Vacante.titulo_vacante, "A")\
+        .op("||")(_vector(models.Empresa.razon_social, "B"))\
+        .op("||")(_vector(models.Vacante.descripcion_funciones, "C"))
+    return update(models.Vacante)\
+        .values(busqueda=vector)\
+        .where(models.Vacante.id_empresa == models.Empresa.id_empresa, *condiciones)\
+        .execution_options(synchronize_session=False)
+
+def _cambio(target, *atributos) -> bool:
+    estado = inspect(target)
+    return any(estado.attrs[a].history.has_changes() for a in atributos)
+
+@event.listens_for(models.Vacante, "after_insert")
+def _indexar_vacante_nueva(mapper, connection, target):
+    connection.execute(sql_actualizar_busqueda(models.Vacante.id_vacante == target.id_vacante))
+
+@event.listens_for(models.Vacante, "after_update")
+def _reindexar_vacante(mapper, connection, target):
+    if _cambio(target, "titulo_vacante", "descripcion_funciones", "id_empresa"):
+        connection.execute(sql_actualizar_busqueda(models.Vacante.id_vacante == target.id_vacante))
+
+@event.listens_for(models.Empresa, "after_update")
+def _reindexar_vacantes_de_empresa(mapper, connection, target):
+    if _cambio(target, "razon_social"):
+        connection.execute(sql_actualizar_busqueda(models.Vacante.id_empresa == target.id_empresa))
+
+def indexar_vacantes_pendientes(db) -> None:
+    """Calcula el tsvector de las vacantes que aún no lo tienen (ej. creadas antes de esta versión)."""
+    db.execute(sql_actualizar_busqueda(models.Vacante.busqueda.is_(None)))
+    db.commit()
+
+
+# --- Búsqueda ---
+
+def _criterio(q: str, modo: str):
+    """Condición de búsqueda y relevancia (de mayor a menor) para cada modo."""
+    if modo == MODO_TEXTO:
+        consulta = func.websearch_to_tsquery(CONFIG_BUSQUEDA, q)
+        return (
+            models.Vacante.busqueda.op("@@")(consulta),
+            func.ts_rank_cd(models.Vacante.busqueda, consulta, type_=Float),
+        )
+    # Trigramas ('<%' usa los índices gin_trgm_ops de título y razón social)
+    return (
+        or_(
+            literal(q).op("<%")(models.Vacante.titulo_vacante),
+            literal(q).op("<%")(models.Empresa.razon_social),
+        ),
+        func.greatest(
+            func.word_similarity(q, models.Vacante.titulo_vacante),
+            func.word_similarity(q, models.Empresa.razon_social),
+            type_=Float,
+        ),
+    )
+
+def _select_facetas(condicion):
+    """
+    Cuántas vacantes coinciden por empresa (sin aplicar el filtro de empresa),
+    y el total de coincidencias (ventana sobre los grupos, sin otra consulta).
+    """
+    total = func.count(models.Vacante.id_vacante)
+    return select(
+        models.Empresa.id_empresa,
+        models.Empresa.razon_social,
+        total.label("total"),
+        func.sum(total).over().label("total_general")
+    )\
+        .join(models.Empresa.vacantes)\
+        .filter(models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value, condicion)\
+        .group_by(models.Empresa.id_empresa, models.Empresa.razon_social)\
+        .order_by(total.desc(), models.Empresa.razon_social)\
+        .limit(MAX_FACETAS)
+
+async def buscar_vacantes(
+    db: AsyncSession,
+    q: str,
+    pagina: Pagina,
+    id_empresa: Optional[int] = None
+) -> schemas.BusquedaVacantesResponse:
+    """
+    [ESTUDIANTE] Busca en las vacantes abiertas: resultados ordenados por relevancia
+    y paginados (cursor), más el conteo por empresa (facetas).
+    El modo (texto o aproximado) depende solo de 'q', así que es el mismo en todas las páginas.
+    Si el texto completo no encuentra nada, las facetas se consultan dos veces (texto y
+    luego aproximado) a propósito: la primera ES la verificación de que hay coincidencias.
+    Sin coincidencias, el índice GIN de 'busqueda' no devuelve filas y no hay nada que
+    agrupar (cuesta lo mismo que un EXISTS); con coincidencias, ahorra esa consulta extra.
+    """
+    modo = MODO_TEXTO
+    condicion, relevancia = _criterio(q, modo)
+    facetas = (await db.execute(_select_facetas(condicion))).all()
+    if not facetas: # Ninguna coincidencia de texto completo: se busca por trigramas
+        modo = MODO_APROXIMADO
+        condicion, relevancia = _criterio(q, modo)
+        facetas = (await db.execute(_select_facetas(condicion))).all()
+
+    relevancia = relevancia.label("relevancia")
+    orden = (relevancia, models.Vacante.id_vacante)
+    stmt = select(models.Vacante, relevancia, models.Vacante.id_vacante.label("id_vacante"))\
+        .join(models.Vacante.empresa)\
+        .options(CARGA_EMPRESA)\
+        .filter(models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value, condicion)
+    if id_empresa is not None:
+        stmt = stmt.filter(models.Vacante.id_empresa == id_empresa)
+    if pagina.limit is None:
+        pagina.limit = LIMITE_POR_DEFECTO
+    stmt = paginar(stmt, orden, pagina, descendente=True)
+    filas = paginar_resultados((await db.execute(stmt)).all(), orden, pagina)
+
+    return schemas.BusquedaVacantesResponse(
+        modo=modo,
+        total=facetas[0].total_general if facetas else 0,
+        resultados=[{"vacante": f.Vacante, "relevancia": f.relevancia} for f in filas],
+        facetas_empresa=facetas,
+    )
@@ -0,0 +1,112 @@
+# /app/catalogos.py
+# Caché de lectura para los catálogos de referencia (programas, empresas).
+# Los pide cada formulario del admin y cambian pocas veces por semestre:
+# - La primera petición carga el catálogo de la BD y lo guarda YA serializado (bytes JSON),
+#   con un ETag calculado de su contenido. Las siguientes no tocan la BD ni Pydantic.
+# - Si el cliente envía 'If-None-Match' con ese ETag, se responde 304 sin cuerpo.
+# - Quien modifica un catálogo lo invalida después del commit, en este worker y en los
+#   demás (llaves 'catalogo:<nombre>', ver invalidacion.py).
+# - Cada catálogo además caduca a los SIP_CATALOGO_TTL segundos: si un aviso se perdió
+#   (ver invalidacion.py), un worker no queda con datos viejos para siempre.
+# - El ETag depende solo del contenido: dos workers con el mismo catálogo dan la misma
+#   etiqueta, y uno desactualizado nunca responde 304 a una etiqueta más nueva.
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from . import concurrencia, crud, invalidacion, schemas
+
+PROGRAMAS = "catalogo:programas"
+EMPRESAS = "catalogo:empresas"
+CATALOGO_TTL = float(os.getenv("SIP_CATALOGO_TTL", "300")) # Edad máxima de un catálogo en caché (seg.)
+
+
+class Entrada:
+    """Un catálogo ya serializado."""
+
+    def __init__(self, contenido: bytes, etag: str, ids: set):
+        self.contenido = contenido
+        self.etag = etag
+        self.ids = ids
+        self.creada = time.monotonic()
+
+    def vigente(self, ttl: float) -> bool:
+        return time.monotonic() - self.creada <= ttl
+
+
+class Catalogo:
+    """Un catálogo de referencia cacheado en memoria (uno por worker). Seguro entre hilos."""
+
+    def __init__(self, llave: str, cargar: Callable[[Session], list], schema, campo_id: str, ttl: float = CATALOGO_TTL):
+        self.llave = llave
+        self.ttl = ttl
+        self._cargar = cargar
+        self._adaptador = TypeAdapter(List[schema])
+        self._campo_id = campo_id
+        self._lock = threading.Lock()
+        self._entrada: Optional[Entrada] = None
+        self._generacion = 0 # Sube en cada invalidación
+
+    def obtener(self, db: Session) -> Entrada:
+        """El catálogo en caché o, si no está (o ya caducó), cargado de la BD."""
+        entrada = self._entrada
+        if entrada is not None and entrada.vigente(self.ttl):
+            return entrada
+
+        with self._lock:
+            generacion = self._generacion
+        items = self._adaptador.validate_python(self._cargar(db), from_attributes=True)
+        contenido = self._adaptador.dump_json(items)
+        etag = f'"{self.llave.split(":")[1]}-{hashlib.blake2b(contenido, digest_size=8).hexdigest()}"'
+        entrada = Entrada(contenido, etag, {getattr(item, self._campo_id) for item in items})
+        with self._lock:
+            # Si lo invalidaron mientras se cargaba, lo leído puede ser anterior al cambio
+            if self._generacion == generacion:
+                self._entrada = entrada
+        return entrada
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._generacion += 1
+            self._entrada = None
+
+
+programas = Catalogo(PROGRAMAS, crud.get_programas, schemas.ProgramaAcademicoResponse, "id_programa")
+empresas = Catalogo(EMPRESAS, crud.get_empresas, schemas.EmpresaResponse, "id_empresa")
+CATALOGOS = {c.llave: c for c in (programas, empresas)}
+
+
+def invalidar(llave: str) -> None:
+    """Después del commit que modificó el catálogo (en todos los workers)."""
+    invalidacion.invalidar(llave)
+
+def _borrar(llave: str) -> None:
+    if llave.endswith("*"):
+        vaciar()
+    elif llave in CATALOGOS:
+        CATALOGOS[llave].invalidar()
+
+def vaciar() -> None:
+    for catalogo in CATALOGOS.values():
+        catalogo.invalidar()
+
+invalidacion.registrar("catalogo", _borrar, vaciar)
+
+
+def responder(catalogo: Catalogo, db: Session, if_none_match: Optional[str]) -> Response:
+    """El catálogo como respuesta JSON, o 304 si el cliente ya tiene esta versión."""
+    entrada = catalogo.obtener(db)
+    headers = {"ETag": entrada.etag, "Cache-Control": "no-cache"} # El navegador guarda, pero siempre revalida
+    if concurrencia.no_modificado(if_none_match, entrada.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entrada.contenido, media_type="application/json", headers=headers)
+
+def existe_programa(db: Session, programa_id: int) -> bool:
+    """Desde la caché; un id que no está se busca en la BD (pudo crearse hace un instante en otro worker)."""
+    return programa_id in programas.obtener(db).ids or crud.get_programa_by_id(db, programa_id) is not None
@@ -0,0 +1,68 @@
+# /app/concurrencia.py
+# Control de concurrencia optimista para Postulacion y Vacante.
+# - Cada fila tiene una columna 'version' que sube en cada cambio (version_id_col en el ORM;
+#   las sentencias de Core, como las de transiciones.py, la suben explícitamente).
+# - Las respuestas llevan 'ETag: "<version>"'. Si el cliente envía 'If-Match' con esa etiqueta,
+#   el cambio solo se aplica si nadie modificó la fila entretanto; si no, responde 412.
+# - Sin If-Match, dos escrituras que se cruzan sobre la misma fila ya no se pisan en silencio:
+#   el UPDATE del ORM incluye 'WHERE version = :leida' y el perdedor recibe 409.
+# - En los GET, 'If-None-Match' con la etiqueta vigente responde 304 (ver no_modificado).
+# Nada de esto bloquea filas durante la petición.
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
+
+DETALLE_CONFLICTO = "El recurso fue modificado por otra petición. Vuelva a cargarlo e intente de nuevo."
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+def set_etag(response: Response, version: int) -> None:
+    response.headers["ETag"] = etag(version)
+
+def version_esperada(if_match: Optional[str] = Header(None, alias="If-Match")) -> Optional[int]:
+    """
+    Dependencia: la versión que el cliente espera modificar, según 'If-Match'.
+    Sin header (o con '*') no hay condición. Una etiqueta que no es nuestra nunca coincide: 412.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    etiqueta = if_match.split(",")[0].strip()
+    if etiqueta.startswith("W/"):
+        etiqueta = etiqueta[2:]
+    etiqueta = etiqueta.strip('"')
+    if not etiqueta.isdigit():
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="La etiqueta de If-Match no es válida.")
+    return int(etiqueta)
+
+def copia_cliente(if_none_match: Optional[str] = Header(None, alias="If-None-Match")) -> Optional[str]:
+    """Dependencia: las etiquetas de las copias que el cliente ya tiene ('If-None-Match')."""
+    return if_none_match
+
+def no_modificado(if_none_match: Optional[str], etiqueta: str) -> bool:
+    """
+    Si la copia del cliente ('If-None-Match') sigue vigente: se puede responder 304.
+    La comparación es débil (ignora 'W/'), como pide HTTP para If-None-Match.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etiqueta = etiqueta.removeprefix("W/")
+    return any(e.strip().removeprefix("W/") == etiqueta for e in if_none_match.split(","))
+
+def verificar_version(version_actual: int, esperada: Optional[int]) -> None:
+    """412 si el cliente envió If-Match y la fila ya no está en esa versión."""
+    if esperada is not None and version_actual != esperada:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"El recurso cambió desde que se consultó (versión actual {version_actual}). Vuelva a cargarlo.",
+            headers={"ETag": etag(version_actual)}
+        )
+
+async def conflicto_handler(request: Request, exc: StaleDataError) -> JSONResponse:
+    """El UPDATE versionado del ORM no encontró la fila en la versión leída: otro la cambió primero."""
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": DETALLE_CONFLICTO})
@@ -1,6 +1,10 @@
-from sqlalchemy.orm import Session, joinedload
-from typing import List
-from . import models, schemas, security
+from sqlalchemy import select, literal, func, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, defer, selectinload
+from typing import List, Optional
+from . import eventos, invalidacion, models, schemas, security, serializacion
+from .cache import TTLCache
+from .pagination import Pagina, paginar, paginar_resultados
 
 # --- FUNCIONES DE BÚSQUEDA DE USUARIOS (Para Login) ---
 
@@ -13,6 +17,59 @@ def get_student_by_email(db: Session, email: str) -> models.Estudiante | None:
 def get_empresa_by_email(db: Session, email: str) -> models.Empresa | None:
     return db.query(models.Empresa).filter(models.Empresa.email_contacto == email).first()
 
+# --- ÍNDICE UNIFICADO DE IDENTIDADES (Para Login) ---
+
+def _get_email(user: models.UsuarioUniversidad | models.Estudiante | models.Empresa) -> str:
+    if isinstance(user, models.Estudiante):
+        return user.email_institucional
+    if isinstance(user, models.Empresa):
+        return user.email_contacto
+    return user.email
+
+def get_identidad_by_email(db: Session, email: str) -> models.IdentidadUsuario | None:
+    """Un solo lookup (por llave primaria) para saber rol, id y hash de un email."""
+    return db.get(models.IdentidadUsuario, email.lower())
+
+def valores_identidad(user: models.UsuarioUniversidad | models.Estudiante | models.Empresa) -> dict:
+    """Las columnas de IdentidadUsuario para un usuario."""
+    return {
+        "email": _get_email(user).lower(),
+        "rol": security.get_principal_role(user),
+        "id_usuario": security.get_principal_id(user),
+        "hashed_password": user.hashed_password,
+    }
+
+def add_identidad(db: Session, user: models.UsuarioUniversidad | models.Estudiante | models.Empresa) -> None:
+    """
+    Agrega al índice la identidad de un usuario recién creado.
+    Se hace en la misma transacción que el usuario (el flush nos da su id).
+    """
+    db.flush()
+    db.add(models.IdentidadUsuario(**valores_identidad(user)))
+
+# (rol, email, id, hash) de cada tabla de usuarios, en la prioridad del login antiguo
+FUENTES_IDENTIDAD = [
+    ("admin", models.UsuarioUniversidad.email, models.UsuarioUniversidad.id_usuario, models.UsuarioUniversidad.hashed_password),
+    ("estudiante", models.Estudiante.email_institucional, models.Estudiante.id_estudiante, models.Estudiante.hashed_password),
+    ("empresa", models.Empresa.email_contacto, models.Empresa.id_empresa, models.Empresa.hashed_password),
+]
+
+def sincronizar_identidades(db: Session) -> None:
+    """
+    Llena el índice con los usuarios existentes que aún no estén en él.
+    Respeta la prioridad del login antiguo: admin, luego estudiante, luego empresa.
+    """
+    for rol, email_col, id_col, hash_col in FUENTES_IDENTIDAD:
+        db.execute(
+            insert(models.IdentidadUsuario)
+            .from_select(
+                ["email", "rol", "id_usuario", "hashed_password"],
+                select(func.lower(email_col), literal(rol), id_col, hash_col)
+            )
+            .on_conflict_do_nothing()
+        )
+    db.commit()
+
 # --- FUNCIONES DE BÚSQUEDA POR ID ---
 
 def get_programa_by_id(db: Session, programa_id: int) -> models.ProgramaAcademico | None:
@@ -37,6 +94,7 @@ def create_usuario_universidad(db: Session, user: schemas.UsuarioUniversidadCrea
         hashed_password=hashed_pass
     )
     db.add(db_user)
+    add_identidad(db, db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -51,8 +109,10 @@ def create_estudiante(db: Session, student: schemas.EstudianteCreate) -> models.
         hashed_password=hashed_pass
     )
     db.add(db_student)
+    add_identidad(db, db_student)
     db.commit()
     db.refresh(db_student)
+    invalidar_stats_admin()
     return db_student
 
 def create_empresa(db: Session, empresa: schemas.EmpresaCreate) -> models.Empresa:
@@ -65,8 +125,10 @@ def create_empresa(db: Session, empresa: schemas.EmpresaCreate) -> models.Empres
         hashed_password=hashed_pass
     )
     db.add(db_empresa)
+    add_identidad(db, db_empresa)
     db.commit()
     db.refresh(db_empresa)
+    invalidar_stats_admin()
     return db_empresa
 
 def create_vacante(db: Session, vacante: schemas.VacanteBase, empresa_id: int) -> models.Vacante:
@@ -80,109 +142,150 @@ def create_vacante(db: Session, vacante: schemas.VacanteBase, empresa_id: int) -
     db.add(db_vacante)
     db.commit()
     db.refresh(db_vacante)
+    invalidar_stats_admin()
     return db_vacante
 
-def create_postulacion(db: Session, estudiante_id: int, vacante_id: int) -> models.Postulacion:
-    """Crea postulación en estado 'Recibida' por defecto."""
-    db_postulacion = models.Postulacion(
-        id_estudiante=estudiante_id,
-        id_vacante=vacante_id,
-        estado_actual=models.EstadoPostulacionEnum.Recibida.value
-    )
-    db.add(db_postulacion)
+def create_postulacion(db: Session, estudiante_id: int, vacante_id: int) -> models.Postulacion | None:
+    """
+    Crea postulación en estado 'Recibida' por defecto.
+    Es un solo INSERT ... ON CONFLICT DO NOTHING RETURNING: si el estudiante ya
+    estaba postulado (restricción única), no inserta nada y retorna None.
+    """
+    db_postulacion = db.scalars(
+        insert(models.Postulacion)
+        .values(
+            id_estudiante=estudiante_id,
+            id_vacante=vacante_id,
+            estado_actual=models.EstadoPostulacionEnum.Recibida
+        )
+        .on_conflict_do_nothing(index_elements=["id_estudiante", "id_vacante"])
+        .returning(models.Postulacion)
+    ).first()
     db.commit()
-    db.refresh(db_postulacion)
+    if db_postulacion is not None:
+        invalidar_stats_estudiante(estudiante_id)
     return db_postulacion
 
 # --- LÓGICA DE NEGOCIO (GETTERS PARA DASHBOARDS) ---
 
+# Llaves de orden para la paginación por cursor (la última siempre es la llave primaria)
+ORDEN_POSTULACIONES = (models.Postulacion.fecha_postulacion, models.Postulacion.id_postulacion)
+ORDEN_VACANTES = (models.Vacante.fecha_publicacion, models.Vacante.id_vacante)
+ORDEN_ESTUDIANTES = (models.Estudiante.apellido, models.Estudiante.id_estudiante)
+ORDEN_EMPRESAS = (models.Empresa.razon_social, models.Empresa.id_empresa)
+
+# Prácticas que ve el admin en el seguimiento (activas o con proceso terminado)
+ESTADOS_PRACTICAS_FINALIZADAS = [
+    models.EstadoPostulacionEnum.Aprobada.value,
+    models.EstadoPostulacionEnum.Rechazada_por_Empresa.value,
+    models.EstadoPostulacionEnum.Rechazada_por_Universidad.value
+]
+
+# --- ESTRATEGIAS DE CARGA PARA LISTAS ---
+# Los "padres" (empresa, programa, vacante, estudiante) se cargan con selectinload: un
+# SELECT extra por relación, con los ids distintos, en vez de un JOIN que repite todas sus
+# columnas (ej. la descripción de la vacante) en cada fila. Así el número de consultas
+# es fijo sin importar cuántas filas haya. hashed_password nunca se carga en las listas.
+CARGA_EMPRESA = selectinload(models.Vacante.empresa).options(defer(models.Empresa.hashed_password))
+CARGA_PROGRAMA = selectinload(models.Estudiante.programa)
+CARGA_POSTULACION = (
+    selectinload(models.Postulacion.estudiante)
+        .options(defer(models.Estudiante.hashed_password), CARGA_PROGRAMA), # Estudiante -> Programa
+    selectinload(models.Postulacion.vacante)
+        .options(CARGA_EMPRESA),                                              # Vacante -> Empresa
+)
+CARGA_ACTORES_HISTORIAL = (
+    selectinload(models.HistorialEstadoPostulacion.usuario_universidad)
+        .options(defer(models.UsuarioUniversidad.hashed_password)),
+    selectinload(models.HistorialEstadoPostulacion.empresa)
+        .options(defer(models.Empresa.hashed_password)),
+    selectinload(models.HistorialEstadoPostulacion.estudiante)
+        .options(defer(models.Estudiante.hashed_password), CARGA_PROGRAMA),
+)
+
 # --- Funciones para ADMIN ---
 
-def get_vacantes_por_estado(db: Session, estado: models.EstadoVacanteEnum) -> List[models.Vacante]:
+def get_vacantes_por_estado(db: Session, estado: models.EstadoVacanteEnum, pagina: Optional[Pagina] = None) -> List[models.Vacante]:
     """[ADMIN] Obtiene vacantes por estado, cargando info de la empresa."""
-    return db.query(models.Vacante)\
-        .options(joinedload(models.Vacante.empresa))\
-        .filter(models.Vacante.estado == estado.value)\
-        .all()
+    query = db.query(models.Vacante)\
+        .options(CARGA_EMPRESA)\
+        .filter(models.Vacante.estado == estado.value)
+    query = paginar(query, ORDEN_VACANTES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_VACANTES, pagina)
 
-def get_postulaciones_por_estado(db: Session, estado: models.EstadoPostulacionEnum) -> List[models.Postulacion]:
+def get_postulaciones_por_estado(db: Session, estado: models.EstadoPostulacionEnum, pagina: Optional[Pagina] = None) -> List[models.Postulacion]:
     """[ADMIN] Obtiene postulaciones por estado, cargando info de estudiante y vacante."""
-    return db.query(models.Postulacion)\
-        .options(
-            joinedload(models.Postulacion.estudiante)
-                .joinedload(models.Estudiante.programa), # Estudiante -> Programa
-            joinedload(models.Postulacion.vacante)
-                .joinedload(models.Vacante.empresa)     # Vacante -> Empresa
-        )\
-        .filter(models.Postulacion.estado_actual == estado.value)\
-        .all()
+    query = db.query(models.Postulacion)\
+        .options(*CARGA_POSTULACION)\
+        .filter(models.Postulacion.estado_actual == estado.value)
+    query = paginar(query, ORDEN_POSTULACIONES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_POSTULACIONES, pagina)
 
 # --- Funciones para EMPRESA ---
 
-def get_vacantes_por_empresa(db: Session, empresa_id: int) -> List[models.Vacante]:
+def get_vacantes_por_empresa(db: Session, empresa_id: int, pagina: Optional[Pagina] = None) -> List[models.Vacante]:
     """[EMPRESA] Obtiene todas las vacantes de una empresa."""
-    return db.query(models.Vacante)\
-        .filter(models.Vacante.id_empresa == empresa_id)\
-        .order_by(models.Vacante.fecha_publicacion.desc())\
-        .all()
+    query = db.query(models.Vacante)\
+        .filter(models.Vacante.id_empresa == empresa_id)
+    query = paginar(query, ORDEN_VACANTES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_VACANTES, pagina)
 
-def get_postulaciones_por_empresa(db: Session, empresa_id: int) -> List[models.Postulacion]:
+def get_postulaciones_por_empresa(db: Session, empresa_id: int, pagina: Optional[Pagina] = None) -> List[models.Postulacion]:
     """[EMPRESA] Obtiene todas las postulaciones de una empresa, cargando info de estudiante."""
-    return db.query(models.Postulacion)\
+    query = db.query(models.Postulacion)\
         .join(models.Vacante)\
         .filter(models.Vacante.id_empresa == empresa_id)\
-        .options(
-            joinedload(models.Postulacion.estudiante), # Carga el Estudiante
-            joinedload(models.Postulacion.vacante)    # Carga la Vacante (para el título)
-        )\
-        .order_by(models.Postulacion.fecha_postulacion.desc())\
-        .all()
+        .options(*CARGA_POSTULACION)
+    query = paginar(query, ORDEN_POSTULACIONES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_POSTULACIONES, pagina)
+
+def get_postulaciones_por_empresa_filas(db: Session, empresa_id: int, pagina: Optional[Pagina] = None) -> List[dict]:
+    """[EMPRESA] Igual que get_postulaciones_por_empresa(), pero como dicts (camino rápido)."""
+    stmt = serializacion.select_postulaciones_filas()\
+        .filter(models.Vacante.id_empresa == empresa_id)
+    stmt = paginar(stmt, ORDEN_POSTULACIONES, pagina, descendente=True)
+    filas = paginar_resultados(db.execute(stmt).all(), ORDEN_POSTULACIONES, pagina)
+    return [serializacion.postulacion_a_dict(fila) for fila in filas]
 
 # --- Funciones para ESTUDIANTE ---
 
-def get_vacantes_disponibles(db: Session) -> List[models.Vacante]:
+def get_vacantes_disponibles(db: Session, pagina: Optional[Pagina] = None) -> List[models.Vacante]:
     """[ESTUDIANTE] Obtiene todas las vacantes 'Abiertas', cargando info de la empresa."""
-    return db.query(models.Vacante)\
-        .options(joinedload(models.Vacante.empresa))\
-        .filter(models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value)\
-        .all()
+    query = db.query(models.Vacante)\
+        .options(CARGA_EMPRESA)\
+        .filter(models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value)
+    query = paginar(query, ORDEN_VACANTES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_VACANTES, pagina)
 
-def get_postulacion_existente(db: Session, estudiante_id: int, vacante_id: int) -> models.Postulacion | None:
-    """[ESTUDIANTE] Verifica si un estudiante ya se postuló a una vacante."""
-    return db.query(models.Postulacion).filter(
-        models.Postulacion.id_estudiante == estudiante_id,
-        models.Postulacion.id_vacante == vacante_id
-    ).first()
-
-def get_postulaciones_por_estudiante(db: Session, estudiante_id: int) -> List[models.Postulacion]:
+def get_postulaciones_por_estudiante(db: Session, estudiante_id: int, pagina: Optional[Pagina] = None) -> List[models.Postulacion]:
     """[ESTUDIANTE] Obtiene el historial de postulaciones, cargando info de la vacante."""
-    return db.query(models.Postulacion)\
-        .options(
-            joinedload(models.Postulacion.vacante)
-                .joinedload(models.Vacante.empresa) # Vacante -> Empresa
-        )\
-        .filter(models.Postulacion.id_estudiante == estudiante_id)\
-        .order_by(models.Postulacion.fecha_postulacion.desc())\
-        .all()
+    query = db.query(models.Postulacion)\
+        .options(*CARGA_POSTULACION)\
+        .filter(models.Postulacion.id_estudiante == estudiante_id)
+    query = paginar(query, ORDEN_POSTULACIONES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_POSTULACIONES, pagina)
 
 # Listar las empresas en el panel admin
 
-def get_empresas(db: Session) -> List[models.Empresa]:
+def get_empresas(db: Session, pagina: Optional[Pagina] = None) -> List[models.Empresa]:
     """
     [ADMIN] Obtiene una lista de todas las empresas registradas.
     """
-    return db.query(models.Empresa).order_by(models.Empresa.razon_social).all()
+    query = db.query(models.Empresa)\
+        .options(defer(models.Empresa.hashed_password))
+    query = paginar(query, ORDEN_EMPRESAS, pagina)
+    return paginar_resultados(query.all(), ORDEN_EMPRESAS, pagina)
 
 # funcion para activar e inactivar estudiantes
-def get_estudiantes(db: Session) -> List[models.Estudiante]:
+def get_estudiantes(db: Session, pagina: Optional[Pagina] = None) -> List[models.Estudiante]:
     """
     [ADMIN] Obtiene una lista de todos los estudiantes registrados.
     Carga la información de su programa.
     """
-    return db.query(models.Estudiante)\
-        .options(joinedload(models.Estudiante.programa))\
-        .order_by(models.Estudiante.apellido)\
-        .all()
+    query = db.query(models.Estudiante)\
+        .options(defer(models.Estudiante.hashed_password), CARGA_PROGRAMA)
+    query = paginar(query, ORDEN_ESTUDIANTES, pagina)
+    return paginar_resultados(query.all(), ORDEN_ESTUDIANTES, pagina)
 
 # listar los programas
 
@@ -194,29 +297,29 @@ def get_programas(db: Session) -> List[models.ProgramaAcademico]:
 
 # traer practicas activas y finalizadas
 
-def get_practicas_activas_y_finalizadas(db: Session) -> List[models.Postulacion]:
+def get_practicas_activas_y_finalizadas(db: Session, pagina: Optional[Pagina] = None) -> List[models.Postulacion]:
     """
     [ADMIN] Obtiene una lista de todas las prácticas Aprobadas o Cubiertas.
     Carga toda la información anidada para seguimiento.
     """
-    estados_finalizados = [
-        models.EstadoPostulacionEnum.Aprobada.value,
-        models.EstadoPostulacionEnum.Rechazada_por_Empresa.value,
-        models.EstadoPostulacionEnum.Rechazada_por_Universidad.value
-    ]
-
-    return db.query(models.Postulacion)\
-        .options(
-            joinedload(models.Postulacion.estudiante)
-                .joinedload(models.Estudiante.programa),
-            joinedload(models.Postulacion.vacante)
-                .joinedload(models.Vacante.empresa)
-        )\
+    query = db.query(models.Postulacion)\
+        .options(*CARGA_POSTULACION)\
         .filter(
-            models.Postulacion.estado_actual.in_(estados_finalizados)
-        )\
-        .order_by(models.Postulacion.fecha_postulacion.desc())\
-        .all()
+            models.Postulacion.estado_actual.in_(ESTADOS_PRACTICAS_FINALIZADAS)
+        )
+    query = paginar(query, ORDEN_POSTULACIONES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_POSTULACIONES, pagina)
+
+def get_practicas_activas_y_finalizadas_filas(db: Session, pagina: Optional[Pagina] = None) -> List[dict]:
+    """
+    [ADMIN] Igual que get_practicas_activas_y_finalizadas(), pero como dicts listos
+    para codificar (camino rápido, sin entidades ORM ni validación por fila).
+    """
+    stmt = serializacion.select_postulaciones_filas()\
+        .filter(models.Postulacion.estado_actual.in_(ESTADOS_PRACTICAS_FINALIZADAS))
+    stmt = paginar(stmt, ORDEN_POSTULACIONES, pagina, descendente=True)
+    filas = paginar_resultados(db.execute(stmt).all(), ORDEN_POSTULACIONES, pagina)
+    return [serializacion.postulacion_a_dict(fila) for fila in filas]
 
 # para traer los comentarios por postulacion
 
@@ -226,11 +329,7 @@ def get_historial_por_postulacion(db: Session, postulacion_id: int) -> List[mode
     la info del actor (admin, empresa, o estudiante) que hizo el cambio.
     """
     return db.query(models.HistorialEstadoPostulacion)\
-        .options(
-            joinedload(models.HistorialEstadoPostulacion.usuario_universidad),
-            joinedload(models.HistorialEstadoPostulacion.empresa),
-            joinedload(models.HistorialEstadoPostulacion.estudiante)
-        )\
+        .options(*CARGA_ACTORES_HISTORIAL)\
         .filter(models.HistorialEstadoPostulacion.id_postulacion == postulacion_id)\
         .order_by(models.HistorialEstadoPostulacion.fecha_cambio.asc())\
         .all()
@@ -267,13 +366,22 @@ def create_historial_comentario(
         **actor_data
     )
     db.add(historial_entry)
+    db.flush()
+    eventos.publicar(db, [eventos.evento(
+        eventos.COMENTARIO,
+        [eventos.destinatario("estudiante", postulacion.id_estudiante),
+         eventos.destinatario("empresa", postulacion.vacante.id_empresa),
+         eventos.destinatario("admin")],
+        id_postulacion=postulacion.id_postulacion, id_historial=historial_entry.id_historial
+    )])
     db.commit()
     db.refresh(historial_entry)
+    invalidar_stats_estudiante(postulacion.id_estudiante) # Mensajes nuevos
     return historial_entry
 
 # Seguimiento practicas por empresa.
 
-def get_practicas_finalizadas_por_empresa(db: Session, empresa_id: int) -> List[models.Postulacion]:
+def get_practicas_finalizadas_por_empresa(db: Session, empresa_id: int, pagina: Optional[Pagina] = None) -> List[models.Postulacion]:
     """
     [EMPRESA] Obtiene un historial de todas las prácticas Aprobadas,
     Canceladas o Rechazadas asociadas a sus vacantes.
@@ -285,56 +393,75 @@ def get_practicas_finalizadas_por_empresa(db: Session, empresa_id: int) -> List[
         models.EstadoPostulacionEnum.Rechazada_por_Universidad.value
     ]
 
-    return db.query(models.Postulacion)\
+    query = db.query(models.Postulacion)\
         .join(models.Vacante)\
         .filter(models.Vacante.id_empresa == empresa_id)\
         .filter(models.Postulacion.estado_actual.in_(estados_finalizados))\
-        .options(
-            joinedload(models.Postulacion.estudiante),
-            joinedload(models.Postulacion.vacante) # Ya no necesitamos cargar la empresa de nuevo
-        )\
-        .order_by(models.Postulacion.fecha_postulacion.desc())\
-        .all()
+        .options(*CARGA_POSTULACION)
+    query = paginar(query, ORDEN_POSTULACIONES, pagina, descendente=True)
+    return paginar_resultados(query.all(), ORDEN_POSTULACIONES, pagina)
 
 # estadisticas
 
+# Caché corta de KPIs: global para el admin ("stats:admin") y por estudiante ("stats:estudiante:<id>").
+# Los endpoints que cambian estados la invalidan explícitamente (ver invalidar_stats_*),
+# en este worker y en los demás (ver invalidacion.py).
+STATS_CACHE_TTL_SECONDS = 15
+stats_cache = TTLCache(maxsize=4096, ttl=STATS_CACHE_TTL_SECONDS)
+invalidacion.registrar_cache("stats", stats_cache)
+
+def invalidar_stats_admin() -> None:
+    invalidacion.invalidar("stats:admin")
+
+def invalidar_stats_estudiante(estudiante_id: Optional[int] = None) -> None:
+    """Invalida los KPIs de un estudiante, o los de TODOS si cambió el catálogo de vacantes abiertas."""
+    if estudiante_id is None:
+        invalidacion.invalidar("stats:estudiante:*")
+    else:
+        invalidacion.invalidar(f"stats:estudiante:{estudiante_id}")
+
+def _contar(model, *condiciones):
+    """Subconsulta escalar COUNT(*) (cada una usa el índice de su propia tabla)."""
+    return select(func.count()).select_from(model).filter(*condiciones).scalar_subquery()
+
+def admin_stats_query():
+    """Los KPIs del admin en UNA sola consulta (un solo viaje a la BD)."""
+    return select(
+        _contar(models.Vacante, models.Vacante.estado == models.EstadoVacanteEnum.En_Revision.value).label("vacantes_pendientes"),
+        _contar(models.Postulacion, models.Postulacion.estado_actual == models.EstadoPostulacionEnum.En_Revision_Universidad.value).label("postulaciones_pendientes"),
+        _contar(models.Estudiante, models.Estudiante.esta_activo == True).label("estudiantes_activos"),
+        _contar(models.Empresa, models.Empresa.esta_activo == True).label("empresas_activas"),
+    )
+
+def admin_stats_from_row(row) -> schemas.StatsAdminResponse:
+    return schemas.StatsAdminResponse(
+        # Prácticas por Aprobar (Suma de vacantes PENDIENTES + postulaciones PENDIENTES)
+        practicas_por_aprobar=row.vacantes_pendientes + row.postulaciones_pendientes,
+        estudiantes_activos=row.estudiantes_activos,
+        empresas_activas=row.empresas_activas
+    )
+
 def get_admin_stats(db: Session) -> schemas.StatsAdminResponse:
     """
     [ADMIN] Obtiene las estadísticas (KPIs) para el dashboard principal.
     """
-    # 1. Prácticas por Aprobar (Suma de vacantes PENDIENTES + postulaciones PENDIENTES)
-    vacantes_pendientes = db.query(models.Vacante)\
-        .filter(models.Vacante.estado == models.EstadoVacanteEnum.En_Revision.value)\
-        .count()
-
-    postulaciones_pendientes = db.query(models.Postulacion)\
-        .filter(models.Postulacion.estado_actual == models.EstadoPostulacionEnum.En_Revision_Universidad.value)\
-        .count()
-
-    practicas_por_aprobar = vacantes_pendientes + postulaciones_pendientes
-
-    # 2. Estudiantes Activos
-    estudiantes_activos = db.query(models.Estudiante)\
-        .filter(models.Estudiante.esta_activo == True)\
-        .count()
-
-    # 3. Empresas Activas (Verificadas)
-    empresas_activas = db.query(models.Empresa)\
-        .filter(models.Empresa.esta_activo == True)\
-        .count()
-
-    return schemas.StatsAdminResponse(
-        practicas_por_aprobar=practicas_por_aprobar,
-        estudiantes_activos=estudiantes_activos,
-        empresas_activas=empresas_activas
-    )
+    stats = stats_cache.get("stats:admin")
+    if stats is None:
+        stats = admin_stats_from_row(db.execute(admin_stats_query()).one())
+        stats_cache.set("stats:admin", stats)
+    return stats
 
 # estadisticas para estudiantes
 
 def get_estudiante_stats(db: Session, estudiante_id: int) -> schemas.StatsEstudianteResponse:
     """
     [ESTUDIANTE] Obtiene las estadísticas (KPIs) para el dashboard del estudiante.
+    Todo se calcula en UNA sola consulta.
     """
+    key = f"stats:estudiante:{estudiante_id}"
+    stats = stats_cache.get(key)
+    if stats is not None:
+        return stats
 
     # 1. Definir qué es una postulación "activa"
     estados_activos = [
@@ -344,35 +471,37 @@ def get_estudiante_stats(db: Session, estudiante_id: int) -> schemas.StatsEstudi
         models.EstadoPostulacionEnum.Aprobada.value
     ]
 
-    # 2. Contar postulaciones activas
-    postulaciones_activas = db.query(models.Postulacion)\
+    # 2. Mensajes sin leer: comentarios de otros (Admins/Empresas) en las postulaciones del
+    #    estudiante, posteriores a su marca de lectura (ver LecturaHistorial).
+    #    Por postulación es un conteo por rango en ix_historial_postulacion_id: cuesta O(sin leer).
+    lectura = models.LecturaHistorial
+    mensajes_nuevos = select(func.count())\
+        .select_from(models.HistorialEstadoPostulacion)\
+        .join(models.Postulacion, models.Postulacion.id_postulacion == models.HistorialEstadoPostulacion.id_postulacion)\
+        .outerjoin(lectura, and_(
+            lectura.id_postulacion == models.HistorialEstadoPostulacion.id_postulacion,
+            lectura.rol == "estudiante",
+            lectura.id_actor == estudiante_id
+        ))\
         .filter(models.Postulacion.id_estudiante == estudiante_id)\
-        .filter(models.Postulacion.estado_actual.in_(estados_activos))\
-        .count()
-
-    # 3. Contar vacantes disponibles (sin cambios)
-    vacantes_disponibles = db.query(models.Vacante)\
-        .filter(models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value)\
-        .count()
-
-    # --- ¡LÓGICA NUEVA PARA MENSAJES! ---
-
-    # 4. Obtener los IDs de todas las postulaciones del estudiante
-    postulaciones_del_estudiante_ids = db.query(models.Postulacion.id_postulacion)\
-        .filter(models.Postulacion.id_estudiante == estudiante_id)\
-        .subquery()
-
-    # 5. Contar comentarios en esas postulaciones que NO sean del estudiante
-    mensajes_nuevos = db.query(models.HistorialEstadoPostulacion)\
-        .filter(models.HistorialEstadoPostulacion.id_postulacion.in_(postulaciones_del_estudiante_ids))\
         .filter(models.HistorialEstadoPostulacion.id_actor_estudiante == None)\
-        .count()
-    # (Nota: En el futuro, podríamos hacer esto más complejo con un "visto/no visto",
-    # pero por ahora, esto cuenta todos los comentarios de seguimiento de Admins/Empresas)
-    # --- FIN DE LÓGICA NUEVA ---
-
-    return schemas.StatsEstudianteResponse(
-        postulaciones_activas=postulaciones_activas,
-        vacantes_disponibles=vacantes_disponibles,
-        mensajes_nuevos=mensajes_nuevos # <-- ¡Ahora es un número real!
-    )
\ No newline at end of file
+        .filter(models.HistorialEstadoPostulacion.id_historial > func.coalesce(lectura.id_ultimo_historial, 0))\
+        .scalar_subquery()
+
+    row = db.execute(select(
+        _contar(
+            models.Postulacion,
+            models.Postulacion.id_estudiante == estudiante_id,
+            models.Postulacion.estado_actual.in_(estados_activos)
+        ).label("postulaciones_activas"),
+        _contar(models.Vacante, models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value).label("vacantes_disponibles"),
+        mensajes_nuevos.label("mensajes_nuevos"),
+    )).one()
+
+    stats = schemas.StatsEstudianteResponse(
+        postulaciones_activas=row.postulaciones_activas,
+        vacantes_disponibles=row.vacantes_disponibles,
+        mensajes_nuevos=row.mensajes_nuevos
+    )
+    stats_cache.set(key, stats)
+    return stats
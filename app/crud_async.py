@@ -0,0 +1,149 @@
+# /app/crud_async.py
+# Versiones asíncronas (AsyncSession + asyncpg) de las lecturas más frecuentes de crud.py.
+# IMPORTANTE: en async no hay carga "perezosa" de relaciones, así que todo lo que
+# la respuesta necesita (ej. estudiante -> programa) se carga aquí de una vez.
+import os
+
+from sqlalchemy import select, func, literal, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from . import models, schemas, security
+from .crud import (ORDEN_POSTULACIONES, ORDEN_VACANTES,
+                   CARGA_EMPRESA, CARGA_POSTULACION, CARGA_ACTORES_HISTORIAL,
+                   stats_cache, admin_stats_query, admin_stats_from_row, invalidar_stats_estudiante,
+                   FUENTES_IDENTIDAD)
+from .cache import TTLCache
+from .pagination import Pagina, paginar, paginar_resultados
+
+IDENTIDAD_AUSENTE_TTL = float(os.getenv("SIP_IDENTIDAD_AUSENTE_TTL", "60")) # Seg. que se recuerda un email sin usuario
+
+# Emails sin usuario en ninguna tabla. Solo se consulta DESPUÉS de fallar el índice, así que
+# un usuario creado por la API (que entra al índice en su misma transacción) nunca se afecta.
+identidades_ausentes = TTLCache(maxsize=10000, ttl=IDENTIDAD_AUSENTE_TTL)
+
+
+# --- Login (índice unificado de identidades, ver crud.py) ---
+
+async def get_identidad_by_email(db: AsyncSession, email: str) -> models.IdentidadUsuario | None:
+    return await db.get(models.IdentidadUsuario, email.lower())
+
+async def indexar_identidad_por_email(db: AsyncSession, email: str) -> models.IdentidadUsuario | None:
+    """
+    Para usuarios que aún no están en el índice (ej. insertados directo en la BD después del
+    arranque): los busca en las TRES tablas con UNA consulta (en el orden de siempre y sin
+    importar mayúsculas, como el índice) y los agrega al índice. Un email que no está en ninguna se recuerda IDENTIDAD_AUSENTE_TTL
+    segundos: los reintentos con un email equivocado no repiten la búsqueda.
+    """
+    llave = email.lower()
+    if identidades_ausentes.get(llave) is not None:
+        return None
+
+    busqueda = union_all(*(
+        select(literal(prioridad).label("prioridad"), literal(rol).label("rol"), id_col.label("id_usuario"), hash_col.label("hashed_password"))
+        .where(func.lower(email_col) == llave)
+        for prioridad, (rol, email_col, id_col, hash_col) in enumerate(FUENTES_IDENTIDAD)
+    )).subquery()
+    fila = (await db.execute(
+        select(busqueda.c.rol, busqueda.c.id_usuario, busqueda.c.hashed_password).order_by(busqueda.c.prioridad).limit(1)
+    )).first()
+    if fila is None:
+        identidades_ausentes.set(llave, True)
+        return None
+
+    await db.execute(insert(models.IdentidadUsuario).values(email=llave, **fila._asdict()).on_conflict_do_nothing())
+    await db.commit()
+    return await get_identidad_by_email(db, email)
+
+async def update_password(db: AsyncSession, rol: str, id_usuario: int, hashed_password: str) -> None:
+    """
+    Guarda un nuevo hash en la tabla del usuario Y en el índice de identidades,
+    sin cargar al usuario (cambio de contraseña y rehash en el login).
+    """
+    model = security.PRINCIPAL_MODELS[rol]
+    pk = model.__mapper__.primary_key[0]
+    await db.execute(update(model).where(pk == id_usuario).values(hashed_password=hashed_password))
+    await db.execute(
+        update(models.IdentidadUsuario)
+        .where(models.IdentidadUsuario.rol == rol, models.IdentidadUsuario.id_usuario == id_usuario)
+        .values(hashed_password=hashed_password)
+    )
+    await db.commit()
+
+
+# --- Funciones para ESTUDIANTE ---
+
+async def get_vacantes_disponibles(db: AsyncSession, pagina: Optional[Pagina] = None) -> List[models.Vacante]:
+    """[ESTUDIANTE] Obtiene todas las vacantes 'Abiertas', cargando info de la empresa."""
+    stmt = select(models.Vacante)\
+        .options(CARGA_EMPRESA)\
+        .filter(models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value)
+    stmt = paginar(stmt, ORDEN_VACANTES, pagina, descendente=True)
+    result = await db.scalars(stmt)
+    return paginar_resultados(result.all(), ORDEN_VACANTES, pagina)
+
+async def get_postulaciones_por_estudiante(db: AsyncSession, estudiante_id: int, pagina: Optional[Pagina] = None) -> List[models.Postulacion]:
+    """[ESTUDIANTE] Obtiene el historial de postulaciones, cargando info de la vacante y del estudiante."""
+    stmt = select(models.Postulacion)\
+        .options(*CARGA_POSTULACION)\
+        .filter(models.Postulacion.id_estudiante == estudiante_id)
+    stmt = paginar(stmt, ORDEN_POSTULACIONES, pagina, descendente=True)
+    result = await db.scalars(stmt)
+    return paginar_resultados(result.all(), ORDEN_POSTULACIONES, pagina)
+
+
+# --- Historial (TODOS LOS ROLES) ---
+
+async def get_postulacion(db: AsyncSession, postulacion_id: int) -> models.Postulacion | None:
+    return await db.get(models.Postulacion, postulacion_id)
+
+async def get_historial_por_postulacion(db: AsyncSession, postulacion_id: int) -> List[models.HistorialEstadoPostulacion]:
+    """
+    Obtiene el historial completo de una postulación, cargando
+    la info del actor (admin, empresa, o estudiante) que hizo el cambio.
+    """
+    stmt = select(models.HistorialEstadoPostulacion)\
+        .options(*CARGA_ACTORES_HISTORIAL)\
+        .filter(models.HistorialEstadoPostulacion.id_postulacion == postulacion_id)\
+        .order_by(models.HistorialEstadoPostulacion.fecha_cambio.asc())
+    result = await db.scalars(stmt)
+    return result.all()
+
+async def marcar_historial_leido(db: AsyncSession, rol: str, actor_id: int, postulacion_id: int, ultimo_historial_id: int) -> None:
+    """
+    Avanza la marca de lectura del actor en la postulación hasta 'ultimo_historial_id'.
+    Nunca retrocede (GREATEST), aunque lleguen dos lecturas en desorden.
+    """
+    lectura = models.LecturaHistorial
+    stmt = insert(lectura).values(
+        rol=rol,
+        id_actor=actor_id,
+        id_postulacion=postulacion_id,
+        id_ultimo_historial=ultimo_historial_id
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[lectura.rol, lectura.id_actor, lectura.id_postulacion],
+        set_={
+            "id_ultimo_historial": func.greatest(lectura.id_ultimo_historial, stmt.excluded.id_ultimo_historial),
+            "fecha_lectura": func.now(),
+        }
+    )
+    await db.execute(stmt)
+    await db.commit()
+    if rol == "estudiante":
+        invalidar_stats_estudiante(actor_id) # Cambió su conteo de mensajes sin leer
+
+
+# --- Funciones para ADMIN ---
+
+async def get_admin_stats(db: AsyncSession) -> schemas.StatsAdminResponse:
+    """
+    [ADMIN] Obtiene las estadísticas (KPIs) para el dashboard principal.
+    Misma consulta única y misma caché que crud.get_admin_stats().
+    """
+    stats = stats_cache.get("stats:admin")
+    if stats is None:
+        stats = admin_stats_from_row((await db.execute(admin_stats_query())).one())
+        stats_cache.set("stats:admin", stats)
+    return stats
@@ -1,25 +1,107 @@
-from sqlalchemy import create_engine
+import os
+from uuid import uuid4
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+def _env_bool(nombre: str, default: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return default
+    return valor.strip().lower() in ("1", "true", "yes", "si", "sí")
 
 # --- CONFIGURACIÓN DE LA BASE DE DATOS ---
-# Usamos los datos que me proporcionaste.
-POSTGRES_USER = "postgres"
-POSTGRES_PASSWORD = "q1w2e3r4"
-POSTGRES_SERVER = "192.168.1.2"  # La IP de LXC de Base de Datos
-POSTGRES_PORT = "5432"
-POSTGRES_DB = "sip_db"           # Asegúrate de que esta BD exista
+# Todo se puede cambiar con variables de entorno (los valores por defecto son los del LXC de pruebas).
+POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "q1w2e3r4")
+POSTGRES_SERVER = os.getenv("POSTGRES_SERVER", "192.168.1.2")  # La IP de LXC de Base de Datos
+POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "sip_db")           # Asegúrate de que esta BD exista
+
+# URL de conexión de SQLAlchemy (DATABASE_URL tiene prioridad sobre las variables anteriores)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+)
+
+# URL para el motor asíncrono (asyncpg). Por defecto, la misma BD con el driver asyncpg.
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+)
 
-# URL de conexión de SQLAlchemy
-DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+# --- CONFIGURACIÓN DEL POOL DE CONEXIONES ---
+DB_POOL_SIZE = int(os.getenv("SIP_DB_POOL_SIZE", "5"))          # Conexiones permanentes por worker
+DB_MAX_OVERFLOW = int(os.getenv("SIP_DB_MAX_OVERFLOW", "10"))   # Conexiones extra en los picos
+DB_POOL_TIMEOUT = float(os.getenv("SIP_DB_POOL_TIMEOUT", "30")) # Segundos esperando una conexión libre
+DB_POOL_RECYCLE = int(os.getenv("SIP_DB_POOL_RECYCLE", "1800")) # Renueva conexiones más viejas que esto (seg.)
+DB_POOL_PRE_PING = _env_bool("SIP_DB_POOL_PRE_PING", True)      # Descarta conexiones caídas antes de usarlas
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("SIP_DB_STATEMENT_TIMEOUT_MS", "0")) # 0 = sin límite
+DB_APPLICATION_NAME = os.getenv("SIP_DB_APPLICATION_NAME", "sip-api")        # Visible en pg_stat_activity
+# Modo compatible con PgBouncer (pool en modo transacción): el pool lo maneja PgBouncer,
+# y no se usan sentencias preparadas del lado del servidor.
+DB_PGBOUNCER = _env_bool("SIP_DB_PGBOUNCER", False)
 
 # ------------------------------------------
 
+def get_engine_kwargs() -> dict:
+    """Argumentos de create_engine según la configuración del entorno."""
+    connect_args = {"application_name": DB_APPLICATION_NAME}
+
+    if DB_PGBOUNCER:
+        # PgBouncer no acepta el parámetro 'options' al conectar; en ese modo
+        # el statement_timeout se configura en el rol (ALTER ROLE ... SET statement_timeout).
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+def get_async_engine_kwargs() -> dict:
+    """Lo mismo que get_engine_kwargs(), con los nombres que usa asyncpg."""
+    server_settings = {"application_name": DB_APPLICATION_NAME}
+
+    if DB_PGBOUNCER:
+        # Sin caché de sentencias preparadas y con nombres únicos: así las sentencias
+        # no chocan entre las conexiones que PgBouncer reparte por transacción.
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "server_settings": server_settings,
+                "statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            },
+        }
+
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+
+    kwargs = get_engine_kwargs()
+    kwargs["connect_args"] = {"server_settings": server_settings}
+    return kwargs
+
 # Motor de SQLAlchemy
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **get_engine_kwargs())
+
+# Motor asíncrono (asyncpg): lo usan los endpoints 'async def' de solo lectura
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_async_engine_kwargs())
 
 # Creación de la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: en async no se pueden recargar atributos al serializar la respuesta
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base para los modelos (lo usaremos en models.py)
 Base = declarative_base()
@@ -30,4 +112,23 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Lo mismo, pero con una sesión asíncrona (para endpoints 'async def')
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_pool_status() -> dict:
+    """Estado del pool de conexiones de este worker (para el endpoint de salud)."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "conexiones_fijas": pool.size(),
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0), # Conexiones extra abiertas ahora mismo
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
@@ -0,0 +1,120 @@
+# /app/escucha.py
+# Escucha de Postgres (LISTEN/NOTIFY) compartida por todo el worker.
+# Con varios workers de uvicorn (o varios contenedores), lo que pasa en uno no se entera
+# en los demás. Quien escribe hace NOTIFY en su transacción (sale con el commit, y nunca
+# si hace rollback) y cada worker tiene UN hilo con UNA conexión dedicada que hace LISTEN
+# de todos los canales registrados y reparte las notificaciones a sus manejadores.
+# - Los manejadores corren en el hilo de la escucha: deben ser rápidos y seguros entre hilos.
+# - Si la conexión se cae se reconecta sola; lo notificado mientras tanto se pierde, así que
+#   cada canal puede registrar qué hacer al reconectar (ej. vaciar su caché).
+# - No funciona detrás de PgBouncer en modo transacción (LISTEN necesita una sesión propia):
+#   en ese caso la escucha debe apuntar directo a Postgres.
+import logging
+import select
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+ESPERA_SEGUNDOS = 30    # Sin notificaciones en este tiempo, se verifica que la conexión siga viva
+REINTENTO_SEGUNDOS = 5  # Pausa antes de reconectar
+
+Manejador = Callable[[str], None]
+
+# canal -> [(manejador del payload, qué hacer al reconectar)]
+_manejadores: Dict[str, List[Tuple[Manejador, Optional[Callable[[], None]]]]] = {}
+_lock = threading.Lock()
+
+
+def registrar(canal: str, manejador: Manejador, al_reconectar: Optional[Callable[[], None]] = None) -> None:
+    """Suscribe un manejador a un canal (en todas las escuchas, incluso las ya iniciadas)."""
+    with _lock:
+        _manejadores.setdefault(canal, []).append((manejador, al_reconectar))
+
+
+def _manejadores_de(canal: str):
+    with _lock:
+        return list(_manejadores.get(canal, ()))
+
+
+class Escucha:
+    """El hilo que hace LISTEN sobre una BD (una por motor de SQLAlchemy)."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.escuchando = threading.Event() # Ya hizo LISTEN (lo notificado desde ahora llega)
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> "Escucha":
+        with _lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._correr, name="sip-escucha", daemon=True)
+                self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def _correr(self) -> None:
+        conectada_antes = False
+        while not self._detener.is_set():
+            try:
+                self._escuchar(reconexion=conectada_antes)
+            except Exception:
+                logger.exception("Se perdió la conexión de LISTEN; reintentando en %s s.", REINTENTO_SEGUNDOS)
+            finally:
+                self.escuchando.clear()
+            conectada_antes = True
+            self._detener.wait(REINTENTO_SEGUNDOS)
+
+    def _escuchar(self, reconexion: bool) -> None:
+        # Conexión propia (fuera del pool), con la misma configuración del motor
+        conexion = self.engine.raw_connection()
+        conexion.detach()
+        dbapi = conexion.dbapi_connection
+        try:
+            dbapi.autocommit = True # Sin autocommit, las notificaciones no se entregan
+            cursor = dbapi.cursor()
+            canales = set()
+            while not self._detener.is_set():
+                with _lock:
+                    nuevos = set(_manejadores) - canales
+                for canal in nuevos:
+                    cursor.execute(f'LISTEN "{canal}"')
+                    canales.add(canal)
+                    if reconexion:
+                        for _, al_reconectar in _manejadores_de(canal):
+                            if al_reconectar is not None:
+                                al_reconectar()
+                reconexion = False # Los canales que se registren después no perdieron nada
+                self.escuchando.set()
+
+                if select.select([dbapi], [], [], ESPERA_SEGUNDOS) == ([], [], []):
+                    cursor.execute("SELECT 1") # Si la conexión murió en silencio, aquí falla
+                    continue
+                dbapi.poll()
+                while dbapi.notifies:
+                    notificacion = dbapi.notifies.pop(0)
+                    for manejador, _ in _manejadores_de(notificacion.channel):
+                        try:
+                            manejador(notificacion.payload)
+                        except Exception:
+                            logger.exception("Error procesando una notificación del canal %s.", notificacion.channel)
+        finally:
+            conexion.close()
+
+
+# Una escucha por BD (en las pruebas, la BD de pruebas tiene la suya)
+_escuchas: Dict[Engine, Escucha] = {}
+
+
+def iniciar(engine: Engine) -> Escucha:
+    """Inicia (una sola vez por motor) la escucha del worker y la retorna."""
+    with _lock:
+        escucha = _escuchas.get(engine)
+        if escucha is None:
+            escucha = _escuchas[engine] = Escucha(engine)
+    return escucha.iniciar()
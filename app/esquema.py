@@ -0,0 +1,158 @@
+# /app/esquema.py
+# Actualización del esquema de BDs creadas con una versión anterior.
+# create_all() crea las tablas que faltan, pero no agrega columnas ni índices nuevos a las
+# que ya existen (ej. 'version' de concurrencia.py, 'busqueda' y sus índices, los índices
+# de los tableros). Al iniciar, se compara el esquema real con models.py y se crea SOLO
+# lo que falta:
+# - La comparación lee information_schema, pg_index y pg_constraint (catálogos, sin bloquear tablas).
+#   Con el esquema al día no se ejecuta ningún DDL: nada de ALTER TABLE en cada arranque,
+#   que toma ACCESS EXCLUSIVE aunque la columna ya exista.
+# - Si varios workers arrancan a la vez, uno actualiza y los demás esperan su turno
+#   (pg_advisory_lock); además los DDL llevan IF NOT EXISTS.
+# - Solo se AGREGA (columnas con default o que aceptan NULL, índices y restricciones
+#   únicas): nunca se borra ni se cambia nada. Lo demás es una migración manual.
+# - Las restricciones de las tablas (llave primaria, foráneas, únicas) también se comparan
+#   con pg_constraint. Las únicas que falten se agregan (ej. la de postulaciones, de la que
+#   depende el ON CONFLICT de crud.create_postulacion): primero su índice, con CREATE UNIQUE
+#   INDEX CONCURRENTLY (no bloquea las escrituras), y luego ADD CONSTRAINT ... USING INDEX.
+#   Si la tabla ya tiene filas repetidas, NO se arranca: hay que limpiarlas antes (ver README).
+#   Las demás restricciones que falten solo se reportan en el log.
+import logging
+import time
+
+from sqlalchemy import DDL, CheckConstraint, ForeignKeyConstraint, PrimaryKeyConstraint, UniqueConstraint, func, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+BLOQUEO_ESQUEMA = 7_150_001 # Llave de pg_advisory_lock: un solo worker actualiza el esquema a la vez
+
+
+# Tipo de restricción -> 'contype' de pg_constraint
+TIPOS_RESTRICCION = {PrimaryKeyConstraint: "p", ForeignKeyConstraint: "f", UniqueConstraint: "u", CheckConstraint: "c"}
+
+
+class RestriccionConDuplicados(RuntimeError):
+    """Falta una restricción única y la tabla ya tiene filas que no la cumplen."""
+
+
+def _existentes(db: Session):
+    """
+    (columnas, índices, restricciones) que ya tiene la BD: {(tabla, columna)}, {nombre de índice: válido}
+    y {(tabla, tipo, columnas, tabla referida)}. Las restricciones se comparan por lo que
+    restringen y no por su nombre: las que no lo tienen en models.py lo recibieron de Postgres.
+    """
+    columnas = {
+        (fila.table_name, fila.column_name)
+        for fila in db.execute(text(
+            "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = current_schema()"
+        ))
+    }
+    # Un índice no válido es un CREATE INDEX CONCURRENTLY que no terminó
+    indices = dict(db.execute(text(
+        "SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+        " WHERE c.relnamespace = current_schema()::regnamespace"
+    )).all())
+    restricciones = {
+        (fila.tabla, fila.tipo, tuple(fila.columnas), fila.referida)
+        for fila in db.execute(text(
+            "SELECT t.relname AS tabla, c.contype AS tipo, r.relname AS referida,"
+            "       ARRAY(SELECT a.attname FROM pg_attribute a"
+            "             WHERE a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey) ORDER BY a.attname) AS columnas"
+            " FROM pg_constraint c"
+            " JOIN pg_class t ON t.oid = c.conrelid"
+            " LEFT JOIN pg_class r ON r.oid = c.confrelid"
+            " WHERE c.connamespace = current_schema()::regnamespace"
+        ))
+    }
+    return columnas, indices, restricciones
+
+def _restriccion(tabla, restriccion) -> tuple:
+    """La misma llave de _existentes() para una restricción de models.py."""
+    referida = restriccion.referred_table.name if isinstance(restriccion, ForeignKeyConstraint) else None
+    columnas = tuple(sorted(columna.name for columna in restriccion.columns))
+    return (tabla.name, TIPOS_RESTRICCION.get(type(restriccion)), columnas, referida)
+
+def _agregar_unica(db: Session, tabla, restriccion, indices: dict) -> list:
+    """Los DDL que agregan una restricción única, si la tabla no tiene filas repetidas."""
+    columnas = [columna.name for columna in restriccion.columns]
+    nombre = restriccion.name or f"{tabla.name}_{'_'.join(columnas)}_key" # El nombre que le daría Postgres
+    lista = ", ".join(columnas)
+    repetida = db.execute(text(
+        f"SELECT {lista} FROM {tabla.name} WHERE {' AND '.join(f'{c} IS NOT NULL' for c in columnas)}"
+        f" GROUP BY {lista} HAVING count(*) > 1 LIMIT 1"
+    )).first()
+    if repetida is not None:
+        logger.warning(
+            "Falta la restricción única %s en %s(%s) y hay filas repetidas (ej. %s): hay que borrarlas antes de iniciar (ver README).",
+            nombre, tabla.name, lista, tuple(repetida)
+        )
+        raise RestriccionConDuplicados(f"{tabla.name}({lista}) tiene filas repetidas; no se puede agregar {nombre}.")
+
+    ddl = []
+    if indices.get(nombre) is False:
+        # Quedó a medias (se interrumpió el arranque que lo creaba): no sirve, se rehace
+        ddl.append(DDL(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}"))
+    if not indices.get(nombre):
+        ddl.append(DDL(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla.name} ({lista})"))
+    ddl.append(DDL(f"ALTER TABLE {tabla.name} ADD CONSTRAINT {nombre} UNIQUE USING INDEX {nombre}"))
+    return ddl
+
+def pendientes(db: Session) -> list:
+    """
+    Los DDL (sin ejecutar) que faltan para que la BD tenga las columnas, índices y
+    restricciones únicas de models.py. Lanza RestriccionConDuplicados si una de esas
+    restricciones no se puede agregar.
+    """
+    columnas, indices, restricciones = _existentes(db)
+    dialecto = db.get_bind().dialect
+    ddl = []
+    for tabla in Base.metadata.sorted_tables:
+        for columna in tabla.columns:
+            if (tabla.name, columna.name) in columnas:
+                continue
+            if not columna.nullable and columna.server_default is None:
+                # Las filas existentes no tendrían valor: esto necesita una migración manual
+                logger.warning("Falta la columna %s.%s (NOT NULL sin default); no se agrega sola.", tabla.name, columna.name)
+                continue
+            definicion = str(CreateColumn(columna).compile(dialect=dialecto)).replace("%", "%%")
+            ddl.append(DDL(f"ALTER TABLE {tabla.name} ADD COLUMN IF NOT EXISTS {definicion}"))
+        for indice in tabla.indexes:
+            if indice.name not in indices:
+                ddl.append(CreateIndex(indice, if_not_exists=True))
+        for restriccion in tabla.constraints:
+            if _restriccion(tabla, restriccion) in restricciones:
+                continue
+            if isinstance(restriccion, UniqueConstraint):
+                ddl.extend(_agregar_unica(db, tabla, restriccion, indices))
+            else:
+                logger.warning(
+                    "Falta la restricción %s (%s) en %s(%s); no se agrega sola.",
+                    restriccion.name or "sin nombre", type(restriccion).__name__,
+                    tabla.name, ", ".join(columna.name for columna in restriccion.columns)
+                )
+    return ddl
+
+def actualizar(db: Session) -> None:
+    """
+    Al iniciar (después de create_all): agrega las columnas, índices y restricciones únicas que falten.
+    Corre en autocommit (CREATE INDEX CONCURRENTLY no puede ir en una transacción) y con un
+    candado de sesión: si varios workers arrancan a la vez, uno actualiza y los demás, al
+    obtener el candado, ya no encuentran nada pendiente. El candado se pide por sondeo: un
+    worker esperando DENTRO de pg_advisory_lock tendría un snapshot abierto, y CREATE INDEX
+    CONCURRENTLY esperaría a que terminara (nunca).
+    """
+    db.commit() # Tampoco debe quedar abierta la transacción de 'db'
+    with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+        while not conexion.scalar(select(func.pg_try_advisory_lock(BLOQUEO_ESQUEMA))):
+            time.sleep(0.5)
+        try:
+            with Session(bind=conexion) as sesion:
+                for sentencia in pendientes(sesion):
+                    logger.info("Actualizando el esquema: %s", sentencia.compile(dialect=conexion.dialect))
+                    sesion.execute(sentencia)
+        finally:
+            conexion.execute(select(func.pg_advisory_unlock(BLOQUEO_ESQUEMA)))
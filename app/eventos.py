@@ -0,0 +1,120 @@
+# /app/eventos.py
+# Eventos en tiempo real para los tableros (comentarios, cambios de estado, vacantes aprobadas).
+# - Quien escribe llama a publicar() ANTES de su commit: el evento viaja con pg_notify dentro
+#   de la misma transacción, así que solo se entrega si el cambio quedó guardado.
+# - La escucha de cada worker (ver escucha.py) recibe el NOTIFY y lo entrega a las
+#   suscripciones locales (una por conexión de /api/events) cuyos destinatarios coinciden.
+# - Los destinatarios son llaves 'rol:id' (ej. 'estudiante:5') o 'rol:*' (todos los de ese rol).
+# La entrega es "a lo sumo una vez": si un cliente se desconecta o se atrasa, al volver
+# recarga sus listas (recibe el evento 'resync').
+import asyncio
+import json
+import threading
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import escucha
+
+CANAL = "sip_eventos"
+MAX_PENDIENTES = 100 # Eventos por conexión sin enviar; si se llena, se le pide recargar
+
+# Tipos de evento
+COMENTARIO = "comentario"
+CAMBIO_ESTADO = "cambio_estado"
+VACANTE_APROBADA = "vacante_aprobada"
+RESYNC = "resync" # Se perdieron eventos: el cliente debe recargar sus listas
+
+
+def destinatario(rol: str, id_=None) -> str:
+    return f"{rol}:{'*' if id_ is None else id_}"
+
+def evento(tipo: str, para: Iterable[str], **datos) -> dict:
+    return {"tipo": tipo, "para": list(para), "datos": datos}
+
+
+def publicar(db: Session, eventos: List[dict]) -> None:
+    """Encola los eventos en la transacción de 'db': se envían con su commit (una sola ida a la BD)."""
+    if not eventos:
+        return
+    db.execute(
+        text("SELECT pg_notify(:canal, e) FROM unnest(CAST(:eventos AS text[])) AS e"),
+        {"canal": CANAL, "eventos": [json.dumps(e, default=str) for e in eventos]}
+    )
+
+
+# --- Suscripciones locales (las conexiones abiertas de este worker) ---
+
+class Suscripcion:
+    """Una conexión de /api/events: sus llaves de destinatario y su cola (en su event loop)."""
+
+    def __init__(self, llaves: Iterable[str], loop: asyncio.AbstractEventLoop):
+        self.llaves = tuple(llaves)
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDIENTES)
+
+    def _poner(self, evento: dict) -> None:
+        # Corre en el event loop de la conexión
+        if self.cola.full():
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            evento = {"tipo": RESYNC, "datos": {}}
+        self.cola.put_nowait(evento)
+
+    def entregar(self, evento: dict) -> None:
+        """Seguro desde cualquier hilo (la escucha corre en el suyo)."""
+        self.loop.call_soon_threadsafe(self._poner, evento)
+
+
+class Bus:
+    """Reparte los eventos recibidos entre las suscripciones locales."""
+
+    def __init__(self):
+        self._suscripciones: Dict[str, Set[Suscripcion]] = {}
+        self._lock = threading.Lock()
+
+    def suscribir(self, rol: str, id_: int) -> Suscripcion:
+        """Suscribe al usuario a sus eventos y a los de todo su rol. Llamar desde el event loop."""
+        suscripcion = Suscripcion([destinatario(rol, id_), destinatario(rol)], asyncio.get_running_loop())
+        with self._lock:
+            for llave in suscripcion.llaves:
+                self._suscripciones.setdefault(llave, set()).add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion) -> None:
+        with self._lock:
+            for llave in suscripcion.llaves:
+                grupo = self._suscripciones.get(llave)
+                if grupo is not None:
+                    grupo.discard(suscripcion)
+                    if not grupo:
+                        del self._suscripciones[llave]
+
+    def despachar(self, evento: dict) -> None:
+        with self._lock:
+            # Un usuario que coincide por dos llaves recibe el evento una sola vez
+            destino = set().union(*(self._suscripciones.get(llave, ()) for llave in evento.get("para", ())))
+        for suscripcion in destino:
+            suscripcion.entregar(evento)
+
+    def resync(self) -> None:
+        """Tras una reconexión de la escucha: todos pudieron perder eventos."""
+        with self._lock:
+            todas = set().union(*self._suscripciones.values())
+        for suscripcion in todas:
+            suscripcion.entregar({"tipo": RESYNC, "datos": {}})
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(set().union(*self._suscripciones.values()))
+
+
+bus = Bus()
+
+escucha.registrar(CANAL, lambda payload: bus.despachar(json.loads(payload)), al_reconectar=bus.resync)
+
+
+def formato_sse(evento: dict) -> str:
+    """El evento en el formato de text/event-stream ('event' = tipo; 'data' = JSON)."""
+    return f"event: {evento['tipo']}\ndata: {json.dumps(evento['datos'], default=str)}\n\n"
@@ -0,0 +1,141 @@
+# /app/exportacion.py
+# Exportación (CSV / XLSX) del seguimiento de prácticas con su historial, para acreditación.
+# Las filas salen de un cursor del lado del servidor (yield_per) y se escriben por lotes,
+# así que la memoria no crece con el número de filas.
+import csv
+import enum
+import io
+import os
+import tempfile
+from typing import Iterator, List, Optional
+
+import xlsxwriter
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session, aliased
+
+from . import models
+
+LOTE = 1000           # Filas por viaje al cursor del servidor
+TAMANO_BLOQUE = 64 * 1024  # Bytes por bloque al enviar el XLSX
+
+COLUMNAS = [
+    "id_postulacion", "fecha_postulacion", "estado_actual", "fecha_inicio_practica", "fecha_fin_practica",
+    "estudiante", "email_estudiante", "programa", "facultad",
+    "vacante", "empresa", "nit_empresa",
+    "fecha_cambio", "estado_historial", "comentarios", "tipo_actor", "actor",
+]
+
+
+def select_practicas_con_historial(estados: List[str], id_empresa: Optional[int] = None):
+    """
+    Una fila por cada registro del historial (o una sola, sin historial, si la postulación no tiene),
+    con las mismas prácticas que la página de Seguimiento, ordenadas por postulación y fecha.
+    """
+    historial = models.HistorialEstadoPostulacion
+    actor_empresa = aliased(models.Empresa)
+    actor_estudiante = aliased(models.Estudiante)
+    stmt = select(
+        models.Postulacion.id_postulacion,
+        models.Postulacion.fecha_postulacion,
+        models.Postulacion.estado_actual,
+        models.Postulacion.fecha_inicio_practica,
+        models.Postulacion.fecha_fin_practica,
+        (models.Estudiante.nombre + " " + models.Estudiante.apellido).label("estudiante"),
+        models.Estudiante.email_institucional,
+        models.ProgramaAcademico.nombre_programa,
+        models.ProgramaAcademico.facultad,
+        models.Vacante.titulo_vacante,
+        models.Empresa.razon_social,
+        models.Empresa.nit,
+        historial.fecha_cambio,
+        historial.estado,
+        historial.comentarios,
+        case(
+            (historial.id_actor_universidad.is_not(None), "universidad"),
+            (historial.id_actor_empresa.is_not(None), "empresa"),
+            (historial.id_actor_estudiante.is_not(None), "estudiante"),
+        ).label("tipo_actor"),
+        func.coalesce(
+            models.UsuarioUniversidad.nombre,
+            actor_empresa.razon_social,
+            actor_estudiante.nombre + " " + actor_estudiante.apellido,
+        ).label("actor"),
+    )\
+        .select_from(models.Postulacion)\
+        .join(models.Estudiante, models.Postulacion.estudiante)\
+        .join(models.ProgramaAcademico, models.Estudiante.programa)\
+        .join(models.Vacante, models.Postulacion.vacante)\
+        .join(models.Empresa, models.Vacante.empresa)\
+        .outerjoin(historial, historial.id_postulacion == models.Postulacion.id_postulacion)\
+        .outerjoin(models.UsuarioUniversidad, models.UsuarioUniversidad.id_usuario == historial.id_actor_universidad)\
+        .outerjoin(actor_empresa, actor_empresa.id_empresa == historial.id_actor_empresa)\
+        .outerjoin(actor_estudiante, actor_estudiante.id_estudiante == historial.id_actor_estudiante)\
+        .filter(models.Postulacion.estado_actual.in_(estados))
+    if id_empresa is not None:
+        stmt = stmt.filter(models.Vacante.id_empresa == id_empresa)
+    return stmt.order_by(models.Postulacion.id_postulacion, historial.fecha_cambio, historial.id_historial)
+
+
+def _valor(v):
+    return v.value if isinstance(v, enum.Enum) else v
+
+def _lotes(db: Session, estados: List[str], id_empresa: Optional[int]) -> Iterator[list]:
+    """Lotes de filas leídos con un cursor del lado del servidor (nunca todo en memoria)."""
+    resultado = db.execute(
+        select_practicas_con_historial(estados, id_empresa).execution_options(yield_per=LOTE)
+    )
+    for lote in resultado.partitions():
+        yield [[_valor(v) for v in fila] for fila in lote]
+
+
+def generar_csv(crear_sesion, estados: List[str], id_empresa: Optional[int] = None) -> Iterator[str]:
+    """
+    Genera el CSV por bloques. Abre su propia sesión (crear_sesion) porque el
+    generador sigue corriendo después de que el endpoint retorna.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff") # BOM: Excel abre el archivo como UTF-8 (tildes y ñ)
+    escritor.writerow(COLUMNAS)
+    with crear_sesion() as db:
+        for lote in _lotes(db, estados, id_empresa):
+            escritor.writerows(
+                [v.isoformat() if hasattr(v, "isoformat") else v for v in fila] for fila in lote
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def generar_xlsx(crear_sesion, estados: List[str], id_empresa: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Genera el XLSX. El formato es un ZIP que solo se puede cerrar al final, así que se
+    escribe en un archivo temporal en modo 'constant_memory' (cada fila va directo al
+    disco) y luego se envía por bloques.
+    """
+    fd, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        libro = xlsxwriter.Workbook(ruta, {"constant_memory": True, "remove_timezone": True})
+        hoja = libro.add_worksheet("Prácticas")
+        formato_fecha = libro.add_format({"num_format": "yyyy-mm-dd hh:mm"})
+        hoja.write_row(0, 0, COLUMNAS)
+        n = 1
+        with crear_sesion() as db:
+            for lote in _lotes(db, estados, id_empresa):
+                for fila in lote:
+                    for col, v in enumerate(fila):
+                        if hasattr(v, "isoformat"):
+                            hoja.write_datetime(n, col, v, formato_fecha)
+                        else:
+                            hoja.write(n, col, v)
+                    n += 1
+        libro.close()
+
+        with open(ruta, "rb") as archivo:
+            while bloque := archivo.read(TAMANO_BLOQUE):
+                yield bloque
+    finally:
+        os.remove(ruta)
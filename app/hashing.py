@@ -0,0 +1,165 @@
+# /app/hashing.py
+import os
+import asyncio
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from passlib.context import CryptContext
+
+# --- CONFIGURACIÓN DE ARGON2 (por variables de entorno) ---
+# Si no se definen, se usan los valores por defecto de passlib.
+# Al cambiarlos, los hashes viejos se actualizan solos en el siguiente login.
+ARGON2_TIME_COST = os.getenv("SIP_ARGON2_TIME_COST")
+ARGON2_MEMORY_COST = os.getenv("SIP_ARGON2_MEMORY_COST") # En KiB
+ARGON2_PARALLELISM = os.getenv("SIP_ARGON2_PARALLELISM")
+
+# --- CONFIGURACIÓN DEL POOL DE HASHING ---
+# Procesos dedicados a argon2 (0 = calcular en el mismo hilo de la petición)
+HASH_WORKERS = int(os.getenv("SIP_HASH_WORKERS", os.cpu_count() or 1))
+# Máximo de operaciones esperando/ejecutándose antes de rechazar nuevas (con un 503 inmediato).
+# Debe quedar muy por debajo de los 40 hilos del servidor: los llamados síncronos (ej. crear
+# un usuario) ocupan un hilo mientras esperan su hash.
+HASH_MAX_PENDING = int(os.getenv("SIP_HASH_MAX_PENDING", min(max(HASH_WORKERS, 1) * 2, 16)))
+
+
+def _build_context() -> CryptContext:
+    kwargs = {}
+    if ARGON2_TIME_COST:
+        kwargs["argon2__rounds"] = int(ARGON2_TIME_COST)
+    if ARGON2_MEMORY_COST:
+        kwargs["argon2__memory_cost"] = int(ARGON2_MEMORY_COST)
+    if ARGON2_PARALLELISM:
+        kwargs["argon2__parallelism"] = int(ARGON2_PARALLELISM)
+    return CryptContext(schemes=["argon2"], deprecated="auto", **kwargs)
+
+# Cada proceso del pool construye su propio contexto con la misma configuración
+pwd_context = _build_context()
+
+
+class HashingSaturadoError(RuntimeError):
+    """No hubo cupo en el pool de hashing dentro del tiempo de espera."""
+
+
+# --- Funciones que se ejecutan DENTRO de los procesos del pool ---
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+# --- Pool de procesos con contrapresión ---
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_contadores_lock = threading.Lock()
+_en_cola = 0
+_en_lote = 0 # Contraseñas de importaciones masivas (no cuentan para el límite)
+_rechazadas = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Crea el pool la primera vez que se necesita ('spawn' evita heredar hilos y conexiones)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _reservar() -> None:
+    """
+    Toma un cupo de operación pendiente, o falla en el acto si no hay.
+    Nunca espera: esperar un cupo acapararía un hilo del servidor (o el event loop).
+    """
+    global _en_cola, _rechazadas
+    with _contadores_lock:
+        if _en_cola >= HASH_MAX_PENDING:
+            _rechazadas += 1
+            raise HashingSaturadoError("El pool de hashing está saturado.")
+        _en_cola += 1
+
+def _liberar() -> None:
+    global _en_cola
+    with _contadores_lock:
+        _en_cola -= 1
+
+def _run(fn, *args):
+    """Ejecuta una operación de argon2 (desde código síncrono) respetando el límite de pendientes."""
+    _reservar()
+    try:
+        if HASH_WORKERS == 0:
+            return fn(*args)
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        _liberar()
+
+async def _run_async(fn, *args):
+    """
+    Lo mismo, para endpoints 'async def': se espera el resultado en el event loop,
+    sin ocupar ningún hilo del servidor mientras argon2 calcula.
+    """
+    _reservar()
+    try:
+        executor = _get_executor() if HASH_WORKERS > 0 else None # None = hilos propios de asyncio
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        _liberar()
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Hashea un lote (importaciones masivas) usando TODOS los procesos del pool, pero con una
+    ventana: nunca hay más de HASH_WORKERS contraseñas del lote en la cola del pool. Un login
+    que llega en medio espera a lo sumo un hash por proceso, no las miles del CSV.
+    No pasa por el límite de pendientes: es una sola operación del admin, no una ráfaga de logins.
+    """
+    global _en_lote
+    if HASH_WORKERS == 0 or not passwords:
+        return [_hash(p) for p in passwords]
+    with _contadores_lock:
+        _en_lote += len(passwords)
+    executor = _get_executor()
+    hashes: List[str] = []
+    ventana: deque = deque()
+    try:
+        for password in passwords:
+            if len(ventana) >= HASH_WORKERS:
+                hashes.append(ventana.popleft().result())
+            ventana.append(executor.submit(_hash, password))
+        hashes.extend(futuro.result() for futuro in ventana)
+        return hashes
+    finally:
+        for futuro in ventana:
+            futuro.cancel() # Si algo falló, lo que aún no empezó no se calcula
+        with _contadores_lock:
+            _en_lote -= len(passwords)
+
+def verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Retorna (es_valida, nuevo_hash). nuevo_hash no es None si cambiaron los parámetros."""
+    return _run(_verify_and_update, password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+async def verify_and_update_async(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await _run_async(_verify_and_update, password, hashed_password)
+
+def get_stats() -> dict:
+    """Métricas del pool: profundidad de la cola y peticiones rechazadas."""
+    return {
+        "workers": HASH_WORKERS,
+        "en_cola": _en_cola,
+        "en_lote": _en_lote,
+        "max_pendientes": HASH_MAX_PENDING,
+        "rechazadas": _rechazadas,
+    }
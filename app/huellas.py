@@ -0,0 +1,78 @@
+# /app/huellas.py
+# "Huellas" baratas de las listas por usuario, para GET condicional (ETag / If-None-Match).
+# La mayoría de las recargas de los tableros devuelven exactamente lo mismo: antes de la
+# consulta completa (con sus relaciones y la serialización) se calcula UNA agregación
+# (conteo, id máximo, suma de versiones...) sobre las mismas filas. Si coincide con la
+# etiqueta que el cliente ya tiene, se responde 304 y no se hace nada más.
+# - Las filas no se borran y los ids solo crecen: una fila nueva cambia el conteo y el id máximo.
+# - Cada cambio de una postulación/vacante sube su 'version' (ver concurrencia.py), y con ella la suma.
+# - Lo anidado que sí cambia (esta_activo de empresas, estudiantes y programas) entra como
+#   la suma de los ids de los activos.
+# La huella se calcula ANTES de leer los datos: si algo cambia en medio, la respuesta lleva
+# una etiqueta más vieja que su contenido y la siguiente recarga simplemente la trae completa
+# (al revés, una etiqueta más nueva que el contenido podría dejar al cliente con datos viejos).
+import hashlib
+
+from fastapi import Response, status
+from sqlalchemy import Select, func, select
+
+from . import models
+
+
+def _activos(columna_id, columna_activo):
+    return func.coalesce(func.sum(columna_id).filter(columna_activo == True), 0)
+
+def postulaciones(*condiciones) -> Select:
+    """Para las listas de postulaciones (cada una con su vacante, empresa, estudiante y programa)."""
+    P, V = models.Postulacion, models.Vacante
+    Empresa, Estudiante, Programa = models.Empresa, models.Estudiante, models.ProgramaAcademico
+    return select(
+        func.count(), func.max(P.id_postulacion),
+        func.coalesce(func.sum(P.version), 0), func.coalesce(func.sum(V.version), 0),
+        _activos(Empresa.id_empresa, Empresa.esta_activo),
+        _activos(Estudiante.id_estudiante, Estudiante.esta_activo),
+        _activos(Programa.id_programa, Programa.esta_activo),
+    ).select_from(P)\
+        .join(P.vacante).join(V.empresa)\
+        .join(P.estudiante).join(Estudiante.programa)\
+        .where(*condiciones)
+
+def postulaciones_estudiante(estudiante_id: int) -> Select:
+    return postulaciones(models.Postulacion.id_estudiante == estudiante_id)
+
+def postulaciones_empresa(empresa_id: int) -> Select:
+    return postulaciones(models.Vacante.id_empresa == empresa_id)
+
+def vacantes_empresa(empresa_id: int) -> Select:
+    V, Empresa = models.Vacante, models.Empresa
+    return select(
+        func.count(), func.max(V.id_vacante), func.coalesce(func.sum(V.version), 0),
+        _activos(Empresa.id_empresa, Empresa.esta_activo),
+    ).select_from(V).join(V.empresa).where(V.id_empresa == empresa_id)
+
+def historial(postulacion_id: int) -> Select:
+    """Las entradas del historial no se modifican: basta con las nuevas (y los actores)."""
+    H, Empresa, Estudiante, Programa = models.HistorialEstadoPostulacion, models.Empresa, models.Estudiante, models.ProgramaAcademico
+    return select(
+        func.count(), func.max(H.id_historial),
+        _activos(Empresa.id_empresa, Empresa.esta_activo),
+        _activos(Estudiante.id_estudiante, Estudiante.esta_activo),
+        _activos(Programa.id_programa, Programa.esta_activo),
+    ).select_from(H)\
+        .outerjoin(H.empresa).outerjoin(H.estudiante).outerjoin(Estudiante.programa)\
+        .where(H.id_postulacion == postulacion_id)
+
+
+def etiqueta(alcance: str, fila) -> str:
+    """El ETag de la huella (opaco: solo sirve para comparar)."""
+    resumen = hashlib.blake2b(repr(tuple(fila)).encode(), digest_size=8).hexdigest()
+    return f'"{alcance}-{resumen}"'
+
+def set_etiqueta(response: Response, etiqueta: str) -> None:
+    response.headers["ETag"] = etiqueta
+    response.headers["Cache-Control"] = "private, no-cache" # Por usuario; el navegador siempre revalida
+
+def no_modificado(etiqueta: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etiqueta(response, etiqueta)
+    return response
@@ -0,0 +1,239 @@
+# /app/importacion.py
+# Importación masiva (CSV) de estudiantes y empresas para el inicio de semestre.
+# En vez de una petición, un hash y un commit por usuario:
+# - se validan todas las filas con los mismos schemas de la creación individual,
+# - los programas y los duplicados se resuelven con UNA consulta cada uno,
+# - las contraseñas se hashean en paralelo en el pool de procesos,
+# - y todo se inserta por lotes en UNA sola transacción.
+import csv
+import io
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_, select, union
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, schemas, security
+from .crud import invalidar_stats_admin
+
+MAX_FILAS = 20000
+LOTE = 1000 # Filas por INSERT
+
+COLUMNAS_ESTUDIANTES = {"nombre", "apellido", "email_institucional", "password"} # + 'id_programa' o 'programa'
+COLUMNAS_EMPRESAS = {"razon_social", "nit", "email_contacto", "password"}       # + 'descripcion' (opcional)
+
+
+# --- Lectura y validación ---
+
+def _leer_csv(contenido: bytes, requeridas: set) -> List[Tuple[int, Dict[str, str]]]:
+    """Filas del CSV como (línea, dict). Acepta UTF-8 o Latin-1, separado por ',' o ';' (Excel)."""
+    try:
+        texto = contenido.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = contenido.decode("latin-1")
+
+    primera_linea = texto.split("\n", 1)[0]
+    lector = csv.DictReader(io.StringIO(texto), delimiter=";" if primera_linea.count(";") > primera_linea.count(",") else ",")
+    columnas = {(c or "").strip() for c in (lector.fieldnames or [])}
+    faltantes = requeridas - columnas
+    if faltantes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Al archivo le faltan las columnas: {', '.join(sorted(faltantes))}."
+        )
+
+    filas = []
+    for fila in lector:
+        filas.append((lector.line_num, {(k or "").strip(): (v or "").strip() for k, v in fila.items()}))
+        if len(filas) > MAX_FILAS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El archivo supera el máximo de {MAX_FILAS} filas."
+            )
+    return filas
+
+def _mensaje_validacion(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(l) for l in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+# --- Inserción ---
+
+def _insertar(db: Session, model, filas: List[dict], rol: str, columna_id, columna_email) -> int:
+    """INSERT por lotes del usuario y de su identidad (login), en la transacción actual."""
+    for inicio in range(0, len(filas), LOTE):
+        lote = filas[inicio:inicio + LOTE]
+        creados = db.execute(
+            insert(model).returning(columna_id, columna_email, model.hashed_password, sort_by_parameter_order=True),
+            lote
+        ).all()
+        db.execute(insert(models.IdentidadUsuario), [
+            {"email": email.lower(), "rol": rol, "id_usuario": id_usuario, "hashed_password": hashed_password}
+            for id_usuario, email, hashed_password in creados
+        ])
+    return len(filas)
+
+def _confirmar(db: Session, model, filas: List[dict], rol: str, columna_id, columna_email) -> int:
+    """Inserta todo y hace commit. Si otra petición creó uno de los usuarios mientras tanto, 409."""
+    if not filas:
+        return 0
+    try:
+        creados = _insertar(db, model, filas, rol, columna_id, columna_email)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Otro usuario se registró con alguno de estos datos durante la importación. Intente de nuevo."
+        )
+    invalidar_stats_admin()
+    return creados
+
+def _emails_registrados(db: Session, emails: List[str], columna_email) -> set:
+    """
+    Correos (en minúsculas) ya usados, en UNA consulta: en el índice de identidades
+    y en la tabla del rol (por usuarios que aún no estén en el índice).
+    """
+    return set(db.scalars(union(
+        select(models.IdentidadUsuario.email).filter(models.IdentidadUsuario.email.in_(emails)),
+        select(func.lower(columna_email)).filter(func.lower(columna_email).in_(emails)),
+    )))
+
+
+# --- Estudiantes ---
+
+def _resolver_programas(db: Session, filas) -> Tuple[Dict[int, int], Dict[str, int]]:
+    """Todos los programas del archivo (por id o por nombre) en UNA consulta."""
+    ids = {int(f["id_programa"]) for _, f in filas if f.get("id_programa", "").isdigit()}
+    nombres = {f["programa"].lower() for _, f in filas if f.get("programa") and not f.get("id_programa")}
+    programas = db.execute(
+        select(models.ProgramaAcademico.id_programa, models.ProgramaAcademico.nombre_programa)
+        .filter(or_(
+            models.ProgramaAcademico.id_programa.in_(ids),
+            func.lower(models.ProgramaAcademico.nombre_programa).in_(nombres)
+        ))
+    ).all()
+    return (
+        {p.id_programa: p.id_programa for p in programas},
+        {p.nombre_programa.lower(): p.id_programa for p in programas},
+    )
+
+def importar_estudiantes(db: Session, contenido: bytes) -> schemas.ImportacionResponse:
+    """
+    [ADMIN] Crea los estudiantes de un CSV con columnas nombre, apellido, email_institucional,
+    password e id_programa (o 'programa', con el nombre del programa).
+    """
+    filas = _leer_csv(contenido, COLUMNAS_ESTUDIANTES)
+    if not filas:
+        return schemas.ImportacionResponse(creados=0, errores=[])
+    por_id, por_nombre = _resolver_programas(db, filas)
+
+    errores: List[schemas.ErrorImportacion] = []
+    validos: List[Tuple[int, schemas.EstudianteCreate]] = []
+    vistos = set()
+    for linea, fila in filas:
+        referencia = fila.get("id_programa") or fila.get("programa", "")
+        id_programa: Optional[int] = por_id.get(int(referencia)) if referencia.isdigit() else por_nombre.get(referencia.lower())
+        if id_programa is None:
+            errores.append(schemas.ErrorImportacion(fila=linea, mensaje=f"El programa '{referencia}' no existe."))
+            continue
+        try:
+            estudiante = schemas.EstudianteCreate(**{**fila, "id_programa": id_programa})
+        except ValidationError as e:
+            errores.append(schemas.ErrorImportacion(fila=linea, mensaje=_mensaje_validacion(e)))
+            continue
+        email = estudiante.email_institucional.lower()
+        if email in vistos:
+            errores.append(schemas.ErrorImportacion(fila=linea, mensaje="El correo está repetido en el archivo."))
+            continue
+        vistos.add(email)
+        validos.append((linea, estudiante))
+
+    registrados = _emails_registrados(db, [e.email_institucional.lower() for _, e in validos],
+                                      models.Estudiante.email_institucional)
+    for linea, estudiante in validos:
+        if estudiante.email_institucional.lower() in registrados:
+            errores.append(schemas.ErrorImportacion(fila=linea, mensaje="El correo institucional ya está registrado."))
+    validos = [(linea, e) for linea, e in validos if e.email_institucional.lower() not in registrados]
+
+    hashes = security.hash_passwords([e.password for _, e in validos])
+    nuevos = [
+        {
+            "nombre": e.nombre,
+            "apellido": e.apellido,
+            "email_institucional": e.email_institucional,
+            "id_programa": e.id_programa,
+            "hashed_password": hashed,
+        }
+        for (_, e), hashed in zip(validos, hashes)
+    ]
+    creados = _confirmar(db, models.Estudiante, nuevos, "estudiante",
+                         models.Estudiante.id_estudiante, models.Estudiante.email_institucional)
+    return schemas.ImportacionResponse(creados=creados, errores=sorted(errores, key=lambda e: e.fila))
+
+
+# --- Empresas ---
+
+def importar_empresas(db: Session, contenido: bytes) -> schemas.ImportacionResponse:
+    """
+    [ADMIN] Crea las empresas de un CSV con columnas razon_social, nit, email_contacto,
+    password y (opcional) descripcion.
+    """
+    filas = _leer_csv(contenido, COLUMNAS_EMPRESAS)
+    if not filas:
+        return schemas.ImportacionResponse(creados=0, errores=[])
+
+    errores: List[schemas.ErrorImportacion] = []
+    validos: List[Tuple[int, schemas.EmpresaCreate]] = []
+    vistos = {"email": set(), "nit": set(), "razon_social": set()}
+    for linea, fila in filas:
+        try:
+            empresa = schemas.EmpresaCreate(**{**fila, "descripcion": fila.get("descripcion") or None})
+        except ValidationError as e:
+            errores.append(schemas.ErrorImportacion(fila=linea, mensaje=_mensaje_validacion(e)))
+            continue
+        llaves = {"email": empresa.email_contacto.lower(), "nit": empresa.nit, "razon_social": empresa.razon_social}
+        repetida = next((campo for campo, valor in llaves.items() if valor in vistos[campo]), None)
+        if repetida:
+            errores.append(schemas.ErrorImportacion(fila=linea, mensaje=f"El campo '{repetida}' está repetido en el archivo."))
+            continue
+        for campo, valor in llaves.items():
+            vistos[campo].add(valor)
+        validos.append((linea, empresa))
+
+    # Duplicados contra la BD: una consulta por cada campo único
+    registrados = {
+        "email": _emails_registrados(db, [e.email_contacto.lower() for _, e in validos], models.Empresa.email_contacto),
+        "nit": set(db.scalars(select(models.Empresa.nit).filter(models.Empresa.nit.in_([e.nit for _, e in validos])))),
+        "razon_social": set(db.scalars(select(models.Empresa.razon_social).filter(
+            models.Empresa.razon_social.in_([e.razon_social for _, e in validos])))),
+    }
+    mensajes = {
+        "email": "El correo electrónico ya está registrado.",
+        "nit": "El NIT de la empresa ya está registrado.",
+        "razon_social": "La razón social ya está registrada.",
+    }
+    nuevos_validos = []
+    for linea, empresa in validos:
+        llaves = {"email": empresa.email_contacto.lower(), "nit": empresa.nit, "razon_social": empresa.razon_social}
+        repetida = next((campo for campo, valor in llaves.items() if valor in registrados[campo]), None)
+        if repetida:
+            errores.append(schemas.ErrorImportacion(fila=linea, mensaje=mensajes[repetida]))
+        else:
+            nuevos_validos.append((linea, empresa))
+
+    hashes = security.hash_passwords([e.password for _, e in nuevos_validos])
+    nuevos = [
+        {
+            "razon_social": e.razon_social,
+            "nit": e.nit,
+            "email_contacto": e.email_contacto,
+            "descripcion": e.descripcion,
+            "hashed_password": hashed,
+        }
+        for (_, e), hashed in zip(nuevos_validos, hashes)
+    ]
+    creados = _confirmar(db, models.Empresa, nuevos, "empresa",
+                         models.Empresa.id_empresa, models.Empresa.email_contacto)
+    return schemas.ImportacionResponse(creados=creados, errores=sorted(errores, key=lambda e: e.fila))
@@ -0,0 +1,131 @@
+# /app/invalidacion.py
+# Invalidación de cachés entre workers (LISTEN/NOTIFY, sin Redis).
+# Cada worker tiene sus propias cachés en memoria (usuarios, KPIs, recomendaciones...):
+# un cambio hecho en un worker dejaba a los demás con datos viejos hasta que expiraran.
+# - Las cachés se registran con un prefijo de llave ('principal', 'stats', ...).
+# - Quien escribe, DESPUÉS de su commit, llama a invalidar('empresa:42', 'stats:admin', ...):
+#   se borran ya mismo en este worker y se publican en el canal para los demás.
+#   Una llave que termina en '*' borra todo lo que empieza así ('stats:estudiante:*').
+# - La publicación la hace un hilo aparte que agrupa las llaves de varias escrituras en
+#   pocos NOTIFY: el endpoint no espera a la BD para avisar.
+# - Cada worker recibe las llaves por su escucha (ver escucha.py) e ignora las propias.
+#   Si la escucha se reconecta (pudo perder avisos), vacía todas las cachés registradas.
+import json
+import logging
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import text
+
+from . import database, escucha
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CANAL = "sip_invalidacion"
+ORIGEN = uuid4().hex     # Identifica a este worker en los avisos
+MAX_PAYLOAD = 7000       # Postgres acepta hasta 8000 bytes por NOTIFY
+
+# prefijo -> (borrar una llave, vaciar todo)
+_registro: Dict[str, Tuple[Callable[[str], None], Callable[[], None]]] = {}
+
+
+def registrar(prefijo: str, borrar: Callable[[str], None], vaciar: Callable[[], None]) -> None:
+    """Registra una caché: las llaves 'prefijo:...' se le entregan a 'borrar'."""
+    _registro[prefijo] = (borrar, vaciar)
+
+def registrar_cache(prefijo: str, cache: TTLCache) -> None:
+    """Una TTLCache cuyas llaves son las mismas que se publican ('prefijo:...')."""
+    def borrar(llave: str) -> None:
+        if llave.endswith("*"):
+            cache.invalidate_prefix(llave[:-1])
+        else:
+            cache.invalidate(llave)
+    registrar(prefijo, borrar, cache.clear)
+
+
+def _borrar_local(llaves: Iterable[str]) -> None:
+    for llave in llaves:
+        registrada = _registro.get(llave.split(":", 1)[0])
+        if registrada is not None:
+            registrada[0](llave)
+
+def invalidar(*llaves: str) -> None:
+    """Después del commit: borra las llaves en este worker y avisa a los demás."""
+    _borrar_local(llaves)
+    avisar(*llaves)
+
+def avisar(*llaves: str) -> None:
+    """Solo avisa a los demás workers (este ya actualizó su copia, ej. el motor de recomendaciones)."""
+    for llave in llaves:
+        _publicador.poner(llave)
+
+
+# --- Publicación (hilo aparte) ---
+
+class Publicador:
+    """Agrupa las llaves pendientes y las envía en pocos NOTIFY por una conexión del pool."""
+
+    def __init__(self):
+        self._cola: "queue.Queue[str]" = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def poner(self, llave: str) -> None:
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._correr, name="sip-invalidacion", daemon=True)
+                self._hilo.start()
+        self._cola.put(llave)
+
+    def _correr(self) -> None:
+        while True:
+            llaves = {self._cola.get()}
+            while True: # Lo que se acumuló mientras tanto va en el mismo envío
+                try:
+                    llaves.add(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.enviar(sorted(llaves))
+            except Exception:
+                # Los demás workers quedan con datos viejos solo hasta que expire su TTL
+                logger.exception("No se pudieron publicar %s invalidaciones.", len(llaves))
+
+    @staticmethod
+    def enviar(llaves: list) -> None:
+        vacio = len(json.dumps({"origen": ORIGEN, "llaves": []}))
+        payloads, lote, tamano = [], [], vacio
+        for llave in llaves:
+            largo = len(json.dumps(llave)) + 2 # Con la coma y el espacio que la separan
+            if lote and tamano + largo > MAX_PAYLOAD:
+                payloads.append(json.dumps({"origen": ORIGEN, "llaves": lote}))
+                lote, tamano = [], vacio
+            lote.append(llave)
+            tamano += largo
+        payloads.append(json.dumps({"origen": ORIGEN, "llaves": lote}))
+        with database.engine.begin() as conexion:
+            conexion.execute(
+                text("SELECT pg_notify(:canal, p) FROM unnest(CAST(:payloads AS text[])) AS p"),
+                {"canal": CANAL, "payloads": payloads}
+            )
+
+
+_publicador = Publicador()
+
+
+# --- Recepción (en la escucha del worker) ---
+
+def _recibir(payload: str) -> None:
+    aviso = json.loads(payload)
+    if aviso.get("origen") != ORIGEN:
+        _borrar_local(aviso.get("llaves", ()))
+
+def _vaciar_todo() -> None:
+    for _, vaciar in _registro.values():
+        vaciar()
+
+
+escucha.registrar(CANAL, _recibir, al_reconectar=_vaciar_todo)
@@ -1,16 +1,28 @@
 # /app/main.py
 from fastapi import FastAPI
+from sqlalchemy.orm.exc import StaleDataError
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
-from .database import engine, Base
+from . import models, crud, busqueda, concurrencia, escucha, esquema
+from .database import engine, Base, SessionLocal
 
 # Importar TODOS tus routers
-from .routers import auth, admin, empresas, estudiantes, postulaciones
+from .routers import auth, admin, empresas, estudiantes, postulaciones, health, eventos
 
 # --- 1. CREACIÓN DE TABLAS ---
 # Esto crea las tablas basado en models.py si no existen
 Base.metadata.create_all(bind=engine)
 
+# Agrega a las tablas existentes las columnas e índices nuevos (solo si faltan), indexa en el
+# login unificado a los usuarios creados antes de que existiera y calcula el índice de
+# búsqueda de las vacantes que aún no lo tienen
+with SessionLocal() as db:
+    esquema.actualizar(db)
+    crud.sincronizar_identidades(db)
+    busqueda.indexar_vacantes_pendientes(db)
+
+# Escucha LISTEN/NOTIFY del worker: invalidaciones de caché de los demás workers y eventos (SSE)
+escucha.iniciar(engine)
+
 # --- 2. INSTANCIA PRINCIPAL DE APP ---
 app = FastAPI(
     title="Sistema Integrado de Prácticas (SIP)",
@@ -35,14 +47,20 @@ app.add_middleware(
     allow_credentials=True,      # Permite cookies/tokens
     allow_methods=["*"],         # Permite todos los métodos (GET, POST, etc.)
     allow_headers=["*"],         # Permite todos los headers
+    expose_headers=["X-Next-Cursor", "ETag"], # El frontend puede leer el cursor de paginación y la versión
 )
 
+# Dos escrituras cruzadas sobre la misma postulación/vacante: la segunda recibe 409
+app.add_exception_handler(StaleDataError, concurrencia.conflicto_handler)
+
 # --- 4. INCLUIR LOS ROUTERS (DEBEN IR DESPUÉS DE CORS) ---
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticación"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Administrador"])
 app.include_router(empresas.router, prefix="/api/empresas", tags=["Empresas"])
 app.include_router(estudiantes.router, prefix="/api/estudiantes", tags=["Estudiantes"])
 app.include_router(postulaciones.router, prefix="/api/postulaciones", tags=["Postulaciones"])
+app.include_router(health.router, prefix="/api/health", tags=["Salud"])
+app.include_router(eventos.router, prefix="/api/events", tags=["Eventos"])
 
 
 # --- 5. ENDPOINT RAÍZ ---
@@ -1,6 +1,7 @@
 from sqlalchemy import (Column, Integer, String, Text, ForeignKey, 
-                        DateTime, Enum, UniqueConstraint, Boolean)
-from sqlalchemy.orm import relationship
+                        DateTime, Enum, UniqueConstraint, Boolean, Index, text)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 import enum
 
@@ -54,6 +55,11 @@ class ProgramaAcademico(Base):
 
 class Empresa(Base):
     __tablename__ = "empresas"
+    __table_args__ = (
+        # Búsqueda aproximada (trigramas) por razón social
+        Index("ix_empresas_razon_social_trgm", "razon_social",
+              postgresql_using="gin", postgresql_ops={"razon_social": "gin_trgm_ops"}),
+    )
 
     id_empresa = Column(Integer, primary_key=True, index=True)
     razon_social = Column(String(200), nullable=False, unique=True)
@@ -83,8 +89,26 @@ class UsuarioUniversidad(Base):
     historiales_gestionados = relationship("HistorialEstadoPostulacion", back_populates="usuario_universidad")
 
 
+class IdentidadUsuario(Base):
+    """
+    Índice unificado de identidades para el login: un solo lookup por email
+    (en minúsculas) dice el rol, el id y el hash del usuario, sin importar su tabla.
+    """
+    __tablename__ = "identidades_usuario"
+    __table_args__ = (UniqueConstraint("rol", "id_usuario", name="uq_identidad_rol_id"),)
+
+    email = Column(String(100), primary_key=True) # Siempre en minúsculas
+    rol = Column(String(20), nullable=False)      # 'admin', 'estudiante' o 'empresa'
+    id_usuario = Column(Integer, nullable=False)  # Llave primaria en la tabla del rol
+    hashed_password = Column(String, nullable=False)
+
+
 class Estudiante(Base):
     __tablename__ = "estudiantes"
+    __table_args__ = (
+        # Listado del admin (orden y paginación por apellido)
+        Index("ix_estudiantes_apellido_id", "apellido", "id_estudiante"),
+    )
 
     id_estudiante = Column(Integer, primary_key=True, index=True)
     id_programa = Column(Integer, ForeignKey("programas_academicos.id_programa", ondelete="RESTRICT"), nullable=False)
@@ -104,6 +128,19 @@ class Estudiante(Base):
 
 class Vacante(Base):
     __tablename__ = "vacantes"
+    __table_args__ = (
+        # "Mis vacantes" de la empresa, de la más nueva a la más vieja
+        Index("ix_vacantes_empresa_fecha", "id_empresa", text("fecha_publicacion DESC"), text("id_vacante DESC")),
+        # Cola de revisión del admin (vacantes por estado)
+        Index("ix_vacantes_estado_fecha", "estado", text("fecha_publicacion DESC"), text("id_vacante DESC")),
+        # Catálogo del estudiante: solo las vacantes abiertas (índice parcial)
+        Index("ix_vacantes_abiertas_fecha", text("fecha_publicacion DESC"), text("id_vacante DESC"),
+              postgresql_where=text("estado = 'Abierta'")),
+        # Búsqueda de texto completo (ver busqueda.py) y aproximada por título
+        Index("ix_vacantes_busqueda", "busqueda", postgresql_using="gin"),
+        Index("ix_vacantes_titulo_trgm", "titulo_vacante",
+              postgresql_using="gin", postgresql_ops={"titulo_vacante": "gin_trgm_ops"}),
+    )
 
     id_vacante = Column(Integer, primary_key=True, index=True)
     id_empresa = Column(Integer, ForeignKey("empresas.id_empresa", ondelete="CASCADE"), nullable=False)
@@ -111,6 +148,12 @@ class Vacante(Base):
     descripcion_funciones = Column(Text, nullable=False)
     fecha_publicacion = Column(DateTime(timezone=True), server_default=func.now())
     estado = Column(Enum(EstadoVacanteEnum, native_enum=False), nullable=False, default=EstadoVacanteEnum.Abierta)
+    # tsvector para la búsqueda (lo mantiene busqueda.py). 'deferred': no se carga en las consultas normales
+    busqueda = deferred(Column(TSVECTOR, nullable=True))
+    # Control de concurrencia optimista: sube en cada cambio (ver concurrencia.py)
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relación: Una vacante pertenece a una empresa
     empresa = relationship("Empresa", back_populates="vacantes")
@@ -120,6 +163,16 @@ class Vacante(Base):
 
 class Postulacion(Base):
     __tablename__ = "postulaciones"
+    __table_args__ = (
+        # Postulaciones de una vacante (empresa) filtradas por estado
+        Index("ix_postulaciones_vacante_estado", "id_vacante", "estado_actual"),
+        # "Mis postulaciones" y KPIs del estudiante
+        Index("ix_postulaciones_estudiante_fecha", "id_estudiante", text("fecha_postulacion DESC"), text("id_postulacion DESC")),
+        # Colas del admin y seguimiento (por estado, de la más nueva a la más vieja)
+        Index("ix_postulaciones_estado_fecha", "estado_actual", text("fecha_postulacion DESC"), text("id_postulacion DESC")),
+        # Un estudiante solo puede postularse UNA vez a cada vacante
+        UniqueConstraint("id_estudiante", "id_vacante", name="uq_postulacion_estudiante_vacante"),
+    )
 
     id_postulacion = Column(Integer, primary_key=True, index=True)
     id_estudiante = Column(Integer, ForeignKey("estudiantes.id_estudiante", ondelete="CASCADE"), nullable=False)
@@ -128,6 +181,10 @@ class Postulacion(Base):
     estado_actual = Column(Enum(EstadoPostulacionEnum, native_enum=False), nullable=False, default=EstadoPostulacionEnum.Recibida)
     fecha_inicio_practica = Column(DateTime(timezone=True), nullable=True)
     fecha_fin_practica = Column(DateTime(timezone=True), nullable=True)
+    # Control de concurrencia optimista: sube en cada cambio (ver concurrencia.py)
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relación: Una postulación es de un estudiante
     estudiante = relationship("Estudiante", back_populates="postulaciones")
@@ -155,6 +212,13 @@ class DocumentoAdjunto(Base):
 
 class HistorialEstadoPostulacion(Base):
     __tablename__ = "historial_estados_postulacion"
+    __table_args__ = (
+        # Historial de una postulación en orden cronológico
+        Index("ix_historial_postulacion_fecha", "id_postulacion", "fecha_cambio"),
+        # Mensajes sin leer: conteo por rango (id_historial > marca de lectura) solo con el índice
+        Index("ix_historial_postulacion_id", "id_postulacion", "id_historial",
+              postgresql_include=["id_actor_estudiante"]),
+    )
 
     id_historial = Column(Integer, primary_key=True, index=True)
     id_postulacion = Column(Integer, ForeignKey("postulaciones.id_postulacion", ondelete="CASCADE"), nullable=False)
@@ -170,4 +234,36 @@ class HistorialEstadoPostulacion(Base):
     # Relación: Un historial es gestionado por un usuario de U
     usuario_universidad = relationship("UsuarioUniversidad", back_populates="historiales_gestionados")
     empresa = relationship("Empresa") # Nueva relación simple
-    estudiante = relationship("Estudiante") # Nueva relación simple
\ No newline at end of file
+    estudiante = relationship("Estudiante") # Nueva relación simple
+
+
+class LecturaHistorial(Base):
+    """
+    Marca de lectura por (actor, postulación): el último registro del historial
+    que el actor ya vio. Todo lo que tenga un id_historial mayor está "sin leer".
+    """
+    __tablename__ = "lecturas_historial"
+
+    rol = Column(String(20), primary_key=True)       # 'admin', 'estudiante' o 'empresa'
+    id_actor = Column(Integer, primary_key=True)     # Llave primaria en la tabla del rol
+    id_postulacion = Column(Integer, ForeignKey("postulaciones.id_postulacion", ondelete="CASCADE"), primary_key=True)
+    id_ultimo_historial = Column(Integer, nullable=False)
+    fecha_lectura = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class AsignacionRevision(Base):
+    """
+    Préstamo (lease) de un elemento de las colas de revisión a un coordinador:
+    mientras no expire, los demás no lo reciben al pedir trabajo (ver revisiones.py).
+    """
+    __tablename__ = "asignaciones_revision"
+    __table_args__ = (
+        # Renovar / liberar los préstamos de un coordinador
+        Index("ix_asignaciones_revision_coordinador", "id_coordinador", "expira"),
+    )
+
+    tipo = Column(String(20), primary_key=True)   # 'postulacion' o 'vacante'
+    id_item = Column(Integer, primary_key=True)   # id_postulacion o id_vacante
+    id_coordinador = Column(Integer, ForeignKey("usuarios_universidad.id_usuario", ondelete="CASCADE"), nullable=False)
+    fecha_asignacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expira = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,82 @@
+# /app/pagination.py
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, List
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import DateTime, literal, tuple_
+
+MAX_LIMIT = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Pagina:
+    """
+    Parámetros de paginación por cursor (keyset), usados como dependencia.
+    Sin 'limit' se retorna la lista completa (como antes).
+    La siguiente página se indica en el header 'X-Next-Cursor' de la respuesta.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Máximo de elementos por página."),
+        cursor: Optional[str] = Query(None, description="Valor de 'X-Next-Cursor' de la página anterior.")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.next_cursor: Optional[str] = None # Lo llena paginar_resultados()
+
+
+def encode_cursor(valores: list) -> str:
+    """Convierte los valores de las llaves de orden en un cursor opaco."""
+    valores = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+def decode_cursor(cursor: str, columnas) -> list:
+    """Lee un cursor. Si no es válido, responde 400."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(valores, list) or len(valores) != len(columnas):
+            raise ValueError
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for col, v in zip(columnas, valores)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El cursor de paginación no es válido.")
+
+
+def paginar(query, columnas, pagina: Optional[Pagina], descendente: bool = False):
+    """
+    Ordena por las columnas dadas (la última debe ser la llave primaria, como desempate),
+    aplica el cursor con una comparación de tuplas (aprovecha los índices) y el límite.
+    Sirve tanto para db.query() como para select().
+    """
+    query = query.order_by(*[col.desc() if descendente else col.asc() for col in columnas])
+    if pagina is None:
+        return query
+
+    if pagina.cursor:
+        valores = decode_cursor(pagina.cursor, columnas)
+        llave = tuple_(*columnas)
+        cursor = tuple_(*[literal(v, type_=col.type) for col, v in zip(columnas, valores)])
+        query = query.filter(llave < cursor if descendente else llave > cursor)
+
+    if pagina.limit:
+        query = query.limit(pagina.limit + 1) # Uno extra para saber si hay otra página
+    return query
+
+def paginar_resultados(items: List, columnas, pagina: Optional[Pagina]) -> List:
+    """Recorta el elemento extra y deja en 'pagina.next_cursor' el cursor de la siguiente página."""
+    if pagina is None or not pagina.limit or len(items) <= pagina.limit:
+        return items
+    items = items[:pagina.limit]
+    pagina.next_cursor = encode_cursor([getattr(items[-1], col.key) for col in columnas])
+    return items
+
+def set_next_cursor(response: Response, pagina: Pagina) -> None:
+    """Publica el cursor de la siguiente página en los headers de la respuesta."""
+    if pagina.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagina.next_cursor
@@ -0,0 +1,320 @@
+# /app/recomendaciones.py
+# Recomendación de vacantes para estudiantes (TF-IDF + similitud coseno).
+# - Cada vacante abierta es un documento (título con doble peso + descripción).
+# - El perfil del estudiante es el de su programa académico (nombre + facultad), así que
+#   el top-k se precalcula POR PROGRAMA: todos los estudiantes de un programa lo comparten.
+# - Los puntajes salen de UN producto de matrices dispersas (programas x vacantes),
+#   nunca de un ciclo de Python por cada par.
+# - Al aprobar/cerrar una vacante el modelo se actualiza en memoria (sin releer la BD ni
+#   recalcular todo: solo se puntúa la vacante nueva contra cada programa) y se avisa a
+#   los demás workers, que lo reconstruyen desde la BD en su siguiente uso (ver invalidacion.py).
+#   Igual se reconstruye cada SIP_RECOMENDACIONES_TTL segundos, por si algún aviso se perdió
+#   (y así se corrige el IDF, que las actualizaciones incrementales no recalculan).
+# - La reconstrucción lee las filas con la sesión async y calcula en un hilo aparte (nunca en
+#   el event loop), y es una sola a la vez: las peticiones que llegan mientras tanto la esperan.
+import asyncio
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import anyio
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import invalidacion, models
+from .crud import CARGA_EMPRESA
+
+TOP_K = 50  # Vacantes precalculadas por programa (de ahí se descartan las ya postuladas)
+RECOMENDACIONES_TTL = float(os.getenv("SIP_RECOMENDACIONES_TTL", "300"))
+LARGO_RAIZ = 6  # Raíz aproximada: "desarrollo"/"desarrollador" -> "desarr"
+
+_STOPWORDS = {
+    "para", "por", "con", "sin", "los", "las", "del", "una", "uno", "unos", "unas", "que",
+    "como", "mas", "sus", "ser", "son", "sobre", "entre", "desde", "hasta", "este", "esta",
+    "estos", "estas", "ese", "esa", "otro", "otra", "tambien", "cada", "todo", "toda",
+    "todos", "todas", "donde", "cuando", "muy", "the", "and", "for",
+}
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Minúsculas, sin tildes, sin palabras vacías, y cada palabra recortada a su raíz aproximada."""
+    texto = unicodedata.normalize("NFKD", (texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t[:LARGO_RAIZ] for t in re.findall(r"[a-z0-9]+", texto) if len(t) > 2 and t not in _STOPWORDS]
+
+def texto_vacante(titulo: str, descripcion: str) -> str:
+    return f"{titulo} {titulo} {descripcion}"
+
+def texto_programa(nombre_programa: str, facultad: str) -> str:
+    return f"{nombre_programa} {facultad}"
+
+def conteos(texto: str, vocabulario: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(índices de términos, conteos) de un texto; los términos nuevos se agregan al vocabulario."""
+    indices = [vocabulario.setdefault(t, len(vocabulario)) for t in tokenizar(texto)]
+    return np.unique(np.asarray(indices, dtype=np.int64), return_counts=True)
+
+
+class MotorRecomendaciones:
+    """Modelo TF-IDF en memoria (uno por worker). Seguro entre hilos."""
+
+    def __init__(self, top_k: int = TOP_K, ttl: float = RECOMENDACIONES_TTL):
+        self.top_k = top_k
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        """Olvida todo: el siguiente uso reconstruye el modelo desde la BD."""
+        with self._lock:
+            self._vocabulario: Dict[str, int] = {}
+            self._idf = np.empty(0)
+            self._idf_nuevo = 1.0 # IDF de un término que ninguna vacante tenía al construir
+            # Vectores TF-IDF ya normalizados (una fila por documento, en el orden de sus ids):
+            # se guardan para puntuar SOLO lo que cambia (una vacante nueva = una columna)
+            self._ids_vacantes = np.empty(0, dtype=np.int64)
+            self._matriz_vacantes = sparse.csr_matrix((0, 0))
+            self._ids_programas: List[int] = []
+            self._matriz_programas = sparse.csr_matrix((0, 0))
+            self._top: Dict[int, List[Tuple[int, float]]] = {}
+            self._construido: Optional[float] = None
+            self._cambios = 0 # Sube con cada cambio: una reconstrucción sabe si leyó datos viejos
+            self._reconstruccion: Optional[asyncio.Task] = None
+
+    # --- Construcción del modelo ---
+
+    @staticmethod
+    def _matriz(documentos: Iterable[Tuple[np.ndarray, np.ndarray]], n_filas: int, n_terminos: int) -> sparse.csr_matrix:
+        """Matriz dispersa (documentos x términos) con TF sublineal: 1 + log(conteo)."""
+        documentos = list(documentos)
+        filas = np.repeat(np.arange(n_filas), [len(indices) for indices, _ in documentos])
+        columnas = np.concatenate([indices for indices, _ in documentos]) if documentos else np.empty(0, np.int64)
+        frecuencias = np.concatenate([c for _, c in documentos]) if documentos else np.empty(0)
+        return sparse.csr_matrix(
+            (1.0 + np.log(frecuencias), (filas, columnas)),
+            shape=(n_filas, n_terminos)
+        )
+
+    @staticmethod
+    def _normalizar(matriz: sparse.csr_matrix) -> sparse.csr_matrix:
+        normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+        normas[normas == 0] = 1.0
+        return (sparse.diags(1.0 / normas) @ matriz).tocsr()
+
+    def _mejores(self, puntajes: np.ndarray, ids_vacantes: np.ndarray) -> List[List[Tuple[int, float]]]:
+        """El top-k (id_vacante, puntaje) de cada fila de 'puntajes' (filas x vacantes)."""
+        if puntajes.shape[1] == 0:
+            return [[] for _ in range(puntajes.shape[0])]
+        k = min(self.top_k, puntajes.shape[1])
+        mejores = np.argpartition(-puntajes, k - 1, axis=1)[:, :k]
+        mejores_puntajes = np.take_along_axis(puntajes, mejores, axis=1)
+        orden = np.argsort(-mejores_puntajes, axis=1, kind="stable")
+        mejores = np.take_along_axis(mejores, orden, axis=1)
+        mejores_puntajes = np.take_along_axis(mejores_puntajes, orden, axis=1)
+        return [
+            [(int(id_vacante), float(puntaje)) for id_vacante, puntaje in zip(ids_vacantes[mejores[i]], mejores_puntajes[i]) if puntaje > 0]
+            for i in range(puntajes.shape[0])
+        ]
+
+    async def asegurar(self, db: AsyncSession) -> None:
+        """
+        Reconstruye el modelo si hace falta (primer uso, TTL vencido o aviso de otro worker).
+        Una sola reconstrucción a la vez: las peticiones que llegan mientras tanto esperan la misma.
+        """
+        if not self.necesita_reconstruir():
+            return
+        loop = asyncio.get_running_loop()
+        tarea = self._reconstruccion
+        if tarea is None or tarea.done() or tarea.get_loop() is not loop:
+            tarea = self._reconstruccion = loop.create_task(self._reconstruir(db.bind))
+        await asyncio.shield(tarea) # Si esta petición se cancela, la reconstrucción sigue para las demás
+
+    async def _reconstruir(self, bind) -> None:
+        """Lee las filas con consultas async y hace el cálculo en un hilo: el event loop no se bloquea."""
+        with self._lock:
+            cambios = self._cambios
+        # Sesión propia: la tarea puede seguir viva después de la petición que la inició
+        async with AsyncSession(bind) as db:
+            vacantes = (await db.execute(
+                select(models.Vacante.id_vacante, models.Vacante.titulo_vacante, models.Vacante.descripcion_funciones)
+                .filter(models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value)
+            )).all()
+            programas = (await db.execute(
+                select(models.ProgramaAcademico.id_programa, models.ProgramaAcademico.nombre_programa, models.ProgramaAcademico.facultad)
+                .filter(models.ProgramaAcademico.esta_activo == True)
+            )).all()
+        await anyio.to_thread.run_sync(self._construir, vacantes, programas, cambios)
+
+    def _construir(self, vacantes, programas, cambios: int) -> None:
+        """
+        Tokeniza, calcula el IDF y el top-k de TODOS los programas con un producto de matrices,
+        SIN el lock; al final reemplaza el modelo de una vez.
+        """
+        vocabulario: Dict[str, int] = {}
+        docs_vacantes = [conteos(texto_vacante(v.titulo_vacante, v.descripcion_funciones), vocabulario) for v in vacantes]
+        docs_programas = [conteos(texto_programa(p.nombre_programa, p.facultad), vocabulario) for p in programas]
+        ids_vacantes = np.fromiter((v.id_vacante for v in vacantes), dtype=np.int64, count=len(vacantes))
+        ids_programas = [p.id_programa for p in programas]
+
+        matriz_vacantes = self._matriz(docs_vacantes, len(docs_vacantes), len(vocabulario))
+        matriz_programas = self._matriz(docs_programas, len(docs_programas), len(vocabulario))
+
+        # IDF suavizado, calculado sobre el catálogo de vacantes
+        df = np.bincount(matriz_vacantes.indices, minlength=len(vocabulario))
+        idf = np.log((1.0 + len(ids_vacantes)) / (1.0 + df)) + 1.0
+        matriz_vacantes = self._normalizar(matriz_vacantes @ sparse.diags(idf))
+        matriz_programas = self._normalizar(matriz_programas @ sparse.diags(idf))
+
+        # Similitud coseno de todos los programas contra todas las vacantes
+        puntajes = (matriz_programas @ matriz_vacantes.T).toarray()
+        top = dict(zip(ids_programas, self._mejores(puntajes, ids_vacantes)))
+
+        with self._lock:
+            self._vocabulario, self._idf, self._idf_nuevo = vocabulario, idf, float(np.log(1.0 + len(ids_vacantes)) + 1.0)
+            self._ids_vacantes, self._matriz_vacantes = ids_vacantes, matriz_vacantes
+            self._ids_programas, self._matriz_programas = ids_programas, matriz_programas
+            self._top = top
+            # Si algo cambió después de leer las filas, este modelo puede no tenerlo:
+            # se usa igual, pero la siguiente petición lo vuelve a reconstruir
+            self._construido = time.monotonic() if self._cambios == cambios else float("-inf")
+
+    def necesita_reconstruir(self) -> bool:
+        return self._construido is None or time.monotonic() - self._construido > self.ttl
+
+    def caducar(self) -> None:
+        """Otro worker cambió el catálogo: se sigue usando el modelo actual hasta reconstruirlo."""
+        with self._lock:
+            self._cambios += 1
+            if self._construido is not None:
+                self._construido = float("-inf")
+
+    # --- Actualizaciones incrementales ---
+    # Solo se puntúa lo que cambió, con el IDF de la última construcción: una vacante nueva
+    # mueve un poco el IDF de todo el catálogo, y eso se corrige en la siguiente reconstrucción.
+
+    def _vectores(self, textos: List[str]) -> sparse.csr_matrix:
+        """Vectores TF-IDF normalizados de documentos nuevos, con el IDF actual. (Con el lock tomado.)"""
+        documentos = [conteos(texto, self._vocabulario) for texto in textos]
+        n_terminos = len(self._vocabulario)
+        if n_terminos > len(self._idf):
+            # Términos que el modelo no conocía: columnas vacías en las matrices guardadas
+            self._idf = np.concatenate([self._idf, np.full(n_terminos - len(self._idf), self._idf_nuevo)])
+            self._matriz_vacantes.resize((self._matriz_vacantes.shape[0], n_terminos))
+            self._matriz_programas.resize((self._matriz_programas.shape[0], n_terminos))
+        return self._normalizar(self._matriz(documentos, len(documentos), n_terminos) @ sparse.diags(self._idf))
+
+    def _quitar(self, ids_vacantes: set) -> None:
+        """Saca las vacantes de la matriz y de los top-k; los top-k que quedan cortos se recalculan. (Con el lock tomado.)"""
+        mascara = ~np.isin(self._ids_vacantes, list(ids_vacantes))
+        if mascara.all():
+            return
+        self._ids_vacantes = self._ids_vacantes[mascara]
+        self._matriz_vacantes = self._matriz_vacantes[mascara]
+
+        cortos = []
+        for i, id_programa in enumerate(self._ids_programas):
+            top = self._top.get(id_programa, [])
+            restantes = [(id_vacante, puntaje) for id_vacante, puntaje in top if id_vacante not in ids_vacantes]
+            if len(restantes) < len(top):
+                self._top[id_programa] = restantes
+                if len(top) == self.top_k: # Pudo haber más allá del top-k
+                    cortos.append(i)
+        if cortos:
+            puntajes = (self._matriz_programas[cortos] @ self._matriz_vacantes.T).toarray()
+            for i, top in zip(cortos, self._mejores(puntajes, self._ids_vacantes)):
+                self._top[self._ids_programas[i]] = top
+
+    def agregar_vacante(self, id_vacante: int, titulo: str, descripcion: str) -> None:
+        """Una vacante quedó 'Abierta'. Si el modelo aún no existe, la recogerá al construirse."""
+        self.agregar_vacantes([(id_vacante, titulo, descripcion)])
+
+    def agregar_vacantes(self, vacantes: Iterable[Tuple[int, str, str]]) -> None:
+        """Varias vacantes (id, título, descripción) a la vez: una columna de puntajes por vacante."""
+        invalidacion.avisar("recomendaciones:vacantes")
+        vacantes = list(vacantes)
+        with self._lock:
+            self._cambios += 1
+            if self._construido is None or not vacantes:
+                return
+            ids = np.asarray([id_vacante for id_vacante, _, _ in vacantes], dtype=np.int64)
+            self._quitar(set(ids.tolist())) # Por si alguna ya estaba
+            nuevas = self._vectores([texto_vacante(titulo, descripcion) for _, titulo, descripcion in vacantes])
+            self._ids_vacantes = np.concatenate([self._ids_vacantes, ids])
+            self._matriz_vacantes = sparse.vstack([self._matriz_vacantes, nuevas], format="csr")
+
+            # Cada programa compara su top-k con las nuevas (programas x nuevas)
+            puntajes = (self._matriz_programas @ nuevas.T).toarray()
+            for i, id_programa in enumerate(self._ids_programas):
+                candidatas = [(int(id_vacante), float(puntaje)) for id_vacante, puntaje in zip(ids, puntajes[i]) if puntaje > 0]
+                if candidatas:
+                    top = self._top.get(id_programa, []) + candidatas
+                    top.sort(key=lambda par: -par[1])
+                    self._top[id_programa] = top[:self.top_k]
+
+    def quitar_vacante(self, id_vacante: int) -> None:
+        """Una vacante dejó de estar abierta (cerrada o cubierta)."""
+        self.quitar_vacantes([id_vacante])
+
+    def quitar_vacantes(self, ids_vacantes: Iterable[int]) -> None:
+        invalidacion.avisar("recomendaciones:vacantes")
+        with self._lock:
+            self._cambios += 1
+            self._quitar(set(ids_vacantes))
+
+    def agregar_programa(self, id_programa: int, nombre_programa: str, facultad: str) -> None:
+        """Un programa que el modelo no tenía: se puntúa solo su fila."""
+        with self._lock:
+            if self._construido is None or id_programa in self._top:
+                return
+            fila = self._vectores([texto_programa(nombre_programa, facultad)])
+            self._ids_programas.append(id_programa)
+            self._matriz_programas = sparse.vstack([self._matriz_programas, fila], format="csr")
+            self._top[id_programa] = self._mejores((fila @ self._matriz_vacantes.T).toarray(), self._ids_vacantes)[0]
+
+    # --- Consulta ---
+
+    def recomendar(self, id_programa: int, excluir: Iterable[int] = (), limite: int = 10) -> List[Tuple[int, float]]:
+        """(id_vacante, puntaje) de mayor a menor, sin las vacantes de 'excluir'."""
+        excluir = set(excluir)
+        top = self._top.get(id_programa, [])
+        return [(id_vacante, puntaje) for id_vacante, puntaje in top if id_vacante not in excluir][:limite]
+
+
+# Un motor por proceso (worker)
+motor = MotorRecomendaciones()
+invalidacion.registrar("recomendaciones", lambda llave: motor.caducar(), motor.caducar)
+
+
+async def recomendar_vacantes(db: AsyncSession, estudiante: models.Estudiante, limite: int = 10) -> List[dict]:
+    """
+    [ESTUDIANTE] Vacantes recomendadas para el estudiante (según su programa),
+    sin las que ya se postuló. Cada elemento: {"vacante": Vacante, "puntaje": float}.
+    """
+    await motor.asegurar(db)
+    programa = estudiante.programa
+    motor.agregar_programa(programa.id_programa, programa.nombre_programa, programa.facultad) # Programa nuevo
+
+    postuladas = await db.scalars(
+        select(models.Postulacion.id_vacante).filter(models.Postulacion.id_estudiante == estudiante.id_estudiante)
+    )
+    candidatas = motor.recomendar(programa.id_programa, excluir=postuladas.all(), limite=limite)
+    if not candidatas:
+        return []
+
+    vacantes = await db.scalars(
+        select(models.Vacante)
+        .options(CARGA_EMPRESA)
+        .filter(
+            models.Vacante.id_vacante.in_([id_vacante for id_vacante, _ in candidatas]),
+            models.Vacante.estado == models.EstadoVacanteEnum.Abierta.value # Por si otro worker la cerró
+        )
+    )
+    por_id = {v.id_vacante: v for v in vacantes.all()}
+    return [
+        {"vacante": por_id[id_vacante], "puntaje": puntaje}
+        for id_vacante, puntaje in candidatas if id_vacante in por_id
+    ]
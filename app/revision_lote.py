@@ -0,0 +1,124 @@
+# /app/revision_lote.py
+# Aprobación / rechazo en lote para las colas de revisión del admin (inicio de semestre).
+# Cada lote es UNA sentencia condicional (UPDATE ... WHERE estado = :esperado RETURNING),
+# así que las transiciones inválidas (o ya hechas por otra petición) simplemente no se aplican.
+# Las postulaciones pasan por la máquina de estados (ver transiciones.py).
+# El resultado dice, por cada id y en el orden de la petición, si se aplicó o por qué no.
+from typing import Dict, List, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import eventos, models, schemas, recomendaciones, transiciones
+from .crud import invalidar_stats_admin, invalidar_stats_estudiante
+
+MAX_LOTE = 1000
+
+
+def _validar_tamano(ids: Sequence[int]) -> None:
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote está vacío.")
+    if len(ids) > MAX_LOTE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote supera el máximo de {MAX_LOTE} elementos."
+        )
+
+def _resultados(ids: Sequence[int], errores: Dict[int, str], estado: str) -> schemas.ResultadoLoteResponse:
+    """Un resultado por id (en el orden recibido); un id repetido solo se aplica la primera vez."""
+    resultados = []
+    vistos = set()
+    for id_ in ids:
+        if id_ in vistos:
+            resultados.append(schemas.ResultadoLoteItem(id=id_, ok=False, detalle="El id está repetido en el lote."))
+        elif id_ in errores:
+            resultados.append(schemas.ResultadoLoteItem(id=id_, ok=False, detalle=errores[id_]))
+        else:
+            resultados.append(schemas.ResultadoLoteItem(id=id_, ok=True, estado=estado))
+        vistos.add(id_)
+    return schemas.ResultadoLoteResponse(aplicados=sum(r.ok for r in resultados), resultados=resultados)
+
+
+# --- Vacantes ---
+
+def evento_vacante_aprobada(id_vacante: int, id_empresa: int) -> dict:
+    """A la empresa dueña, a los estudiantes (catálogo nuevo) y a la universidad (sale de la cola)."""
+    return eventos.evento(
+        eventos.VACANTE_APROBADA,
+        [eventos.destinatario("empresa", id_empresa), eventos.destinatario("estudiante"), eventos.destinatario("admin")],
+        id_vacante=id_vacante
+    )
+
+def aprobar_vacantes(db: Session, ids_vacantes: List[int]) -> schemas.ResultadoLoteResponse:
+    """[ADMIN] Pasa a 'Abierta' las vacantes que estén 'En Revisión'."""
+    _validar_tamano(ids_vacantes)
+    aprobadas = db.execute(
+        update(models.Vacante)
+        .where(
+            models.Vacante.id_vacante.in_(ids_vacantes),
+            models.Vacante.estado == models.EstadoVacanteEnum.En_Revision
+        )
+        .values(estado=models.EstadoVacanteEnum.Abierta, version=models.Vacante.version + 1)
+        .returning(models.Vacante.id_vacante, models.Vacante.id_empresa,
+                   models.Vacante.titulo_vacante, models.Vacante.descripcion_funciones)
+        .execution_options(synchronize_session=False)
+    ).all()
+    eventos.publicar(db, [evento_vacante_aprobada(v.id_vacante, v.id_empresa) for v in aprobadas])
+    db.commit()
+
+    fallidas = set(ids_vacantes) - {v.id_vacante for v in aprobadas}
+    existentes = set(db.scalars(
+        select(models.Vacante.id_vacante).filter(models.Vacante.id_vacante.in_(fallidas))
+    )) if fallidas else set()
+    errores = {
+        id_vacante: "La vacante no está en estado 'En Revisión'." if id_vacante in existentes else "La vacante no existe."
+        for id_vacante in fallidas
+    }
+
+    if aprobadas:
+        invalidar_stats_admin()
+        invalidar_stats_estudiante() # Cambió el catálogo de vacantes abiertas
+        recomendaciones.motor.agregar_vacantes(
+            (v.id_vacante, v.titulo_vacante, v.descripcion_funciones) for v in aprobadas
+        )
+    return _resultados(ids_vacantes, errores, models.EstadoVacanteEnum.Abierta.value)
+
+
+# --- Postulaciones ---
+
+def _decidir(db: Session, transicion: transiciones.Transicion, admin, cambios: List[transiciones.Cambio]) -> schemas.ResultadoLoteResponse:
+    ids = [c.id_postulacion for c in cambios]
+    _validar_tamano(ids)
+    _, errores = transiciones.ejecutar(db, transicion, admin, cambios)
+    return _resultados(ids, {id_: detalle for id_, (_, detalle) in errores.items()}, transicion.destino.value)
+
+def aprobar_postulaciones(
+    db: Session,
+    items: List[schemas.AprobacionPostulacionLoteItem],
+    admin: models.UsuarioUniversidad
+) -> schemas.ResultadoLoteResponse:
+    """
+    [ADMIN] Aprobación final de varias postulaciones, cada una con sus fechas y comentarios.
+    Deja las vacantes 'Cubierta' y registra cada aprobación en el historial.
+    """
+    return _decidir(db, transiciones.APROBAR_UNIVERSIDAD, admin, [
+        transiciones.Cambio(
+            item.id_postulacion,
+            comentarios=item.comentarios,
+            fecha_inicio_practica=item.fecha_inicio_practica,
+            fecha_fin_practica=item.fecha_fin_practica,
+            version=item.version
+        )
+        for item in items
+    ])
+
+def rechazar_postulaciones(
+    db: Session,
+    items: List[schemas.RechazoPostulacionLoteItem],
+    admin: models.UsuarioUniversidad
+) -> schemas.ResultadoLoteResponse:
+    """[ADMIN] Rechazo final de varias postulaciones, cada una con su comentario en el historial."""
+    return _decidir(db, transiciones.RECHAZAR_UNIVERSIDAD, admin, [
+        transiciones.Cambio(item.id_postulacion, comentarios=item.comentarios, version=item.version) for item in items
+    ])
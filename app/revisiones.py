@@ -0,0 +1,141 @@
+# /app/revisiones.py
+# Colas de revisión del admin repartidas entre coordinadores (préstamos / leases).
+# En vez de que cada coordinador descargue TODAS las pendientes y compita por las mismas,
+# cada uno pide las siguientes N y se le prestan por un tiempo (AsignacionRevision):
+# - Las candidatas se leen con SELECT ... FOR UPDATE SKIP LOCKED: dos coordinadores que
+#   piden trabajo al mismo tiempo se saltan las filas que el otro está tomando, sin esperarse.
+# - Quedan fuera las que otro coordinador tiene prestadas y sin expirar; las propias se
+#   renuevan (pedir trabajo de nuevo devuelve el mismo lote, completado hasta N).
+#   El upsert lo vuelve a verificar: un préstamo vigente de otro nunca se sobrescribe.
+# - Un préstamo vencido vuelve solo a la cola. Las transiciones no exigen el préstamo:
+#   es una forma de repartir el trabajo, no un permiso.
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, delete, exists, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .crud import CARGA_EMPRESA, CARGA_POSTULACION
+
+TIPO_POSTULACION = "postulacion"
+TIPO_VACANTE = "vacante"
+DURACION_PRESTAMO = timedelta(seconds=int(os.getenv("SIP_REVISION_PRESTAMO_SEGUNDOS", "900")))
+MAX_POR_PEDIDO = 100
+
+# Cada cola: tipo -> (modelo, columna id, columna de antigüedad, condición de "pendiente")
+COLAS = {
+    TIPO_POSTULACION: (
+        models.Postulacion, models.Postulacion.id_postulacion, models.Postulacion.fecha_postulacion,
+        models.Postulacion.estado_actual == models.EstadoPostulacionEnum.En_Revision_Universidad,
+    ),
+    TIPO_VACANTE: (
+        models.Vacante, models.Vacante.id_vacante, models.Vacante.fecha_publicacion,
+        models.Vacante.estado == models.EstadoVacanteEnum.En_Revision,
+    ),
+}
+
+
+def _candidatas(db: Session, tipo: str, id_coordinador: int, n: int) -> list:
+    """
+    Las N pendientes más antiguas que nadie más tiene prestadas, bloqueadas
+    hasta el commit. Las filas que otro está tomando en este momento se saltan.
+    """
+    model, columna_id, columna_fecha, pendiente = COLAS[tipo]
+    asignacion = models.AsignacionRevision
+    prestada_a_otro = exists().where(
+        asignacion.tipo == tipo,
+        asignacion.id_item == columna_id,
+        asignacion.id_coordinador != id_coordinador,
+        asignacion.expira > func.now(),
+    )
+    return db.execute(
+        select(columna_id.label("id_item"), columna_fecha.label("fecha"))
+        .filter(pendiente, ~prestada_a_otro)
+        .order_by(columna_fecha, columna_id)
+        .limit(n)
+        .with_for_update(of=model, skip_locked=True)
+    ).all()
+
+def pedir(db: Session, admin: models.UsuarioUniversidad, n: int, tipo: Optional[str] = None) -> schemas.RevisionesAsignadasResponse:
+    """
+    [ADMIN] Presta al coordinador las siguientes N pendientes (las más antiguas primero)
+    de una cola o de las dos, y las retorna.
+    """
+    asignacion = models.AsignacionRevision
+    # Los préstamos vencidos no le sirven a nadie
+    db.execute(delete(asignacion).where(asignacion.expira <= func.now()))
+
+    tipos = [tipo] if tipo else [TIPO_POSTULACION, TIPO_VACANTE]
+    candidatas = [(t, fila) for t in tipos for fila in _candidatas(db, t, admin.id_usuario, n)]
+    candidatas = sorted(candidatas, key=lambda c: (c[1].fecha, c[1].id_item))[:n]
+
+    expira = datetime.now(timezone.utc) + DURACION_PRESTAMO
+    prestadas = set()
+    if candidatas:
+        stmt = insert(asignacion).values([
+            {"tipo": t, "id_item": fila.id_item, "id_coordinador": admin.id_usuario, "expira": expira}
+            for t, fila in candidatas
+        ])
+        # Solo se sobrescribe un préstamo vencido o propio. El de otro coordinador que hizo
+        # commit después de leer las candidatas (READ COMMITTED no lo ve) se respeta:
+        # esa fila no se actualiza, no vuelve en el RETURNING y no se le entrega a este.
+        prestadas = set(db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[asignacion.tipo, asignacion.id_item],
+                set_={"id_coordinador": stmt.excluded.id_coordinador, "expira": stmt.excluded.expira,
+                      "fecha_asignacion": func.now()},
+                where=(asignacion.expira <= func.now()) | (asignacion.id_coordinador == stmt.excluded.id_coordinador)
+            ).returning(asignacion.tipo, asignacion.id_item)
+        ).tuples().all())
+    db.commit()
+
+    ids = {t: [fila.id_item for c, fila in candidatas if c == t and (t, fila.id_item) in prestadas] for t in COLAS}
+    postulaciones = db.scalars(
+        select(models.Postulacion).options(*CARGA_POSTULACION)
+        .filter(models.Postulacion.id_postulacion.in_(ids[TIPO_POSTULACION]))
+        .order_by(models.Postulacion.fecha_postulacion, models.Postulacion.id_postulacion)
+    ).all() if ids[TIPO_POSTULACION] else []
+    vacantes = db.scalars(
+        select(models.Vacante).options(CARGA_EMPRESA)
+        .filter(models.Vacante.id_vacante.in_(ids[TIPO_VACANTE]))
+        .order_by(models.Vacante.fecha_publicacion, models.Vacante.id_vacante)
+    ).all() if ids[TIPO_VACANTE] else []
+    return schemas.RevisionesAsignadasResponse(
+        expira=expira if prestadas else None,
+        postulaciones=postulaciones,
+        vacantes=vacantes,
+    )
+
+
+def _mias(admin: models.UsuarioUniversidad, datos: schemas.RevisionesInput):
+    """Los préstamos del coordinador; si se enviaron ids, solo esos."""
+    asignacion = models.AsignacionRevision
+    condiciones = [asignacion.id_coordinador == admin.id_usuario]
+    elegidas = [
+        and_(asignacion.tipo == tipo, asignacion.id_item.in_(ids))
+        for tipo, ids in ((TIPO_POSTULACION, datos.postulaciones), (TIPO_VACANTE, datos.vacantes)) if ids
+    ]
+    if elegidas:
+        condiciones.append(or_(*elegidas))
+    return condiciones
+
+def renovar(db: Session, admin: models.UsuarioUniversidad, datos: schemas.RevisionesInput) -> schemas.RevisionesRenovadasResponse:
+    """[ADMIN] Extiende los préstamos vigentes del coordinador (los vencidos ya pudieron ser de otro)."""
+    asignacion = models.AsignacionRevision
+    expira = datetime.now(timezone.utc) + DURACION_PRESTAMO
+    renovadas = db.execute(
+        update(asignacion)
+        .where(*_mias(admin, datos), asignacion.expira > func.now())
+        .values(expira=expira)
+    ).rowcount
+    db.commit()
+    return schemas.RevisionesRenovadasResponse(renovadas=renovadas, expira=expira)
+
+def liberar(db: Session, admin: models.UsuarioUniversidad, datos: schemas.RevisionesInput) -> int:
+    """[ADMIN] Devuelve a la cola los elementos prestados al coordinador."""
+    liberadas = db.execute(delete(models.AsignacionRevision).where(*_mias(admin, datos))).rowcount
+    db.commit()
+    return liberadas
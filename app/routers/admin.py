@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from functools import partial
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
-from .. import crud, schemas, database, security, models
+from .. import catalogos, concurrencia, crud, crud_async, eventos, exportacion, importacion, recomendaciones, revision_lote, revisiones, transiciones, schemas, database, security, models
+from ..pagination import Pagina, set_next_cursor
+from ..serializacion import ORJSONRapidoResponse
 
 router = APIRouter()
 
@@ -44,8 +50,8 @@ def create_admin_user(
                 detail="El primer usuario del sistema debe tener el rol de 'Administrador'."
             )
 
-    # 2. Verificar que el email no exista ya
-    db_user = crud.get_admin_by_email(db, email=user.email)
+    # 2. Verificar que el email no exista ya (en ningún rol)
+    db_user = crud.get_identidad_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
@@ -73,6 +79,7 @@ def create_programa_academico(
     db.add(db_programa)
     db.commit()
     db.refresh(db_programa)
+    catalogos.invalidar(catalogos.PROGRAMAS)
     return db_programa
 
 @router.post("/estudiantes", response_model=schemas.EstudianteResponse, status_code=status.HTTP_201_CREATED)
@@ -85,7 +92,7 @@ def create_estudiante_user(
     Crea un nuevo estudiante en el sistema.
     (Protegido: Solo Admin/Coordinador)
     """
-    db_student = crud.get_student_by_email(db, email=student.email_institucional)
+    db_student = crud.get_identidad_by_email(db, email=student.email_institucional)
     if db_student:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
@@ -94,8 +101,7 @@ def create_estudiante_user(
     
     # --- VALIDACIÓN DE PROGRAMA ---
     # Verificamos que el id_programa exista antes de crear el estudiante
-    db_programa = crud.get_programa_by_id(db, programa_id=student.id_programa)
-    if not db_programa:
+    if not catalogos.existe_programa(db, student.id_programa):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"El programa con id {student.id_programa} no existe. No se puede crear el estudiante."
@@ -122,9 +128,47 @@ def create_empresa_registro(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="El NIT de la empresa ya está registrado."
         )
+
+    if crud.get_identidad_by_email(db, email=empresa.email_contacto):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="El correo electrónico ya está registrado."
+        )
     
-    
-    return crud.create_empresa(db=db, empresa=empresa)
+    db_empresa = crud.create_empresa(db=db, empresa=empresa)
+    catalogos.invalidar(catalogos.EMPRESAS)
+    return db_empresa
+
+# importacion masiva (inicio de semestre)
+
+@router.post("/estudiantes/import", response_model=schemas.ImportacionResponse)
+def importar_estudiantes(
+    archivo: UploadFile = File(...),
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    Crea los estudiantes de un archivo CSV (columnas: nombre, apellido, email_institucional,
+    password, e id_programa o programa). Las filas con error se reportan y no se crean.
+    (Protegido: Solo Admin/Coordinador)
+    """
+    return importacion.importar_estudiantes(db, archivo.file.read())
+
+@router.post("/empresas/import", response_model=schemas.ImportacionResponse)
+def importar_empresas(
+    archivo: UploadFile = File(...),
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    Crea las empresas de un archivo CSV (columnas: razon_social, nit, email_contacto,
+    password y descripcion opcional). Las filas con error se reportan y no se crean.
+    (Protegido: Solo Admin/Coordinador)
+    """
+    resultado = importacion.importar_empresas(db, archivo.file.read())
+    if resultado.creados:
+        catalogos.invalidar(catalogos.EMPRESAS)
+    return resultado
 
 # vacantes por estado
 def get_vacantes_por_estado(db: Session, estado: models.EstadoVacanteEnum) -> List[models.Vacante]:
@@ -135,6 +179,8 @@ def get_vacantes_por_estado(db: Session, estado: models.EstadoVacanteEnum) -> Li
 
 @router.get("/vacantes/pendientes", response_model=List[schemas.VacanteResponse])
 def get_vacantes_pendientes_revision(
+    response: Response,
+    pagina: Pagina = Depends(),
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -142,12 +188,16 @@ def get_vacantes_pendientes_revision(
     [ADMIN] Obtiene todas las vacantes que están 'En Revisión' (pendientes de aprobar).
     (Protegido: Solo Admin/Coordinador)
     """
-    return crud.get_vacantes_por_estado(db, estado=models.EstadoVacanteEnum.En_Revision)
+    vacantes = crud.get_vacantes_por_estado(db, estado=models.EstadoVacanteEnum.En_Revision, pagina=pagina)
+    set_next_cursor(response, pagina)
+    return vacantes
 
 
 @router.patch("/vacantes/{vacante_id}/aprobar", response_model=schemas.VacanteResponse)
 def aprobar_vacante(
     vacante_id: int,
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -158,20 +208,28 @@ def aprobar_vacante(
     vacante = db.get(models.Vacante, vacante_id)
     if not vacante:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="La vacante no existe.")
+    concurrencia.verificar_version(vacante.version, version)
     
     # Comprobamos que esté en revisión para no aprobar algo ya aprobado
     if vacante.estado != models.EstadoVacanteEnum.En_Revision.value:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La vacante no está en estado 'En Revisión'.")
 
     vacante.estado = models.EstadoVacanteEnum.Abierta.value
+    eventos.publicar(db, [revision_lote.evento_vacante_aprobada(vacante.id_vacante, vacante.id_empresa)])
     db.commit()
     db.refresh(vacante)
+    crud.invalidar_stats_admin()
+    crud.invalidar_stats_estudiante() # Cambió el catálogo de vacantes abiertas
+    recomendaciones.motor.agregar_vacante(vacante.id_vacante, vacante.titulo_vacante, vacante.descripcion_funciones)
+    concurrencia.set_etag(response, vacante.version)
     return vacante
 
 
 @router.patch("/vacantes/{vacante_id}/rechazar", response_model=schemas.VacanteResponse)
 def rechazar_vacante(
     vacante_id: int,
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -182,16 +240,62 @@ def rechazar_vacante(
     vacante = db.get(models.Vacante, vacante_id)
     if not vacante:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="La vacante no existe.")
-        
+    concurrencia.verificar_version(vacante.version, version)
+
     vacante.estado = models.EstadoVacanteEnum.Cerrada.value
     db.commit()
     db.refresh(vacante)
+    crud.invalidar_stats_admin()
+    crud.invalidar_stats_estudiante() # Cambió el catálogo de vacantes abiertas
+    concurrencia.set_etag(response, vacante.version)
     return vacante
 
+# colas de revision repartidas entre coordinadores
+
+@router.post("/revisiones/claim", response_model=schemas.RevisionesAsignadasResponse)
+def pedir_revisiones(
+    n: int = Query(20, ge=1, le=revisiones.MAX_POR_PEDIDO, description="Cuántos elementos pedir."),
+    tipo: Optional[str] = Query(None, pattern="^(postulacion|vacante)$", description="Solo una de las colas (por defecto, las dos)."),
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Toma las siguientes N pendientes de revisión (las más antiguas) que ningún otro
+    coordinador tenga. Quedan a nombre del coordinador hasta 'expira'.
+    (Protegido: Solo Admin/Coordinador)
+    """
+    return revisiones.pedir(db, current_admin, n, tipo)
+
+@router.post("/revisiones/renew", response_model=schemas.RevisionesRenovadasResponse)
+def renovar_revisiones(
+    datos: schemas.RevisionesInput,
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Extiende el plazo de los elementos tomados (todos, o solo los ids enviados).
+    (Protegido: Solo Admin/Coordinador)
+    """
+    return revisiones.renovar(db, current_admin, datos)
+
+@router.post("/revisiones/release")
+def liberar_revisiones(
+    datos: schemas.RevisionesInput,
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Devuelve a la cola los elementos tomados (todos, o solo los ids enviados).
+    (Protegido: Solo Admin/Coordinador)
+    """
+    return {"liberadas": revisiones.liberar(db, current_admin, datos)}
+
 # endpoints para que la universidad pueda aporbar o rechazar la postulacion aprobada por la empresa.
 
 @router.get("/postulaciones/pendientes", response_model=List[schemas.PostulacionResponse])
 def get_postulaciones_pendientes_admin(
+    response: Response,
+    pagina: Pagina = Depends(),
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -199,15 +303,19 @@ def get_postulaciones_pendientes_admin(
     [ADMIN] Obtiene todas las postulaciones pendientes de revisión por la universidad.
     (Protegido: Solo Admin/Coordinador)
     """
-    return crud.get_postulaciones_por_estado(
-        db, estado=models.EstadoPostulacionEnum.En_Revision_Universidad
+    postulaciones = crud.get_postulaciones_por_estado(
+        db, estado=models.EstadoPostulacionEnum.En_Revision_Universidad, pagina=pagina
     )
+    set_next_cursor(response, pagina)
+    return postulaciones
 
 
 @router.patch("/postulaciones/{postulacion_id}/aprobar", response_model=schemas.PostulacionResponse)
 def aprobar_postulacion_admin(
     postulacion_id: int,
     datos_aprobacion: schemas.AprobacionAdminInput, # Recibimos las fechas
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -215,32 +323,14 @@ def aprobar_postulacion_admin(
     [ADMIN] Da la aprobación final a una postulación.
     Cambia el estado a 'Aprobada' y guarda las fechas de inicio/fin.
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Postulación no encontrada.")
-
-    if postulacion.estado_actual != models.EstadoPostulacionEnum.En_Revision_Universidad.value:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La postulación no está pendiente de revisión por la universidad.")
-
-    # Actualizamos la postulación
-    postulacion.estado_actual = models.EstadoPostulacionEnum.Aprobada.value
-    postulacion.fecha_inicio_practica = datos_aprobacion.fecha_inicio_practica
-    postulacion.fecha_fin_practica = datos_aprobacion.fecha_fin_practica
-    # Marcamos la vacante como 'Cubierta'
-    postulacion.vacante.estado = models.EstadoVacanteEnum.Cubierta.value 
-
-    # Creamos el registro en el historial
-    historial = models.HistorialEstadoPostulacion(
-        id_postulacion=postulacion_id,
-        estado=models.EstadoPostulacionEnum.Aprobada,
-        # ¡Usamos el nuevo campo!
-        id_actor_universidad=current_admin.id_usuario, 
-        comentarios=datos_aprobacion.comentarios
-    )
-    db.add(historial)
-
-    db.commit()
-    db.refresh(postulacion)
+    postulacion = transiciones.ejecutar_una(db, transiciones.APROBAR_UNIVERSIDAD, current_admin, transiciones.Cambio(
+        postulacion_id,
+        comentarios=datos_aprobacion.comentarios,
+        fecha_inicio_practica=datos_aprobacion.fecha_inicio_practica,
+        fecha_fin_practica=datos_aprobacion.fecha_fin_practica,
+        version=version
+    ))
+    concurrencia.set_etag(response, postulacion.version)
     return postulacion
 
 # para rechazo de una postulacion
@@ -249,7 +339,8 @@ def aprobar_postulacion_admin(
 def rechazar_postulacion_admin(
     postulacion_id: int,
     datos_rechazo: schemas.ComentarioCreate,
-
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -257,38 +348,71 @@ def rechazar_postulacion_admin(
     [ADMIN] Rechaza finalmente una postulación.
     Cambia el estado a 'Rechazada por Universidad' y guarda un comentario en el historial.
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Postulación no encontrada.")
+    postulacion = transiciones.ejecutar_una(db, transiciones.RECHAZAR_UNIVERSIDAD, current_admin, transiciones.Cambio(
+        postulacion_id, comentarios=datos_rechazo.comentarios, version=version # Guardamos POR QUÉ
+    ))
+    concurrencia.set_etag(response, postulacion.version)
+    return postulacion
 
-    # ¡CAMBIO 2! Actualizamos el estado de la postulación
-    postulacion.estado_actual = models.EstadoPostulacionEnum.Rechazada_por_Universidad.value
+# revision en lote (inicio de semestre)
 
-    # ¡CAMBIO 3! Creamos el registro en el historial
-    historial = models.HistorialEstadoPostulacion(
-        id_postulacion=postulacion_id,
-        estado=models.EstadoPostulacionEnum.Rechazada_por_Universidad,
-        id_actor_universidad=current_admin.id_usuario, # Guardamos QUIÉN rechazó
-        comentarios=datos_rechazo.comentarios         # Guardamos POR QUÉ
-    )
-    db.add(historial)
+@router.patch("/vacantes/aprobar-lote", response_model=schemas.ResultadoLoteResponse)
+def aprobar_vacantes_lote(
+    datos: schemas.VacantesLoteInput,
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Aprueba varias vacantes a la vez (las que estén 'En Revisión').
+    Devuelve el resultado de cada una: las demás no se modifican.
+    """
+    return revision_lote.aprobar_vacantes(db, datos.ids_vacantes)
 
-    db.commit()
-    db.refresh(postulacion)
-    return postulacion
+@router.patch("/postulaciones/aprobar-lote", response_model=schemas.ResultadoLoteResponse)
+def aprobar_postulaciones_lote(
+    datos: schemas.AprobacionPostulacionesLoteInput,
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Aprobación final de varias postulaciones, cada una con sus fechas de inicio/fin.
+    Devuelve el resultado de cada una: las demás no se modifican.
+    """
+    return revision_lote.aprobar_postulaciones(db, datos.postulaciones, current_admin)
+
+@router.patch("/postulaciones/rechazar-lote", response_model=schemas.ResultadoLoteResponse)
+def rechazar_postulaciones_lote(
+    datos: schemas.RechazoPostulacionesLoteInput,
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Rechazo final de varias postulaciones, cada una con su comentario.
+    Devuelve el resultado de cada una: las demás no se modifican.
+    """
+    return revision_lote.rechazar_postulaciones(db, datos.postulaciones, current_admin)
 
 # Listar las empresas existentes.
 
 @router.get("/empresas", response_model=List[schemas.EmpresaResponse])
 def get_all_empresas(
+    response: Response,
+    pagina: Pagina = Depends(),
+    if_none_match: Optional[str] = Depends(concurrencia.copia_cliente), # If-None-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
     """
     [ADMIN] Obtiene una lista de todas las empresas registradas en el sistema.
+    Sin paginar sale del catálogo en memoria (con ETag / 304, como /programas).
     (Protegido: Solo Admin/Coordinador)
     """
-    return crud.get_empresas(db=db)
+    if pagina.limit is None and pagina.cursor is None:
+        # La lista completa (la de los formularios) sale del catálogo en memoria
+        return catalogos.responder(catalogos.empresas, db, if_none_match)
+    empresas = crud.get_empresas(db=db, pagina=pagina)
+    set_next_cursor(response, pagina)
+    return empresas
 
 # endpoints para activar e inactivar empresas
 
@@ -309,6 +433,9 @@ def activar_empresa(
     empresa.esta_activo = True
     db.commit()
     db.refresh(empresa)
+    security.invalidate_principal(empresa)
+    crud.invalidar_stats_admin()
+    catalogos.invalidar(catalogos.EMPRESAS)
     return empresa
 
 
@@ -329,12 +456,17 @@ def inactivar_empresa(
     empresa.esta_activo = False
     db.commit()
     db.refresh(empresa)
+    security.invalidate_principal(empresa)
+    crud.invalidar_stats_admin()
+    catalogos.invalidar(catalogos.EMPRESAS)
     return empresa
 
 # endpoints para activar e inactivar estudiantes
 
 @router.get("/estudiantes", response_model=List[schemas.EstudianteResponse])
 def get_all_estudiantes(
+    response: Response,
+    pagina: Pagina = Depends(),
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -342,7 +474,9 @@ def get_all_estudiantes(
     [ADMIN] Obtiene una lista de todos los estudiantes registrados.
     (Protegido: Solo Admin/Coordinador)
     """
-    return crud.get_estudiantes(db=db)
+    estudiantes = crud.get_estudiantes(db=db, pagina=pagina)
+    set_next_cursor(response, pagina)
+    return estudiantes
 
 
 @router.patch("/estudiantes/{estudiante_id}/activar", response_model=schemas.EstudianteResponse)
@@ -362,6 +496,8 @@ def activar_estudiante(
     estudiante.esta_activo = True
     db.commit()
     db.refresh(estudiante)
+    security.invalidate_principal(estudiante)
+    crud.invalidar_stats_admin()
     return estudiante
 
 
@@ -382,20 +518,24 @@ def inactivar_estudiante(
     estudiante.esta_activo = False
     db.commit()
     db.refresh(estudiante)
+    security.invalidate_principal(estudiante)
+    crud.invalidar_stats_admin()
     return estudiante
 
 # listar los programas
 
 @router.get("/programas", response_model=List[schemas.ProgramaAcademicoResponse])
 def get_all_programas(
+    if_none_match: Optional[str] = Depends(concurrencia.copia_cliente), # If-None-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
     """
     [ADMIN] Obtiene una lista de todos los programas académicos.
+    Sale del catálogo en memoria; con 'If-None-Match' vigente responde 304.
     (Protegido: Solo Admin/Coordinador)
     """
-    return crud.get_programas(db=db)
+    return catalogos.responder(catalogos.programas, db, if_none_match)
 
 # activar o inactivar programas
 
@@ -416,6 +556,7 @@ def activar_programa(
     programa.esta_activo = True
     db.commit()
     db.refresh(programa)
+    catalogos.invalidar(catalogos.PROGRAMAS)
     return programa
 
 
@@ -436,12 +577,16 @@ def inactivar_programa(
     programa.esta_activo = False
     db.commit()
     db.refresh(programa)
+    catalogos.invalidar(catalogos.PROGRAMAS)
     return programa
 
 # para traer las practicas activas y finalizadas
 
-@router.get("/practicas/historial", response_model=List[schemas.PostulacionResponse])
+@router.get("/practicas/historial", response_model=Union[List[schemas.PostulacionResponse], schemas.PostulacionesNormalizadasResponse])
 def get_historial_practicas(
+    response: Response,
+    pagina: Pagina = Depends(),
+    formato: str = Query(schemas.FORMATO_COMPLETO, pattern="^(completo|normalizado)$", description="'normalizado': filas con ids y cada entidad una sola vez."),
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -450,7 +595,54 @@ def get_historial_practicas(
     completadas o rechazadas (procesos finalizados).
     (Protegido: Solo Admin/Coordinador)
     """
-    return crud.get_practicas_activas_y_finalizadas(db=db)
+    if formato == schemas.FORMATO_NORMALIZADO:
+        practicas = crud.get_practicas_activas_y_finalizadas(db=db, pagina=pagina)
+        set_next_cursor(response, pagina)
+        return schemas.PostulacionesNormalizadasResponse.desde_postulaciones(practicas)
+
+    # Camino rápido: filas de Core -> dicts -> orjson (misma forma que PostulacionResponse)
+    filas = crud.get_practicas_activas_y_finalizadas_filas(db=db, pagina=pagina)
+    respuesta = ORJSONRapidoResponse(filas)
+    set_next_cursor(respuesta, pagina)
+    return respuesta
+
+# exportacion del seguimiento (acreditacion)
+
+@router.get("/practicas/export")
+def exportar_practicas(
+    formato: str = Query("csv", alias="format", pattern="^(csv|xlsx)$", description="'csv' o 'xlsx'."),
+    estado: Optional[models.EstadoPostulacionEnum] = Query(None, description="Solo las prácticas en este estado."),
+    id_empresa: Optional[int] = Query(None, description="Solo las prácticas de esta empresa."),
+    db: Session = Depends(database.get_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Descarga las prácticas de la página de Seguimiento, con todo su historial
+    (una fila por cada cambio de estado o comentario). Se envía por partes.
+    (Protegido: Solo Admin/Coordinador)
+    """
+    estados = crud.ESTADOS_PRACTICAS_FINALIZADAS
+    if estado is not None:
+        if estado.value not in estados:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ese estado no hace parte del seguimiento de prácticas.")
+        estados = [estado.value]
+
+    # El archivo se genera mientras se envía (después de que el endpoint retorna),
+    # así que usa su propia sesión sobre el mismo motor
+    crear_sesion = partial(Session, bind=db.get_bind())
+    nombre = f"practicas_{date.today():%Y%m%d}.{formato}"
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}"'}
+    if formato == "xlsx":
+        return StreamingResponse(
+            exportacion.generar_xlsx(crear_sesion, estados, id_empresa),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers
+        )
+    return StreamingResponse(
+        exportacion.generar_csv(crear_sesion, estados, id_empresa),
+        media_type="text/csv; charset=utf-8",
+        headers=headers
+    )
 
 # cancelacion de una practica
 
@@ -458,6 +650,8 @@ def get_historial_practicas(
 def cancelar_practica(
     postulacion_id: int,
     datos_cancelacion: schemas.ComentarioCreate, # Reusamos el schema de comentarios
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
@@ -465,27 +659,10 @@ def cancelar_practica(
     [ADMIN] Cancela una práctica que ya estaba 'Aprobada'.
     Guarda un comentario en el historial.
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Postulación no encontrada.")
-
-    # Lógica de negocio: Solo se pueden cancelar prácticas que estaban Aprobadas
-    if postulacion.estado_actual != models.EstadoPostulacionEnum.Aprobada.value:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo se pueden cancelar prácticas que ya están 'Aprobadas'.")
-
-    postulacion.estado_actual = models.EstadoPostulacionEnum.Cancelada.value
-
-    # Guardamos el motivo en el historial
-    historial = models.HistorialEstadoPostulacion(
-        id_postulacion=postulacion_id,
-        estado=models.EstadoPostulacionEnum.Cancelada,
-        id_actor_universidad=current_admin.id_usuario,
-        comentarios=datos_cancelacion.comentarios
-    )
-    db.add(historial)
-
-    db.commit()
-    db.refresh(postulacion)
+    postulacion = transiciones.ejecutar_una(db, transiciones.CANCELAR_UNIVERSIDAD, current_admin, transiciones.Cambio(
+        postulacion_id, comentarios=datos_cancelacion.comentarios, version=version
+    ))
+    concurrencia.set_etag(response, postulacion.version)
     return postulacion
 
 # flujo apra finalizacion de practicas
@@ -494,43 +671,29 @@ def cancelar_practica(
 def finalizar_practica_admin(
     postulacion_id: int,
     comentario: schemas.ComentarioCreate, # Requerimos un comentario
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
 ):
     """
     [ADMIN] Da la aprobación final a una práctica 'Completada por Empresa'.
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion:
-        raise HTTPException(status_code=404, detail="Postulación no encontrada.")
-
-    # El admin solo puede finalizar lo que la empresa ya marcó
-    if postulacion.estado_actual != models.EstadoPostulacionEnum.Completada_por_Empresa.value:
-        raise HTTPException(status_code=400, detail="La práctica debe ser marcada como 'Completada por Empresa' primero.")
-
-    postulacion.estado_actual = models.EstadoPostulacionEnum.Completada_Final.value
-
-    historial = models.HistorialEstadoPostulacion(
-        id_postulacion=postulacion_id,
-        estado=models.EstadoPostulacionEnum.Completada_Final,
-        id_actor_universidad=current_admin.id_usuario,
-        comentarios=comentario.comentarios
-    )
-    db.add(historial)
-
-    db.commit()
-    db.refresh(postulacion)
+    postulacion = transiciones.ejecutar_una(db, transiciones.FINALIZAR_UNIVERSIDAD, current_admin, transiciones.Cambio(
+        postulacion_id, comentarios=comentario.comentarios, version=version
+    ))
+    concurrencia.set_etag(response, postulacion.version)
     return postulacion
 
 # estadisticas
 
 @router.get("/stats", response_model=schemas.StatsAdminResponse)
-def get_admin_statistics(
-    db: Session = Depends(database.get_db),
-    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+async def get_admin_statistics(
+    db: AsyncSession = Depends(database.get_async_db),
+    current_admin: models.UsuarioUniversidad = Depends(security.get_current_admin_user_async)
 ):
     """
     [ADMIN] Obtiene las estadísticas clave (KPIs) para el dashboard.
     (Protegido: Solo Admin/Coordinador)
     """
-    return crud.get_admin_stats(db=db)
\ No newline at end of file
+    return await crud_async.get_admin_stats(db=db)
\ No newline at end of file
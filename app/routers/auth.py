@@ -1,55 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from .. import crud, schemas, security, database, models
+from .. import crud_async, schemas, security, database, models
 
 router = APIRouter()
 
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(
-    db: Session = Depends(database.get_db), 
+async def login_for_access_token(
+    db: AsyncSession = Depends(database.get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     Endpoint de inicio de sesión.
     Recibe un 'username' (que es el email) y 'password'.
+    Es 'async def': mientras argon2 calcula en su pool de procesos, la petición
+    no ocupa ninguno de los hilos que atienden a los endpoints síncronos.
     """
-    user = None
-    user_email = form_data.username
-    
-    # 1. Intentar autenticar como Administrador/Coordinador
-    admin_user = crud.get_admin_by_email(db, email=user_email)
-    if admin_user and security.verify_password(form_data.password, admin_user.hashed_password):
-        user = admin_user
-    
-    # 2. Si no es admin, intentar autenticar como Estudiante
-    if not user:
-        student_user = crud.get_student_by_email(db, email=user_email)
-        if student_user and security.verify_password(form_data.password, student_user.hashed_password):
-            user = student_user
-            user_email = student_user.email_institucional # Actualizamos al email correcto
-            
-    # 3. Si no, intentar autenticar como Empresa
-    if not user:
-        empresa_user = crud.get_empresa_by_email(db, email=user_email)
-        if empresa_user and security.verify_password(form_data.password, empresa_user.hashed_password):
-            user = empresa_user
-            user_email = empresa_user.email_contacto # Actualizamos al email correcto
+    # 1. Un solo lookup en el índice unificado (email -> rol, id, hash)
+    identidad = await crud_async.get_identidad_by_email(db, email=form_data.username)
+    if identidad is None:
+        # No está en el índice (que se llena al arrancar y con cada alta): solo queda el caso de
+        # un usuario insertado directo en la BD. Los emails que no existen se recuerdan un momento
+        identidad = await crud_async.indexar_identidad_por_email(db, email=form_data.username)
 
-    # 4. Si no se encontró en ninguna tabla o la contraseña es incorrecta
-    if not user:
+    # 2. Una sola verificación argon2. Si no existe o la contraseña es incorrecta:
+    password_ok, nuevo_hash = (False, None)
+    if identidad:
+        password_ok, nuevo_hash = await security.verify_and_update_password_async(form_data.password, identidad.hashed_password)
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Si cambiaron los parámetros de argon2, guardamos el hash recalculado
+    if nuevo_hash:
+        await crud_async.update_password(db, identidad.rol, identidad.id_usuario, nuevo_hash)
         
-    # 5. Crear el token JWT
+    # 3. Crear el token JWT
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": user_email}, # Usamos la variable user_email 
+        data={
+            "sub": identidad.email,
+            "rol": identidad.rol,       # Rol e id: evitan buscar en las TRES tablas
+            "uid": identidad.id_usuario
+        },
         expires_delta=access_token_expires
     )
     
@@ -82,28 +80,31 @@ def read_users_me(
 # Cambio de contraseña
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     passwords: schemas.PasswordChangeInput,
-    db: Session = Depends(database.get_db),
-    current_user = Depends(security.get_current_user) # ¡Obtenemos el usuario logueado!
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user = Depends(security.get_current_user_async) # ¡Obtenemos el usuario logueado!
 ):
     """
     [TODOS LOS ROLES] Permite a un usuario autenticado cambiar su contraseña.
     """
 
     # 1. Verificar la contraseña antigua
-    # La dependencia 'get_current_user' ya nos da el objeto (Admin, Empresa o Estudiante)
-    if not security.verify_password(passwords.old_password, current_user.hashed_password):
+    # La dependencia 'get_current_user_async' ya nos da el objeto (Admin, Empresa o Estudiante)
+    password_ok, _ = await security.verify_and_update_password_async(passwords.old_password, current_user.hashed_password)
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La contraseña antigua es incorrecta."
         )
 
     # 2. Hashear la nueva contraseña
-    new_hashed_password = security.hash_password(passwords.new_password)
+    new_hashed_password = await security.hash_password_async(passwords.new_password)
 
-    # 3. Guardar la nueva contraseña en el usuario
-    current_user.hashed_password = new_hashed_password
-    db.commit()
+    # 3. Guardar la nueva contraseña en el usuario (y en el índice de identidades)
+    await crud_async.update_password(
+        db, security.get_principal_role(current_user), security.get_principal_id(current_user), new_hashed_password
+    )
+    security.invalidate_principal(current_user) # La caché tenía el hash anterior
 
     return {"mensaje": "Contraseña actualizada exitosamente."}
\ No newline at end of file
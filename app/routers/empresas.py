@@ -1,22 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
-from .. import crud, schemas, database, security, models
+from .. import concurrencia, crud, huellas, recomendaciones, schemas, database, security, models, transiciones
+from ..pagination import Pagina, set_next_cursor
+from ..serializacion import ORJSONRapidoResponse
 
 router = APIRouter()
 
 # router para listar vacantes en empresa
 @router.get("/vacantes/me", response_model=List[schemas.VacanteResponse])
 def get_mis_vacantes(
+    response: Response,
+    pagina: Pagina = Depends(),
+    if_none_match: Optional[str] = Depends(concurrencia.copia_cliente), # If-None-Match
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
     """
     [EMPRESA] Obtiene una lista de todas las vacantes creadas por la empresa autenticada.
+    Responde 304 si no cambió nada desde la copia del cliente (If-None-Match).
     (Protegido: Solo Empresa)
     """
-    return crud.get_vacantes_por_empresa(db=db, empresa_id=current_empresa.id_empresa)
+    etiqueta = huellas.etiqueta("vacantes", db.execute(huellas.vacantes_empresa(current_empresa.id_empresa)).one())
+    if concurrencia.no_modificado(if_none_match, etiqueta):
+        return huellas.no_modificado(etiqueta)
+
+    vacantes = crud.get_vacantes_por_empresa(db=db, empresa_id=current_empresa.id_empresa, pagina=pagina)
+    set_next_cursor(response, pagina)
+    huellas.set_etiqueta(response, etiqueta)
+    return vacantes
 
 @router.post("/vacantes", response_model=schemas.VacanteResponse, status_code=status.HTTP_201_CREATED)
 def create_nueva_vacante(
@@ -34,21 +47,43 @@ def create_nueva_vacante(
 
 # botones para aprobar o rechazar la postulacion
 
-@router.get("/postulaciones", response_model=List[schemas.PostulacionResponse])
+@router.get("/postulaciones", response_model=Union[List[schemas.PostulacionResponse], schemas.PostulacionesNormalizadasResponse])
 def get_postulaciones_recibidas(
+    response: Response,
+    pagina: Pagina = Depends(),
+    formato: str = Query(schemas.FORMATO_COMPLETO, pattern="^(completo|normalizado)$", description="'normalizado': filas con ids y cada entidad una sola vez."),
+    if_none_match: Optional[str] = Depends(concurrencia.copia_cliente), # If-None-Match
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
     """
     [EMPRESA] Obtiene todas las postulaciones recibidas para sus vacantes.
+    Responde 304 si no cambió nada desde la copia del cliente (If-None-Match).
     (Protegido: Solo Empresa)
     """
-    return crud.get_postulaciones_por_empresa(db=db, empresa_id=current_empresa.id_empresa)
+    etiqueta = huellas.etiqueta("postulaciones", db.execute(huellas.postulaciones_empresa(current_empresa.id_empresa)).one())
+    if concurrencia.no_modificado(if_none_match, etiqueta):
+        return huellas.no_modificado(etiqueta)
+
+    if formato == schemas.FORMATO_NORMALIZADO:
+        postulaciones = crud.get_postulaciones_por_empresa(db=db, empresa_id=current_empresa.id_empresa, pagina=pagina)
+        set_next_cursor(response, pagina)
+        huellas.set_etiqueta(response, etiqueta)
+        return schemas.PostulacionesNormalizadasResponse.desde_postulaciones(postulaciones)
+
+    # Camino rápido: filas de Core -> dicts -> orjson (misma forma que PostulacionResponse)
+    filas = crud.get_postulaciones_por_empresa_filas(db=db, empresa_id=current_empresa.id_empresa, pagina=pagina)
+    respuesta = ORJSONRapidoResponse(filas)
+    set_next_cursor(respuesta, pagina)
+    huellas.set_etiqueta(respuesta, etiqueta)
+    return respuesta
 
 
 @router.patch("/postulaciones/{postulacion_id}/aprobar", response_model=schemas.PostulacionResponse)
 def aprobar_postulacion_empresa(
     postulacion_id: int,
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
@@ -57,21 +92,10 @@ def aprobar_postulacion_empresa(
     Cambia el estado de 'Recibida' a 'En Revisión Universidad'.
     (Protegido: Solo Empresa)
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Postulación no encontrada.")
-    
-    # Seguridad: Asegurarse de que esta empresa sea dueña de la vacante
-    if postulacion.vacante.id_empresa != current_empresa.id_empresa:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permisos sobre esta postulación.")
-        
-    # Lógica de estado
-    if postulacion.estado_actual != models.EstadoPostulacionEnum.Recibida.value:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"La postulación no está en estado 'Recibida'. Estado actual: {postulacion.estado_actual}")
-
-    postulacion.estado_actual = models.EstadoPostulacionEnum.En_Revision_Universidad.value
-    db.commit()
-    db.refresh(postulacion)
+    postulacion = transiciones.ejecutar_una(
+        db, transiciones.APROBAR_EMPRESA, current_empresa, transiciones.Cambio(postulacion_id, version=version)
+    )
+    concurrencia.set_etag(response, postulacion.version)
     return postulacion
 
 
@@ -80,6 +104,8 @@ def rechazar_postulacion_empresa(
     postulacion_id: int,
     # ¡CAMBIO 1! Aceptamos el nuevo schema
     datos_rechazo: schemas.ComentarioCreate,
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
@@ -87,27 +113,10 @@ def rechazar_postulacion_empresa(
     [EMPRESA] Rechaza una postulación.
     Cambia el estado a 'Rechazada por Empresa' y guarda un comentario en el historial.
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Postulación no encontrada.")
-
-    if postulacion.vacante.id_empresa != current_empresa.id_empresa:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permisos sobre esta postulación.")
-
-    # ¡CAMBIO 2! Actualizamos el estado
-    postulacion.estado_actual = models.EstadoPostulacionEnum.Rechazada_por_Empresa.value
-
-    # ¡CAMBIO 3! Creamos el registro en el historial
-    historial = models.HistorialEstadoPostulacion(
-        id_postulacion=postulacion_id,
-        estado=models.EstadoPostulacionEnum.Rechazada_por_Empresa,
-        id_actor_empresa=current_empresa.id_empresa, # Guardamos QUÉ empresa rechazó
-        comentarios=datos_rechazo.comentarios       # Guardamos POR QUÉ
-    )
-    db.add(historial)
-
-    db.commit()
-    db.refresh(postulacion)
+    postulacion = transiciones.ejecutar_una(db, transiciones.RECHAZAR_EMPRESA, current_empresa, transiciones.Cambio(
+        postulacion_id, comentarios=datos_rechazo.comentarios, version=version # Guardamos POR QUÉ
+    ))
+    concurrencia.set_etag(response, postulacion.version)
     return postulacion
 
 # para cerrar una vacante
@@ -115,6 +124,8 @@ def rechazar_postulacion_empresa(
 @router.patch("/vacantes/{vacante_id}/cerrar", response_model=schemas.VacanteResponse)
 def cerrar_vacante_empresa(
     vacante_id: int,
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
@@ -130,6 +141,8 @@ def cerrar_vacante_empresa(
     if vacante.id_empresa != current_empresa.id_empresa:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permisos sobre esta vacante.")
 
+    concurrencia.verificar_version(vacante.version, version)
+
     # Solo se pueden cerrar vacantes que estén 'Abierta' o 'En Revisión'
     if vacante.estado not in [models.EstadoVacanteEnum.Abierta.value, models.EstadoVacanteEnum.En_Revision.value]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La vacante ya está finalizada (Cubierta o Cerrada).")
@@ -137,12 +150,18 @@ def cerrar_vacante_empresa(
     vacante.estado = models.EstadoVacanteEnum.Cerrada.value
     db.commit()
     db.refresh(vacante)
+    crud.invalidar_stats_admin()
+    crud.invalidar_stats_estudiante() # Cambió el catálogo de vacantes abiertas
+    recomendaciones.motor.quitar_vacante(vacante.id_vacante)
+    concurrencia.set_etag(response, vacante.version)
     return vacante
 
 # router practicas por empresa
 
 @router.get("/practicas/seguimiento", response_model=List[schemas.PostulacionResponse])
 def get_seguimiento_practicas_empresa(
+    response: Response,
+    pagina: Pagina = Depends(),
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
@@ -151,7 +170,9 @@ def get_seguimiento_practicas_empresa(
     para seguimiento.
     (Protegido: Solo Empresa)
     """
-    return crud.get_practicas_finalizadas_por_empresa(db=db, empresa_id=current_empresa.id_empresa)
+    practicas = crud.get_practicas_finalizadas_por_empresa(db=db, empresa_id=current_empresa.id_empresa, pagina=pagina)
+    set_next_cursor(response, pagina)
+    return practicas
 
 # flujo para completar las practicas por una empresa
 
@@ -159,6 +180,8 @@ def get_seguimiento_practicas_empresa(
 def completar_practica_empresa(
     postulacion_id: int,
     comentario: schemas.ComentarioCreate, # Requerimos un comentario
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
@@ -166,27 +189,10 @@ def completar_practica_empresa(
     [EMPRESA] Marca una práctica como 'Completada por Empresa'.
     Requiere un comentario (ej. "El estudiante finalizó satisfactoriamente").
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion or postulacion.vacante.id_empresa != current_empresa.id_empresa:
-        raise HTTPException(status_code=403, detail="No tiene permisos sobre esta postulación.")
-
-    # Solo se pueden completar prácticas Aprobadas
-    if postulacion.estado_actual != models.EstadoPostulacionEnum.Aprobada.value:
-        raise HTTPException(status_code=400, detail="Solo se pueden completar prácticas 'Aprobadas'.")
-
-    postulacion.estado_actual = models.EstadoPostulacionEnum.Completada_por_Empresa.value
-
-    # Guardamos el comentario en el historial
-    historial = models.HistorialEstadoPostulacion(
-        id_postulacion=postulacion_id,
-        estado=models.EstadoPostulacionEnum.Completada_por_Empresa,
-        id_actor_empresa=current_empresa.id_empresa,
-        comentarios=comentario.comentarios
-    )
-    db.add(historial)
-
-    db.commit()
-    db.refresh(postulacion)
+    postulacion = transiciones.ejecutar_una(db, transiciones.COMPLETAR_EMPRESA, current_empresa, transiciones.Cambio(
+        postulacion_id, comentarios=comentario.comentarios, version=version
+    ))
+    concurrencia.set_etag(response, postulacion.version)
     return postulacion
 
 
@@ -194,6 +200,8 @@ def completar_practica_empresa(
 def cancelar_practica_empresa(
     postulacion_id: int,
     comentario: schemas.ComentarioCreate, # Requerimos un comentario
+    response: Response,
+    version: Optional[int] = Depends(concurrencia.version_esperada), # If-Match
     db: Session = Depends(database.get_db),
     current_empresa: models.Empresa = Depends(security.get_current_empresa_user)
 ):
@@ -201,23 +209,8 @@ def cancelar_practica_empresa(
     [EMPRESA] Cancela una práctica 'Aprobada'.
     Requiere un comentario (ej. "El estudiante no cumplió con las expectativas").
     """
-    postulacion = db.get(models.Postulacion, postulacion_id)
-    if not postulacion or postulacion.vacante.id_empresa != current_empresa.id_empresa:
-        raise HTTPException(status_code=403, detail="No tiene permisos sobre esta postulación.")
-
-    if postulacion.estado_actual != models.EstadoPostulacionEnum.Aprobada.value:
-        raise HTTPException(status_code=400, detail="Solo se pueden cancelar prácticas 'Aprobadas'.")
-
-    postulacion.estado_actual = models.EstadoPostulacionEnum.Cancelada.value
-
-    historial = models.HistorialEstadoPostulacion(
-        id_postulacion=postulacion_id,
-        estado=models.EstadoPostulacionEnum.Cancelada,
-        id_actor_empresa=current_empresa.id_empresa,
-        comentarios=comentario.comentarios
-    )
-    db.add(historial)
-
-    db.commit()
-    db.refresh(postulacion)
-    return postulacion
\ No newline at end of file
+    postulacion = transiciones.ejecutar_una(db, transiciones.CANCELAR_EMPRESA, current_empresa, transiciones.Cambio(
+        postulacion_id, comentarios=comentario.comentarios, version=version
+    ))
+    concurrencia.set_etag(response, postulacion.version)
+    return postulacion
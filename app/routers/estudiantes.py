@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from .. import crud, schemas, database, security, models
+from .. import busqueda, concurrencia, crud, crud_async, huellas, recomendaciones, schemas, database, security, models
+from ..pagination import Pagina, set_next_cursor
 
 router = APIRouter()
 
@@ -21,26 +23,75 @@ def get_estudiante_statistics(
 
 # postulaciones por estudiante
 @router.get("/postulaciones/me", response_model=List[schemas.PostulacionResponse])
-def get_mis_postulaciones(
-    db: Session = Depends(database.get_db),
-    current_student: models.Estudiante = Depends(security.get_current_student_user)
+async def get_mis_postulaciones(
+    response: Response,
+    pagina: Pagina = Depends(),
+    if_none_match: Optional[str] = Depends(concurrencia.copia_cliente), # If-None-Match
+    db: AsyncSession = Depends(database.get_async_db),
+    current_student: models.Estudiante = Depends(security.get_current_student_user_async)
 ):
     """
     [ESTUDIANTE] Obtiene un historial de todas las postulaciones del estudiante autenticado.
+    Responde 304 si no cambió nada desde la copia del cliente (If-None-Match).
     (Protegido: Solo Estudiante)
     """
-    return crud.get_postulaciones_por_estudiante(db=db, estudiante_id=current_student.id_estudiante)
+    huella = (await db.execute(huellas.postulaciones_estudiante(current_student.id_estudiante))).one()
+    etiqueta = huellas.etiqueta("postulaciones", huella)
+    if concurrencia.no_modificado(if_none_match, etiqueta):
+        return huellas.no_modificado(etiqueta)
+
+    postulaciones = await crud_async.get_postulaciones_por_estudiante(db=db, estudiante_id=current_student.id_estudiante, pagina=pagina)
+    set_next_cursor(response, pagina)
+    huellas.set_etiqueta(response, etiqueta)
+    return postulaciones
 
 @router.get("/vacantes", response_model=List[schemas.VacanteResponse])
-def get_todas_las_vacantes(
-    db: Session = Depends(database.get_db),
-    current_student: models.Estudiante = Depends(security.get_current_student_user)
+async def get_todas_las_vacantes(
+    response: Response,
+    pagina: Pagina = Depends(),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_student: models.Estudiante = Depends(security.get_current_student_user_async)
 ):
     """
     Obtiene la lista de todas las vacantes disponibles (estado 'Abierta').
     (Protegido: Solo Estudiantes)
     """
-    return crud.get_vacantes_disponibles(db=db)
+    vacantes = await crud_async.get_vacantes_disponibles(db=db, pagina=pagina)
+    set_next_cursor(response, pagina)
+    return vacantes
+
+
+@router.get("/vacantes/buscar", response_model=schemas.BusquedaVacantesResponse)
+async def buscar_vacantes(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a buscar (título, descripción o empresa)."),
+    id_empresa: Optional[int] = Query(None, description="Filtra los resultados por empresa (las facetas no cambian)."),
+    pagina: Pagina = Depends(),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_student: models.Estudiante = Depends(security.get_current_student_user_async)
+):
+    """
+    [ESTUDIANTE] Busca en las vacantes abiertas, con resultados por relevancia
+    y conteo por empresa. Sin 'limit' se retornan 20 resultados.
+    (Protegido: Solo Estudiantes)
+    """
+    resultado = await busqueda.buscar_vacantes(db=db, q=q, pagina=pagina, id_empresa=id_empresa)
+    set_next_cursor(response, pagina)
+    return resultado
+
+
+@router.get("/vacantes/recomendadas", response_model=List[schemas.VacanteRecomendadaResponse])
+async def get_vacantes_recomendadas(
+    limit: int = Query(10, ge=1, le=recomendaciones.TOP_K, description="Cuántas vacantes recomendar."),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_student: models.Estudiante = Depends(security.get_current_student_user_async)
+):
+    """
+    [ESTUDIANTE] Vacantes abiertas más afines al programa del estudiante
+    (sin las que ya se postuló), de la más a la menos afín.
+    (Protegido: Solo Estudiantes)
+    """
+    return await recomendaciones.recomendar_vacantes(db=db, estudiante=current_student, limite=limit)
 
 
 @router.post("/vacantes/{vacante_id}/postular", response_model=schemas.PostulacionResponse, status_code=status.HTTP_201_CREATED)
@@ -61,14 +112,11 @@ def postular_a_vacante(
     if vacante.estado != models.EstadoVacanteEnum.Abierta.value:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La vacante no está abierta a postulaciones.")
 
-    # 2. Verificar que el estudiante no se haya postulado ya
-    postulacion_existente = crud.get_postulacion_existente(
-        db, estudiante_id=current_student.id_estudiante, vacante_id=vacante_id
+    # 2. Crear la postulación (la BD garantiza que no haya una postulación repetida)
+    postulacion = crud.create_postulacion(
+        db=db, estudiante_id=current_student.id_estudiante, vacante_id=vacante_id
     )
-    if postulacion_existente:
+    if postulacion is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ya te has postulado a esta vacante.")
-        
-    # 3. Crear la postulación
-    return crud.create_postulacion(
-        db=db, estudiante_id=current_student.id_estudiante, vacante_id=vacante_id
-    )
\ No newline at end of file
+
+    return postulacion
\ No newline at end of file
@@ -0,0 +1,62 @@
+# /app/routers/eventos.py
+import asyncio
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from .. import database, escucha, eventos, schemas, security
+
+router = APIRouter()
+
+KEEPALIVE_SEGUNDOS = 15 # Comentario periódico para que proxies y balanceadores no corten la conexión
+RETRY_MS = 5000         # Cuánto espera el navegador antes de reconectar
+
+
+async def _flujo(suscripcion: eventos.Suscripcion):
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=KEEPALIVE_SEGUNDOS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield eventos.formato_sse(evento)
+    finally:
+        # El cliente se desconectó (o el servidor se está apagando)
+        eventos.bus.cancelar(suscripcion)
+
+
+@router.post("/token", response_model=schemas.Token)
+async def get_token_eventos(current_user = Depends(security.get_current_user_async)):
+    """
+    [TODOS LOS ROLES] Token para abrir el flujo: 'new EventSource("/api/events?access_token=...")'.
+    Dura STREAM_TOKEN_EXPIRE_SECONDS y solo sirve para /api/events (va en la URL y puede
+    quedar en logs). Se valida al conectar: si la conexión se cae, se pide otro antes de reabrirla.
+    """
+    return {"access_token": security.create_stream_token(current_user), "token_type": "bearer"}
+
+
+@router.get("")
+async def get_eventos(
+    db: Session = Depends(database.get_db),
+    current_user = Depends(security.get_current_user_stream)
+):
+    """
+    [TODOS LOS ROLES] Flujo de eventos (Server-Sent Events) del usuario:
+    'comentario', 'cambio_estado' y 'vacante_aprobada', con los ids para actualizar
+    solo lo que cambió. Si llega 'resync', se perdieron eventos: recargar las listas.
+    """
+    rol = security.get_principal_role(current_user)
+    user_id = security.get_principal_id(current_user)
+    escucha.iniciar(db.get_bind())
+    # La conexión dura lo que el usuario tenga la página abierta: no puede retener una conexión del pool
+    db.close()
+
+    suscripcion = eventos.bus.suscribir(rol, user_id)
+    return StreamingResponse(
+        _flujo(suscripcion),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # Sin buffer en nginx
+    )
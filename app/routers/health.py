@@ -0,0 +1,30 @@
+# /app/routers/health.py
+from fastapi import APIRouter, Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .. import database, hashing, models, security
+
+router = APIRouter()
+
+@router.get("/hashing")
+def get_hashing_health(
+    current_user: models.UsuarioUniversidad = Depends(security.get_current_admin_user)
+):
+    """
+    [ADMIN] Métricas del pool de hashing de contraseñas (argon2):
+    profundidad de la cola y peticiones rechazadas por saturación.
+    Solo para el admin: el tamaño del pool, la cola y el costo de argon2
+    permiten calcular cuánto tarda un login (y cuándo saturarlo).
+    """
+    return hashing.get_stats()
+
+
+@router.get("/db")
+def get_db_health(db: Session = Depends(database.get_db)):
+    """
+    Verifica la conexión a la BD y reporta el estado del pool de conexiones
+    de este worker (conexiones en uso, libres y de overflow).
+    """
+    db.execute(text("SELECT 1"))
+    return database.get_pool_status()
@@ -1,30 +1,50 @@
 # /app/routers/postulaciones.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from .. import crud, schemas, database, security, models
+from .. import concurrencia, crud, crud_async, huellas, schemas, database, security, models
 
 router = APIRouter()
 
 @router.get("/{postulacion_id}/historial", response_model=List[schemas.HistorialEstadoPostulacionResponse])
-def get_historial_de_postulacion(
+async def get_historial_de_postulacion(
     postulacion_id: int,
-    db: Session = Depends(database.get_db),
-    current_user = Depends(security.get_current_user) # Protegido: debe estar logueado
+    response: Response,
+    if_none_match: Optional[str] = Depends(concurrencia.copia_cliente), # If-None-Match
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user = Depends(security.get_current_user_async) # Protegido: debe estar logueado
 ):
     """
     [TODOS LOS ROLES] Obtiene el historial de seguimiento (comentarios)
-    de una postulación específica.
+    de una postulación específica. Responde 304 si no hay nada nuevo (If-None-Match).
     """
     # (En el futuro, aquí se puede añadir lógica de permisos
     # para asegurar que el estudiante/empresa solo vea sus propias postulaciones)
     
-    postulacion = db.get(models.Postulacion, postulacion_id)
+    postulacion = await crud_async.get_postulacion(db, postulacion_id)
     if not postulacion:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Postulación no encontrada.")
 
-    return crud.get_historial_por_postulacion(db=db, postulacion_id=postulacion_id)
+    # Sin nada nuevo, la marca de lectura ya quedó al día cuando el actor obtuvo su copia
+    etiqueta = huellas.etiqueta("historial", (await db.execute(huellas.historial(postulacion_id))).one())
+    if concurrencia.no_modificado(if_none_match, etiqueta):
+        return huellas.no_modificado(etiqueta)
+
+    historial = await crud_async.get_historial_por_postulacion(db=db, postulacion_id=postulacion_id)
+    huellas.set_etiqueta(response, etiqueta)
+
+    # El actor ya vio todo el historial: avanzamos su marca de lectura
+    if historial:
+        await crud_async.marcar_historial_leido(
+            db,
+            rol=security.get_principal_role(current_user),
+            actor_id=security.get_principal_id(current_user),
+            postulacion_id=postulacion_id,
+            ultimo_historial_id=max(h.id_historial for h in historial)
+        )
+    return historial
 
 
 @router.post("/{postulacion_id}/comentarios", response_model=schemas.HistorialEstadoPostulacionResponse)
@@ -13,6 +13,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[EmailStr] = None
+    rol: Optional[str] = None # 'admin', 'estudiante' o 'empresa'
+    id: Optional[int] = None  # Llave primaria en la tabla del rol
 
 
 # --- Schemas para ProgramaAcademico ---
@@ -105,6 +107,41 @@ class VacanteResponse(VacanteBase):
     fecha_publicacion: datetime
     estado: EstadoVacanteEnum
     empresa: EmpresaResponse
+    version: int # Para el header If-Match al modificarla
+
+    class Config:
+        from_attributes = True
+
+
+# --- Búsqueda de vacantes ---
+
+class VacanteBusquedaResponse(BaseModel):
+    vacante: VacanteResponse
+    relevancia: float
+
+class FacetaEmpresaResponse(BaseModel):
+    id_empresa: int
+    razon_social: str
+    total: int # Vacantes que coinciden con la búsqueda
+
+    class Config:
+        from_attributes = True
+
+class BusquedaVacantesResponse(BaseModel):
+    modo: str  # 'texto' o 'aproximado' (por trigramas, si el texto no encontró nada)
+    total: int # Coincidencias en todas las empresas (sin paginar)
+    resultados: List[VacanteBusquedaResponse]
+    facetas_empresa: List[FacetaEmpresaResponse]
+
+    class Config:
+        from_attributes = True
+
+
+# --- Recomendaciones ---
+
+class VacanteRecomendadaResponse(BaseModel):
+    vacante: VacanteResponse
+    puntaje: float # Similitud (0 a 1) entre la vacante y el programa del estudiante
 
     class Config:
         from_attributes = True
@@ -127,10 +164,71 @@ class PostulacionResponse(BaseModel):
     vacante: VacanteResponse
     fecha_inicio_practica: Optional[datetime] = None
     fecha_fin_practica: Optional[datetime] = None
+    version: int # Para el header If-Match al modificarla
 
     class Config:
         from_attributes = True
         
+# --- Formato normalizado (compacto) para listas de postulaciones ---
+# Cada fila lleva solo los ids; estudiantes, vacantes, empresas y programas
+# van UNA sola vez en sus propias tablas, en lugar de repetirse en cada fila.
+
+FORMATO_COMPLETO = "completo"
+FORMATO_NORMALIZADO = "normalizado"
+
+class EstudianteCompactoResponse(EstudianteBase):
+    id_estudiante: int
+    esta_activo: bool
+    fecha_creacion: datetime
+
+    class Config:
+        from_attributes = True
+
+class VacanteCompactaResponse(VacanteBase):
+    id_vacante: int
+    id_empresa: int
+    fecha_publicacion: datetime
+    estado: EstadoVacanteEnum
+    version: int
+
+    class Config:
+        from_attributes = True
+
+class PostulacionCompactaResponse(PostulacionBase):
+    id_postulacion: int
+    fecha_postulacion: datetime
+    estado_actual: EstadoPostulacionEnum
+    fecha_inicio_practica: Optional[datetime] = None
+    fecha_fin_practica: Optional[datetime] = None
+    version: int
+
+    class Config:
+        from_attributes = True
+
+class PostulacionesNormalizadasResponse(BaseModel):
+    postulaciones: List[PostulacionCompactaResponse]
+    estudiantes: List[EstudianteCompactoResponse]
+    vacantes: List[VacanteCompactaResponse]
+    empresas: List[EmpresaResponse]
+    programas: List[ProgramaAcademicoResponse]
+
+    @classmethod
+    def desde_postulaciones(cls, postulaciones) -> "PostulacionesNormalizadasResponse":
+        """Arma la respuesta normalizada a partir de postulaciones (con sus relaciones cargadas)."""
+        estudiantes, vacantes, empresas, programas = {}, {}, {}, {}
+        for p in postulaciones:
+            estudiantes.setdefault(p.estudiante.id_estudiante, p.estudiante)
+            programas.setdefault(p.estudiante.programa.id_programa, p.estudiante.programa)
+            vacantes.setdefault(p.vacante.id_vacante, p.vacante)
+            empresas.setdefault(p.vacante.empresa.id_empresa, p.vacante.empresa)
+        return cls.model_validate({
+            "postulaciones": postulaciones,
+            "estudiantes": list(estudiantes.values()),
+            "vacantes": list(vacantes.values()),
+            "empresas": list(empresas.values()),
+            "programas": list(programas.values()),
+        }, from_attributes=True)
+
 # --- Schemas para DocumentoAdjunto ---
 
 class DocumentoAdjuntoBase(BaseModel):
@@ -208,6 +306,61 @@ class PasswordChangeInput(BaseModel):
     old_password: str  # La contraseña actual (para verificar)
     new_password: str  # La contraseña nueva
 
+# importacion masiva (CSV)
+
+class ErrorImportacion(BaseModel):
+    fila: int     # Línea del archivo (la 1 es el encabezado)
+    mensaje: str
+
+class ImportacionResponse(BaseModel):
+    creados: int
+    errores: List[ErrorImportacion] # Las filas con error no se crean; las demás sí
+
+# revision en lote (admin)
+
+class VacantesLoteInput(BaseModel):
+    ids_vacantes: List[int]
+
+class AprobacionPostulacionLoteItem(AprobacionAdminInput):
+    id_postulacion: int
+    version: Optional[int] = None # Como If-Match: solo se aplica si la postulación sigue en esta versión
+
+class AprobacionPostulacionesLoteInput(BaseModel):
+    postulaciones: List[AprobacionPostulacionLoteItem] # Cada una con sus fechas y comentarios
+
+class RechazoPostulacionLoteItem(ComentarioCreate):
+    id_postulacion: int
+    version: Optional[int] = None
+
+class RechazoPostulacionesLoteInput(BaseModel):
+    postulaciones: List[RechazoPostulacionLoteItem]
+
+class ResultadoLoteItem(BaseModel):
+    id: int
+    ok: bool
+    estado: Optional[str] = None  # Estado resultante (si ok)
+    detalle: Optional[str] = None # Por qué no se aplicó (si no ok)
+
+class ResultadoLoteResponse(BaseModel):
+    aplicados: int
+    resultados: List[ResultadoLoteItem] # En el mismo orden de la petición
+
+# colas de revision repartidas entre coordinadores
+
+class RevisionesAsignadasResponse(BaseModel):
+    expira: Optional[datetime] = None # Hasta cuándo son del coordinador (renovables)
+    postulaciones: List[PostulacionResponse]
+    vacantes: List[VacanteResponse]
+
+class RevisionesInput(BaseModel):
+    # Sin ids: todas las del coordinador
+    postulaciones: List[int] = []
+    vacantes: List[int] = []
+
+class RevisionesRenovadasResponse(BaseModel):
+    renovadas: int
+    expira: datetime
+
 # estadisticas para admin
 
 class StatsAdminResponse(BaseModel):
@@ -1,32 +1,94 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 
-from . import schemas, models, database
+from . import schemas, models, database, hashing, invalidacion
+from .cache import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
 # --- CONFIGURACIÓN DE JWT ---
 SECRET_KEY = "tu-clave-secreta-muy-larga-y-dificil-de-adivinar"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Duración del token
+STREAM_TOKEN_EXPIRE_SECONDS = 60  # Duración del token de /api/events (solo sirve para abrir el flujo)
+ALCANCE_EVENTOS = "eventos"       # 'scope' del token de /api/events
 
 # --- CONFIGURACIÓN DE HASHING DE CONTRASEÑAS ---
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# argon2 corre en un pool de procesos dedicado (ver hashing.py)
+pwd_context = hashing.pwd_context
+
+# --- CACHÉ DE USUARIOS AUTENTICADOS (PRINCIPALES) ---
+PRINCIPAL_CACHE_MAXSIZE = 2048   # Máximo de usuarios guardados en memoria
+PRINCIPAL_CACHE_TTL_SECONDS = 60 # Tiempo máximo que un usuario vive en caché
+
+# Llaves "principal:<rol>:<id>"; los cambios se avisan a los demás workers (ver invalidacion.py)
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAXSIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+invalidacion.registrar_cache("principal", principal_cache)
+
+# Rol que viaja en el token -> Modelo (tabla) donde está el usuario
+PRINCIPAL_MODELS = {
+    "admin": models.UsuarioUniversidad,
+    "estudiante": models.Estudiante,
+    "empresa": models.Empresa,
+}
+# Columna del email de cada rol
+PRINCIPAL_EMAILS = {"admin": "email", "estudiante": "email_institucional", "empresa": "email_contacto"}
 
 # OAuth2 scheme: le dice a FastAPI cómo "extraer" el token del header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# Lo mismo, pero sin responder 401 si falta el header (ver get_current_user_stream)
+oauth2_scheme_opcional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
+def _hashing_saturado() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="El servidor está procesando demasiadas contraseñas. Intente de nuevo en unos segundos.",
+        headers={"Retry-After": "5"},
+    )
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña en texto plano coincide con el hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña y, si el hash usa parámetros de argon2 viejos,
+    retorna también el hash recalculado con los parámetros actuales.
+    """
+    try:
+        return hashing.verify_and_update(plain_password, hashed_password)
+    except hashing.HashingSaturadoError:
+        raise _hashing_saturado()
 
 def hash_password(password: str) -> str:
     """Retorna el hash de una contraseña en texto plano."""
-    return pwd_context.hash(password)
+    try:
+        return hashing.hash_password(password)
+    except hashing.HashingSaturadoError:
+        raise _hashing_saturado()
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Como verify_and_update_password, para endpoints 'async def' (no ocupa un hilo del servidor)."""
+    try:
+        return await hashing.verify_and_update_async(plain_password, hashed_password)
+    except hashing.HashingSaturadoError:
+        raise _hashing_saturado()
+
+async def hash_password_async(password: str) -> str:
+    """Como hash_password, para endpoints 'async def'."""
+    try:
+        return await hashing.hash_password_async(password)
+    except hashing.HashingSaturadoError:
+        raise _hashing_saturado()
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hashea un lote de contraseñas en paralelo (en el mismo orden)."""
+    return hashing.hash_passwords(passwords)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crea un nuevo token de acceso JWT."""
@@ -40,18 +102,140 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def decode_access_token(token: str, credentials_exception) -> schemas.TokenData:
-    """Decodifica un token. Si es inválido, lanza una excepción."""
+def create_stream_token(user) -> str:
+    """
+    Token de corta duración que SOLO sirve para abrir /api/events. Va en la URL
+    (el EventSource del navegador no envía headers), así que puede quedar en logs:
+    por eso caduca pronto y no lo acepta ningún otro endpoint.
+    """
+    rol = get_principal_role(user)
+    return create_access_token(
+        data={
+            "sub": getattr(user, PRINCIPAL_EMAILS[rol]),
+            "rol": rol,
+            "uid": get_principal_id(user),
+            "scope": ALCANCE_EVENTOS,
+        },
+        expires_delta=timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+
+def decode_access_token(token: str, credentials_exception, alcance: Optional[str] = None) -> schemas.TokenData:
+    """
+    Decodifica un token. Si es inválido, lanza una excepción.
+    'alcance': el 'scope' que debe traer (None = un token de acceso normal, sin 'scope').
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("scope") != alcance:
             raise credentials_exception
-        token_data = schemas.TokenData(email=email)
+        token_data = schemas.TokenData(email=email, rol=payload.get("rol"), id=payload.get("uid"))
     except JWTError:
         raise credentials_exception
     return token_data
 
+# --- Resolución del usuario (principal) a partir del token ---
+
+def get_principal_role(user) -> Optional[str]:
+    """Retorna el rol ('admin', 'estudiante' o 'empresa') de un usuario."""
+    for rol, model in PRINCIPAL_MODELS.items():
+        if isinstance(user, model):
+            return rol
+    return None
+
+def get_principal_id(user) -> int:
+    """Retorna la llave primaria del usuario, sea cual sea su tabla."""
+    if isinstance(user, models.UsuarioUniversidad):
+        return user.id_usuario
+    if isinstance(user, models.Estudiante):
+        return user.id_estudiante
+    return user.id_empresa
+
+def get_principal(db: Session, rol: str, user_id: int):
+    """
+    Busca un usuario directamente en la tabla de su rol.
+    Primero se consulta la caché; si no está, se carga de la BD y se guarda.
+    """
+    key = f"principal:{rol}:{user_id}"
+    cached = principal_cache.get(key)
+    if cached is not None:
+        # merge(load=False) asocia una copia a la sesión actual SIN consultar la BD
+        return db.merge(cached, load=False)
+
+    model = PRINCIPAL_MODELS.get(rol)
+    if model is None:
+        return None
+
+    options = []
+    if model is models.Estudiante:
+        options.append(joinedload(models.Estudiante.programa))
+    user = db.get(model, user_id, options=options)
+    if user is None:
+        return None
+
+    # Guardamos en caché el objeto "desligado" de la sesión y
+    # devolvemos a la petición una copia asociada a su propia sesión.
+    # (el programa se lee ANTES: si el estudiante ya estaba en la sesión, joinedload no lo cargó)
+    programa = user.programa if isinstance(user, models.Estudiante) else None
+    db.expunge(user)
+    if programa is not None:
+        db.expunge(programa)
+    principal_cache.set(key, user)
+    return db.merge(user, load=False)
+
+async def get_principal_async(db: AsyncSession, rol: str, user_id: int):
+    """Lo mismo que get_principal, con una sesión asíncrona (misma caché)."""
+    key = f"principal:{rol}:{user_id}"
+    cached = principal_cache.get(key)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    model = PRINCIPAL_MODELS.get(rol)
+    if model is None:
+        return None
+
+    options = []
+    if model is models.Estudiante:
+        options.append(joinedload(models.Estudiante.programa))
+    user = await db.get(model, user_id, options=options)
+    if user is None:
+        return None
+
+    programa = user.programa if isinstance(user, models.Estudiante) else None
+    db.expunge(user)
+    if programa is not None:
+        db.expunge(programa)
+    principal_cache.set(key, user)
+    return await db.merge(user, load=False)
+
+def invalidate_principal(user) -> None:
+    """Saca a un usuario de la caché (ej. al activarlo/inactivarlo o cambiar su contraseña)."""
+    invalidacion.invalidar(f"principal:{get_principal_role(user)}:{get_principal_id(user)}")
+
+def _get_user_by_email(db: Session, email: str):
+    """Búsqueda antigua en las TRES tablas (para tokens emitidos sin rol)."""
+    user = db.query(models.UsuarioUniversidad).filter(models.UsuarioUniversidad.email == email).first()
+    if user:
+        return user
+
+    user = db.query(models.Estudiante).options(joinedload(models.Estudiante.programa)).filter(models.Estudiante.email_institucional == email).first()
+    if user:
+        return user
+
+    return db.query(models.Empresa).filter(models.Empresa.email_contacto == email).first()
+
+async def _get_user_by_email_async(db: AsyncSession, email: str):
+    busquedas = [
+        select(models.UsuarioUniversidad).filter(models.UsuarioUniversidad.email == email),
+        select(models.Estudiante).options(joinedload(models.Estudiante.programa)).filter(models.Estudiante.email_institucional == email),
+        select(models.Empresa).filter(models.Empresa.email_contacto == email),
+    ]
+    for stmt in busquedas:
+        user = await db.scalar(stmt.limit(1))
+        if user is not None:
+            return user
+    return None
+
 # --- Función de Dependencia (para proteger endpoints) ---
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
@@ -67,31 +251,69 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     
     token_data = decode_access_token(token, credentials_exception)
     
-    # Busca el usuario en las TRES tablas
-    user = db.query(models.UsuarioUniversidad).filter(models.UsuarioUniversidad.email == token_data.email).first()
-    if user:
-        return user
-        
-    user = db.query(models.Estudiante).options(joinedload(models.Estudiante.programa)).filter(models.Estudiante.email_institucional == token_data.email).first()
-    if user:
-        return user
+    # El token trae el rol y el id: vamos directo a la tabla correcta
+    if token_data.rol is not None and token_data.id is not None:
+        user = get_principal(db, token_data.rol, token_data.id)
+    else:
+        user = _get_user_by_email(db, token_data.email)
 
-    user = db.query(models.Empresa).filter(models.Empresa.email_contacto == token_data.email).first()
-    if user:
-        return user
+    # Si no se encuentra, el token es válido pero el usuario ya no existe
+    if user is None:
+        raise credentials_exception
+    return user
 
-    # Si no se encuentra en ninguna tabla, el token es válido pero el usuario ya no existe
-    raise credentials_exception
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Como get_current_user, para los endpoints 'async def': resuelve el usuario con la
+    sesión asíncrona, sin pasar por un hilo del servidor ni bloquear el event loop.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
-# habilitar creacion de usuarios desde admin
+    token_data = decode_access_token(token, credentials_exception)
+    if token_data.rol is not None and token_data.id is not None:
+        user = await get_principal_async(db, token_data.rol, token_data.id)
+    else:
+        user = await _get_user_by_email_async(db, token_data.email)
 
-def get_current_admin_user(
-    current_user: models.UsuarioUniversidad = Depends(get_current_user)
-) -> models.UsuarioUniversidad:
+    if user is None:
+        raise credentials_exception
+    return user
+
+def get_current_user_stream(
+    token: Optional[str] = Depends(oauth2_scheme_opcional),
+    access_token: Optional[str] = Query(None),
+    db: Session = Depends(database.get_db)
+):
     """
-    Dependencia que verifica que el usuario actual sea un
-    'Administrador' o 'Coordinador'.
+    Como get_current_user, para /api/events: el EventSource del navegador no puede
+    enviar headers, así que se acepta '?access_token=...', pero SOLO con un token de
+    eventos (ver create_stream_token y POST /api/events/token). El token de acceso
+    normal nunca viaja en la URL: con él, solo por el header Authorization.
     """
+    if token is not None:
+        return get_current_user(token, db)
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated" if access_token is None else "No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if access_token is None:
+        raise credentials_exception
+
+    token_data = decode_access_token(access_token, credentials_exception, alcance=ALCANCE_EVENTOS)
+    user = get_principal(db, token_data.rol, token_data.id)
+    if user is None:
+        raise credentials_exception
+    return user
+
+# habilitar creacion de usuarios desde admin
+
+def _exigir_admin(current_user) -> models.UsuarioUniversidad:
+    """Verifica que el usuario sea un 'Administrador' o 'Coordinador'."""
     # Primero, nos aseguramos de que sea un UsuarioUniversidad (no un Estudiante)
     if not isinstance(current_user, models.UsuarioUniversidad):
         raise HTTPException(
@@ -108,6 +330,21 @@ def get_current_admin_user(
         
     return current_user
 
+def get_current_admin_user(
+    current_user: models.UsuarioUniversidad = Depends(get_current_user)
+) -> models.UsuarioUniversidad:
+    """
+    Dependencia que verifica que el usuario actual sea un
+    'Administrador' o 'Coordinador'.
+    """
+    return _exigir_admin(current_user)
+
+async def get_current_admin_user_async(
+    current_user: models.UsuarioUniversidad = Depends(get_current_user_async)
+) -> models.UsuarioUniversidad:
+    """Lo mismo, para endpoints 'async def'."""
+    return _exigir_admin(current_user)
+
 # Autorizacion para las empresas
 
 def get_current_empresa_user(
@@ -125,15 +362,24 @@ def get_current_empresa_user(
 
 # verificacion de usuario estudiante
 
+def _exigir_estudiante(current_user) -> models.Estudiante:
+    if not isinstance(current_user, models.Estudiante):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Acceso denegado: Se requiere rol de estudiante."
+        )
+    return current_user
+
 def get_current_student_user(
     current_user: models.Estudiante = Depends(get_current_user)
 ) -> models.Estudiante:
     """
     Dependencia que verifica que el usuario actual sea un Estudiante.
     """
-    if not isinstance(current_user, models.Estudiante):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, 
-            detail="Acceso denegado: Se requiere rol de estudiante."
-        )
-    return current_user
\ No newline at end of file
+    return _exigir_estudiante(current_user)
+
+async def get_current_student_user_async(
+    current_user: models.Estudiante = Depends(get_current_user_async)
+) -> models.Estudiante:
+    """Lo mismo, para endpoints 'async def'."""
+    return _exigir_estudiante(current_user)
\ No newline at end of file
@@ -0,0 +1,71 @@
+# /app/serializacion.py
+# Camino rápido para listas grandes: en vez de cargar entidades ORM y validarlas fila
+# por fila con Pydantic (from_attributes), se seleccionan SOLO las columnas que la
+# respuesta necesita (filas de Core), se arman los dicts directamente y se codifican con orjson.
+# La forma del JSON es la misma de los schemas (ej. PostulacionResponse).
+from typing import Any, List
+
+import orjson
+from fastapi import Response
+from sqlalchemy import select
+
+from . import models, schemas
+
+
+class ORJSONRapidoResponse(Response):
+    """Respuesta JSON codificada con orjson (sin pasar por el response_model)."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def _campos(schema, model) -> List[str]:
+    """Campos del schema que son columnas del modelo (los anidados se arman aparte)."""
+    columnas = model.__table__.columns
+    return [campo for campo in schema.model_fields if campo in columnas]
+
+# Se derivan de los schemas para que ambos caminos respondan exactamente los mismos campos
+CAMPOS_POSTULACION = _campos(schemas.PostulacionResponse, models.Postulacion)
+CAMPOS_ESTUDIANTE = _campos(schemas.EstudianteResponse, models.Estudiante)
+CAMPOS_PROGRAMA = _campos(schemas.ProgramaAcademicoResponse, models.ProgramaAcademico)
+CAMPOS_VACANTE = _campos(schemas.VacanteResponse, models.Vacante)
+CAMPOS_EMPRESA = _campos(schemas.EmpresaResponse, models.Empresa)
+
+
+def _columnas(model, campos: List[str], prefijo: str = "") -> list:
+    return [getattr(model, campo).label(prefijo + campo) for campo in campos]
+
+def select_postulaciones_filas():
+    """
+    SELECT de las columnas de PostulacionResponse (con estudiante -> programa y
+    vacante -> empresa) en una sola consulta. Las columnas de la postulación
+    conservan su nombre, así que paginar()/paginar_resultados() funcionan igual.
+    """
+    return select(
+        *_columnas(models.Postulacion, CAMPOS_POSTULACION),
+        *_columnas(models.Estudiante, CAMPOS_ESTUDIANTE, "estudiante__"),
+        *_columnas(models.ProgramaAcademico, CAMPOS_PROGRAMA, "programa__"),
+        *_columnas(models.Vacante, CAMPOS_VACANTE, "vacante__"),
+        *_columnas(models.Empresa, CAMPOS_EMPRESA, "empresa__"),
+    )\
+        .select_from(models.Postulacion)\
+        .join(models.Estudiante, models.Postulacion.estudiante)\
+        .join(models.ProgramaAcademico, models.Estudiante.programa)\
+        .join(models.Vacante, models.Postulacion.vacante)\
+        .join(models.Empresa, models.Vacante.empresa)
+
+def _sub_dict(fila, campos: List[str], prefijo: str) -> dict:
+    return {campo: fila[prefijo + campo] for campo in campos}
+
+def postulacion_a_dict(fila) -> dict:
+    """Convierte una fila de select_postulaciones_filas() en el dict de PostulacionResponse."""
+    fila = fila._mapping
+    estudiante = _sub_dict(fila, CAMPOS_ESTUDIANTE, "estudiante__")
+    estudiante["programa"] = _sub_dict(fila, CAMPOS_PROGRAMA, "programa__")
+    vacante = _sub_dict(fila, CAMPOS_VACANTE, "vacante__")
+    vacante["empresa"] = _sub_dict(fila, CAMPOS_EMPRESA, "empresa__")
+    postulacion = _sub_dict(fila, CAMPOS_POSTULACION, "")
+    postulacion["estudiante"] = estudiante
+    postulacion["vacante"] = vacante
+    return postulacion
@@ -161,3 +161,1397 @@ def test_student_views_vacancies(client, test_student):
     # La lista debe estar vacía porque no hay vacantes en estado "Abierta"
     assert response_get.json() == []
 
+
+# --- ¡PRUEBA 7! ---
+
+def test_token_con_rol_y_cache_invalidada(client, test_admin, test_student):
+    """
+    Caso de Prueba 7: [AUTH]
+    El token lleva el rol y el id del usuario, y la caché de usuarios
+    se invalida cuando el admin inactiva al estudiante.
+    """
+    from jose import jwt
+    from app import security
+    estudiante_id = test_student.id_estudiante
+
+    # 1. Login del estudiante: el token debe traer rol e id
+    response_login = client.post("/api/auth/login", data={
+        "username": "estudiante.fixture@ucn.edu.co",
+        "password": "studentpass"
+    })
+    token = response_login.json()["access_token"]
+    payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+    assert payload["rol"] == "estudiante"
+    assert payload["uid"] == estudiante_id
+    student_headers = {"Authorization": f"Bearer {token}"}
+
+    # 2. /me deja al estudiante en la caché
+    assert client.get("/api/auth/me", headers=student_headers).json()["user_data"]["esta_activo"] == True
+
+    # 3. El admin inactiva al estudiante
+    response_login = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    admin_headers = {"Authorization": f"Bearer {response_login.json()['access_token']}"}
+    response = client.patch(f"/api/admin/estudiantes/{estudiante_id}/inactivar", headers=admin_headers)
+    assert response.status_code == 200
+
+    # 4. /me ya no debe responder con los datos viejos de la caché
+    assert client.get("/api/auth/me", headers=student_headers).json()["user_data"]["esta_activo"] == False
+
+    # 5. Los endpoints 'async def' resuelven al usuario con la sesión async (misma caché),
+    #    también con tokens antiguos que solo traen el email, y verifican el rol
+    assert client.get("/api/estudiantes/vacantes", headers=student_headers).status_code == 200
+    token_antiguo = security.create_access_token(data={"sub": "estudiante.fixture@ucn.edu.co"})
+    response = client.get("/api/estudiantes/vacantes/recomendadas", headers={"Authorization": f"Bearer {token_antiguo}"})
+    assert response.status_code == 200
+    assert client.get("/api/estudiantes/vacantes", headers=admin_headers).status_code == 403
+
+# --- ¡PRUEBA 8! ---
+
+def test_indice_de_identidades(client, db_session, test_admin, test_programa):
+    """
+    Caso de Prueba 8: [AUTH]
+    Un usuario creado por el admin queda en el índice unificado:
+    puede hacer login (sin importar mayúsculas) y su email no se puede
+    reutilizar en otro rol. Un email que no existe se recuerda y sus
+    reintentos ya no buscan en las tablas de usuarios; uno insertado
+    directo en la BD se encuentra sin importar mayúsculas.
+    """
+    from app import crud_async, models, security
+
+    programa_id = test_programa.id_programa
+    response_login = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers = {"Authorization": f"Bearer {response_login.json()['access_token']}"}
+
+    # 1. El admin crea una empresa
+    response_create = client.post("/api/admin/empresas", headers=headers, json={
+        "razon_social": "Empresa Indexada",
+        "nit": "111.222.333-4",
+        "email_contacto": "indexada@test.com",
+        "password": "indexadapass"
+    })
+    assert response_create.status_code == 201
+
+    # 2. Login con el email en mayúsculas
+    response_login = client.post("/api/auth/login", data={
+        "username": "INDEXADA@test.com",
+        "password": "indexadapass"
+    })
+    assert response_login.status_code == 200
+
+    # 3. El mismo email no se puede usar para un estudiante
+    response_create = client.post("/api/admin/estudiantes", headers=headers, json={
+        "nombre": "Otro",
+        "apellido": "Estudiante",
+        "email_institucional": "indexada@test.com",
+        "id_programa": programa_id,
+        "password": "otropass"
+    })
+    assert response_create.status_code == 400
+
+    # 4. Un email sin usuario: 401, y queda recordado como ausente
+    response_login = client.post("/api/auth/login", data={"username": "Nadie@test.com", "password": "x"})
+    assert response_login.status_code == 401
+    assert crud_async.identidades_ausentes.get("nadie@test.com") is True
+
+    # 5. Un usuario insertado directo en la BD (sin el índice), con mayúsculas en su email
+    db_session.add(models.Empresa(razon_social="Empresa Directa", nit="555.666.777-8",
+                                  email_contacto="Juan@Directa.com", hashed_password=security.hash_password("juanpass")))
+    db_session.commit()
+    response_login = client.post("/api/auth/login", data={"username": "juan@directa.com", "password": "juanpass"})
+    assert response_login.status_code == 200
+    assert crud_async.identidades_ausentes.get("juan@directa.com") is None
+
+# --- ¡PRUEBA 9! ---
+
+def test_metricas_pool_hashing(client, test_admin, monkeypatch):
+    """
+    Caso de Prueba 9: [SALUD]
+    Después de un login, el pool de hashing reporta sus métricas
+    y no queda ninguna operación pendiente (solo el admin las ve). Si el
+    pool está lleno, el login se rechaza de inmediato (503), sin esperar un cupo.
+    """
+    assert client.get("/api/health/hashing").status_code == 401
+
+    response_login = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    assert response_login.status_code == 200
+    headers = {"Authorization": f"Bearer {response_login.json()['access_token']}"}
+
+    response = client.get("/api/health/hashing", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["en_cola"] == 0
+    assert response.json()["max_pendientes"] >= 1
+    rechazadas = response.json()["rechazadas"]
+
+    from app import hashing
+    monkeypatch.setattr(hashing, "HASH_MAX_PENDING", 0) # Pool "lleno"
+    response_login = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    assert response_login.status_code == 503
+    assert response_login.headers["Retry-After"] == "5"
+    assert client.get("/api/health/hashing", headers=headers).json()["rechazadas"] == rechazadas + 1
+
+# --- ¡PRUEBA 10! ---
+
+def test_paginacion_por_cursor(client, db_session, test_admin, test_empresa):
+    """
+    Caso de Prueba 10: [ADMIN]
+    Las vacantes pendientes se pueden recorrer por páginas con 'limit' y
+    el cursor del header 'X-Next-Cursor', sin repetir ni saltar elementos.
+    """
+    from app import models
+
+    # 1. SETUP: 5 vacantes en revisión
+    for i in range(5):
+        db_session.add(models.Vacante(
+            id_empresa=test_empresa.id_empresa,
+            titulo_vacante=f"Vacante {i}",
+            descripcion_funciones="Funciones de prueba.",
+            estado=models.EstadoVacanteEnum.En_Revision
+        ))
+    db_session.commit()
+
+    response_login = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers = {"Authorization": f"Bearer {response_login.json()['access_token']}"}
+
+    # 2. Recorrer las páginas de 2 en 2
+    vistos = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/admin/vacantes/pendientes", headers=headers, params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        vistos.extend(v["id_vacante"] for v in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    # 3. Se vieron las 5, sin repetir, de la más nueva a la más vieja
+    assert len(vistos) == 5
+    assert vistos == sorted(set(vistos), reverse=True)
+
+    # 4. Un cursor inválido responde 400
+    response = client.get("/api/admin/vacantes/pendientes", headers=headers, params={"limit": 2, "cursor": "xx"})
+    assert response.status_code == 400
+
+# --- ¡PRUEBA 11! ---
+
+def test_consultas_frecuentes_usan_indices(db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 11: [BD]
+    Ejecuta las consultas de los dashboards (las de crud.py), captura su SQL
+    y verifica con EXPLAIN que Postgres usa los índices diseñados para ellas.
+    """
+    from sqlalchemy import event
+    from app import crud, models
+
+    # 1. SETUP: una vacante abierta con una postulación y su historial
+    vacante = models.Vacante(
+        id_empresa=test_empresa.id_empresa,
+        titulo_vacante="Vacante Indexada",
+        descripcion_funciones="Funciones de prueba.",
+        estado=models.EstadoVacanteEnum.Abierta
+    )
+    db_session.add(vacante)
+    db_session.commit()
+    postulacion = models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante)
+    db_session.add(postulacion)
+    db_session.commit()
+    db_session.add(models.HistorialEstadoPostulacion(
+        id_postulacion=postulacion.id_postulacion,
+        estado=models.EstadoPostulacionEnum.Recibida
+    ))
+    db_session.commit()
+    empresa_id, estudiante_id, postulacion_id = test_empresa.id_empresa, test_student.id_estudiante, postulacion.id_postulacion
+
+    consultas_e_indices = [
+        (lambda: crud.get_vacantes_disponibles(db_session), "ix_vacantes_abiertas_fecha"),
+        (lambda: crud.get_vacantes_por_empresa(db_session, empresa_id), "ix_vacantes_empresa_fecha"),
+        (lambda: crud.get_postulaciones_por_estudiante(db_session, estudiante_id), "ix_postulaciones_estudiante_fecha"),
+        (lambda: crud.get_practicas_activas_y_finalizadas(db_session), "ix_postulaciones_estado_fecha"),
+        # (ix_historial_postulacion_fecha o ix_historial_postulacion_id: ambos empiezan por id_postulacion)
+        (lambda: crud.get_historial_por_postulacion(db_session, postulacion_id), "ix_historial_postulacion_"),
+    ]
+
+    connection = db_session.connection()
+    cursor = connection.connection.cursor()
+    # Con tablas tan pequeñas Postgres prefiere leerlas completas; se lo prohibimos
+    cursor.execute("SET enable_seqscan = off")
+
+    for consulta, indice in consultas_e_indices:
+        # 2. Capturamos el SQL real que genera la función de crud
+        capturadas = []
+        def capturar(conn, cur, statement, parameters, context, executemany):
+            capturadas.append((statement, parameters))
+        event.listen(connection, "before_cursor_execute", capturar)
+        consulta()
+        event.remove(connection, "before_cursor_execute", capturar)
+
+        # 3. EXPLAIN de la consulta principal: debe usar el índice esperado
+        statement, parameters = capturadas[0]
+        cursor.execute("EXPLAIN " + statement, parameters)
+        plan = "\n".join(fila[0] for fila in cursor.fetchall())
+        assert indice in plan, plan
+
+    cursor.execute("RESET enable_seqscan")
+
+# --- ¡PRUEBA 12! ---
+
+def test_postulacion_repetida(client, db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 12: [ESTUDIANTE]
+    Un estudiante se postula a una vacante abierta; la segunda vez
+    la BD rechaza el duplicado y la API responde 400.
+    """
+    from app import models
+
+    vacante = models.Vacante(
+        id_empresa=test_empresa.id_empresa,
+        titulo_vacante="Vacante Abierta",
+        descripcion_funciones="Funciones de prueba.",
+        estado=models.EstadoVacanteEnum.Abierta
+    )
+    db_session.add(vacante)
+    db_session.commit()
+    vacante_id = vacante.id_vacante
+
+    response_login = client.post("/api/auth/login", data={
+        "username": "estudiante.fixture@ucn.edu.co",
+        "password": "studentpass"
+    })
+    headers = {"Authorization": f"Bearer {response_login.json()['access_token']}"}
+
+    # 1. Primera postulación: se crea
+    response = client.post(f"/api/estudiantes/vacantes/{vacante_id}/postular", headers=headers)
+    assert response.status_code == 201
+    assert response.json()["estado_actual"] == "Recibida"
+    assert response.json()["vacante"]["empresa"]["razon_social"] == "Empresa de Prueba Fixture S.A.S."
+
+    # 2. Segunda postulación: rechazada
+    response = client.post(f"/api/estudiantes/vacantes/{vacante_id}/postular", headers=headers)
+    assert response.status_code == 400
+    assert db_session.query(models.Postulacion).count() == 1
+
+# --- ¡PRUEBA 13! ---
+
+def test_salud_de_la_bd(client):
+    """
+    Caso de Prueba 13: [SALUD]
+    El endpoint de salud responde con el estado del pool de conexiones.
+    """
+    response = client.get("/api/health/db")
+    assert response.status_code == 200
+    assert "pool" in response.json()
+
+# --- ¡PRUEBA 14! ---
+
+def test_stats_admin_se_invalidan(client, test_admin, test_empresa):
+    """
+    Caso de Prueba 14: [ADMIN]
+    Los KPIs se guardan en caché, pero una vacante nueva se ve de inmediato
+    (la creación invalida la caché).
+    """
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers_admin = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+    login_empresa = client.post("/api/auth/login", data={
+        "username": "empresa.fixture@test.com",
+        "password": "empresapass"
+    })
+    headers_empresa = {"Authorization": f"Bearer {login_empresa.json()['access_token']}"}
+
+    # 1. KPIs iniciales (quedan en caché)
+    response = client.get("/api/admin/stats", headers=headers_admin)
+    assert response.status_code == 200
+    pendientes = response.json()["practicas_por_aprobar"]
+
+    # 2. La empresa publica una vacante (queda 'En Revisión')
+    response = client.post("/api/empresas/vacantes", headers=headers_empresa, json={
+        "titulo_vacante": "Vacante KPI",
+        "descripcion_funciones": "Funciones de prueba."
+    })
+    assert response.status_code == 201
+
+    # 3. El dashboard la cuenta sin esperar a que expire la caché
+    response = client.get("/api/admin/stats", headers=headers_admin)
+    assert response.json()["practicas_por_aprobar"] == pendientes + 1
+
+# --- ¡PRUEBA 15! ---
+
+def test_mensajes_sin_leer(client, db_session, test_admin, test_empresa, test_student):
+    """
+    Caso de Prueba 15: [ESTUDIANTE]
+    Los mensajes nuevos son los comentarios posteriores a la última vez
+    que el estudiante abrió el historial de la postulación.
+    """
+    from app import models
+
+    vacante = models.Vacante(
+        id_empresa=test_empresa.id_empresa,
+        titulo_vacante="Vacante Abierta",
+        descripcion_funciones="Funciones de prueba.",
+        estado=models.EstadoVacanteEnum.Abierta
+    )
+    db_session.add(vacante)
+    db_session.commit()
+    postulacion = models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante)
+    db_session.add(postulacion)
+    db_session.commit()
+    postulacion_id = postulacion.id_postulacion
+    db_session.add(models.HistorialEstadoPostulacion(
+        id_postulacion=postulacion_id,
+        estado=models.EstadoPostulacionEnum.Recibida,
+        comentarios="Bienvenido al proceso.",
+        id_actor_universidad=test_admin.id_usuario
+    ))
+    db_session.commit()
+
+    login_estudiante = client.post("/api/auth/login", data={
+        "username": "estudiante.fixture@ucn.edu.co",
+        "password": "studentpass"
+    })
+    headers_estudiante = {"Authorization": f"Bearer {login_estudiante.json()['access_token']}"}
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers_admin = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    # 1. Un comentario sin leer
+    response = client.get("/api/estudiantes/stats", headers=headers_estudiante)
+    assert response.json()["mensajes_nuevos"] == 1
+
+    # 2. El estudiante abre el historial: ya no hay mensajes nuevos
+    response = client.get(f"/api/postulaciones/{postulacion_id}/historial", headers=headers_estudiante)
+    assert response.status_code == 200
+    response = client.get("/api/estudiantes/stats", headers=headers_estudiante)
+    assert response.json()["mensajes_nuevos"] == 0
+
+    # 3. El admin comenta de nuevo: vuelve a haber uno
+    response = client.post(f"/api/postulaciones/{postulacion_id}/comentarios", headers=headers_admin, json={
+        "comentarios": "Por favor adjunta tu hoja de vida."
+    })
+    assert response.status_code == 200
+    response = client.get("/api/estudiantes/stats", headers=headers_estudiante)
+    assert response.json()["mensajes_nuevos"] == 1
+
+# --- ¡PRUEBA 16! ---
+
+def test_postulaciones_formato_normalizado(client, db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 16: [EMPRESA]
+    Con ?formato=normalizado cada empresa, programa y estudiante
+    aparece una sola vez, y las filas solo llevan sus ids.
+    """
+    from app import models
+
+    for titulo in ("Vacante A", "Vacante B"):
+        vacante = models.Vacante(
+            id_empresa=test_empresa.id_empresa,
+            titulo_vacante=titulo,
+            descripcion_funciones="Funciones de prueba.",
+            estado=models.EstadoVacanteEnum.Abierta
+        )
+        db_session.add(vacante)
+        db_session.commit()
+        db_session.add(models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante))
+        db_session.commit()
+
+    login_empresa = client.post("/api/auth/login", data={
+        "username": "empresa.fixture@test.com",
+        "password": "empresapass"
+    })
+    headers = {"Authorization": f"Bearer {login_empresa.json()['access_token']}"}
+
+    # 1. Formato por defecto: sin cambios (objetos anidados)
+    response = client.get("/api/empresas/postulaciones", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert "empresa" in response.json()[0]["vacante"]
+
+    # 2. Formato normalizado
+    response = client.get("/api/empresas/postulaciones?formato=normalizado", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["postulaciones"]) == 2
+    assert len(data["vacantes"]) == 2
+    assert len(data["estudiantes"]) == 1
+    assert len(data["empresas"]) == 1
+    assert len(data["programas"]) == 1
+    assert "vacante" not in data["postulaciones"][0]
+    assert data["postulaciones"][0]["id_estudiante"] == data["estudiantes"][0]["id_estudiante"]
+
+# --- ¡PRUEBA 17! ---
+
+def test_practicas_camino_rapido(client, db_session, test_admin, test_empresa, test_student):
+    """
+    Caso de Prueba 17: [ADMIN]
+    El seguimiento de prácticas (camino rápido con orjson) responde
+    los mismos campos que PostulacionResponse.
+    """
+    from app import models, schemas
+
+    vacante = models.Vacante(
+        id_empresa=test_empresa.id_empresa,
+        titulo_vacante="Vacante Cubierta",
+        descripcion_funciones="Funciones de prueba.",
+        estado=models.EstadoVacanteEnum.Cubierta
+    )
+    db_session.add(vacante)
+    db_session.commit()
+    postulacion = models.Postulacion(
+        id_estudiante=test_student.id_estudiante,
+        id_vacante=vacante.id_vacante,
+        estado_actual=models.EstadoPostulacionEnum.Aprobada
+    )
+    db_session.add(postulacion)
+    db_session.commit()
+    esperado = schemas.PostulacionResponse.model_validate(postulacion).model_dump(mode="json")
+
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    response = client.get("/api/admin/practicas/historial", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    practica = response.json()[0]
+
+    # Mismos campos (también en los objetos anidados) y mismos valores
+    assert practica.keys() == esperado.keys()
+    assert practica["estudiante"].keys() == esperado["estudiante"].keys()
+    assert practica["estudiante"]["programa"] == esperado["estudiante"]["programa"]
+    assert practica["vacante"].keys() == esperado["vacante"].keys()
+    assert practica["vacante"]["empresa"].keys() == esperado["vacante"]["empresa"].keys()
+    assert practica["estado_actual"] == "Aprobada"
+    assert practica["vacante"]["estado"] == "Cubierta"
+    assert practica["vacante"]["empresa"]["razon_social"] == "Empresa de Prueba Fixture S.A.S."
+
+# --- ¡PRUEBA 18! ---
+
+def test_listas_cargan_lo_justo(db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 18: [BD]
+    Las listas de postulaciones hacen un número fijo de consultas, nunca traen
+    hashed_password y traen cada vacante (con su descripción larga) una sola vez.
+    """
+    from sqlalchemy import event
+    from app import crud, models
+
+    descripcion = "Funciones de la práctica. " * 800 # ~20 KB
+    vacante = models.Vacante(
+        id_empresa=test_empresa.id_empresa,
+        titulo_vacante="Vacante Pesada",
+        descripcion_funciones=descripcion,
+        estado=models.EstadoVacanteEnum.Abierta
+    )
+    db_session.add(vacante)
+    db_session.commit()
+    vacante_id, estudiante_id, programa_id = vacante.id_vacante, test_student.id_estudiante, test_student.id_programa
+
+    # Otros dos estudiantes se postulan a la MISMA vacante
+    for i in range(2):
+        otro = models.Estudiante(
+            id_programa=programa_id, nombre=f"Otro{i}", apellido="Estudiante",
+            email_institucional=f"otro{i}@ucn.edu.co", hashed_password="x"
+        )
+        db_session.add(otro)
+        db_session.commit()
+        db_session.add(models.Postulacion(id_estudiante=otro.id_estudiante, id_vacante=vacante_id))
+    db_session.add(models.Postulacion(id_estudiante=estudiante_id, id_vacante=vacante_id))
+    db_session.commit()
+    db_session.expunge_all() # Sesión "fría", como en una petición nueva
+
+    capturadas = []
+    def capturar(conn, cur, statement, parameters, context, executemany):
+        capturadas.append((statement, parameters))
+    connection = db_session.connection()
+    event.listen(connection, "before_cursor_execute", capturar)
+    postulaciones = crud.get_postulaciones_por_estado(db_session, models.EstadoPostulacionEnum.Recibida)
+    event.remove(connection, "before_cursor_execute", capturar)
+
+    assert len(postulaciones) == 3
+    assert all(p.vacante.empresa.razon_social and p.estudiante.programa.nombre_programa for p in postulaciones)
+
+    # 1. Consultas: postulaciones + estudiantes + programas + vacantes + empresas
+    assert len(capturadas) == 5
+    # 2. Nunca se selecciona el hash de la contraseña
+    assert not any("hashed_password" in statement for statement, _ in capturadas)
+    # 3. Bytes traídos: la descripción viaja una vez, no una vez por postulación
+    cursor = connection.connection.cursor()
+    traidos = 0
+    for statement, parameters in capturadas:
+        cursor.execute(statement, parameters)
+        traidos += sum(len(str(valor)) for fila in cursor.fetchall() for valor in fila)
+    assert traidos < 2 * len(descripcion)
+
+# --- ¡PRUEBA 19! ---
+
+def test_buscar_vacantes(client, db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 19: [ESTUDIANTE]
+    Búsqueda de texto en las vacantes abiertas: resultados por relevancia,
+    facetas por empresa, sin importar las tildes y tolerando errores de digitación.
+    """
+    from app import models
+
+    otra_empresa = models.Empresa(
+        razon_social="Analítica Andina S.A.S.", nit="900.111.222-3",
+        email_contacto="andina@test.com", hashed_password="x"
+    )
+    db_session.add(otra_empresa)
+    db_session.commit()
+    empresa_id = test_empresa.id_empresa
+    vacantes = [
+        (empresa_id, "Practicante de Desarrollo Web", "Desarrollo de aplicaciones en Python.", models.EstadoVacanteEnum.Abierta),
+        (empresa_id, "Auxiliar Contable", "Apoyo en conciliaciones y desarrollo de informes.", models.EstadoVacanteEnum.Abierta),
+        (otra_empresa.id_empresa, "Analista de Datos", "Visualización y análisis estadístico.", models.EstadoVacanteEnum.Abierta),
+        (otra_empresa.id_empresa, "Desarrollo Móvil", "Aplicaciones Android.", models.EstadoVacanteEnum.Cerrada),
+    ]
+    for id_empresa, titulo, descripcion, estado in vacantes:
+        db_session.add(models.Vacante(id_empresa=id_empresa, titulo_vacante=titulo, descripcion_funciones=descripcion, estado=estado))
+    db_session.commit()
+
+    login = client.post("/api/auth/login", data={
+        "username": "estudiante.fixture@ucn.edu.co",
+        "password": "studentpass"
+    })
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    # 1. Texto completo: el título pesa más que la descripción; la vacante cerrada no aparece
+    response = client.get("/api/estudiantes/vacantes/buscar?q=desarrollo", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["modo"] == "texto"
+    assert data["total"] == 2
+    assert [r["vacante"]["titulo_vacante"] for r in data["resultados"]] == ["Practicante de Desarrollo Web", "Auxiliar Contable"]
+    assert data["facetas_empresa"] == [{"id_empresa": empresa_id, "razon_social": "Empresa de Prueba Fixture S.A.S.", "total": 2}]
+
+    # 2. Sin tildes: "analitica" encuentra "Analítica Andina" y "análisis"
+    response = client.get("/api/estudiantes/vacantes/buscar?q=analitica", headers=headers)
+    assert response.json()["modo"] == "texto"
+    assert [r["vacante"]["titulo_vacante"] for r in response.json()["resultados"]] == ["Analista de Datos"]
+
+    # 3. Paginación por cursor sobre la relevancia
+    response = client.get("/api/estudiantes/vacantes/buscar?q=desarrollo&limit=1", headers=headers)
+    assert len(response.json()["resultados"]) == 1
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api/estudiantes/vacantes/buscar?q=desarrollo&limit=1&cursor={cursor}", headers=headers)
+    assert [r["vacante"]["titulo_vacante"] for r in response.json()["resultados"]] == ["Auxiliar Contable"]
+
+    # 4. Error de digitación: sin coincidencias exactas, se busca por trigramas
+    response = client.get("/api/estudiantes/vacantes/buscar?q=contabel", headers=headers)
+    data = response.json()
+    assert data["modo"] == "aproximado"
+    assert data["resultados"][0]["vacante"]["titulo_vacante"] == "Auxiliar Contable"
+
+    # 5. 'sip_es' quita las tildes antes de la raíz (unaccent): ningún lexema las conserva,
+    #    así que "analisis" y "análisis" son el mismo término
+    from sqlalchemy import text
+    lexemas = db_session.scalar(text("SELECT to_tsvector('sip_es', 'Visualización y análisis estadístico')::text"))
+    assert lexemas.isascii()
+    assert db_session.scalar(text("SELECT to_tsvector('sip_es', 'análisis') @@ plainto_tsquery('sip_es', 'analisis')"))
+    response = client.get("/api/estudiantes/vacantes/buscar?q=estadistico", headers=headers)
+    assert response.json()["modo"] == "texto"
+    assert [r["vacante"]["titulo_vacante"] for r in response.json()["resultados"]] == ["Analista de Datos"]
+
+# --- ¡PRUEBA 20! ---
+
+def test_vacantes_recomendadas(client, db_session, test_admin, test_empresa, test_student):
+    """
+    Caso de Prueba 20: [ESTUDIANTE]
+    Las recomendaciones ponen primero las vacantes afines al programa del
+    estudiante, excluyen las ya postuladas e incluyen al instante las recién aprobadas.
+    """
+    from app import models
+
+    empresa_id, estudiante_id = test_empresa.id_empresa, test_student.id_estudiante
+    afin = models.Vacante(
+        id_empresa=empresa_id, titulo_vacante="Practicante de Ingeniería de Software",
+        descripcion_funciones="Desarrollo de software y pruebas.", estado=models.EstadoVacanteEnum.Abierta
+    )
+    ajena = models.Vacante(
+        id_empresa=empresa_id, titulo_vacante="Auxiliar Contable",
+        descripcion_funciones="Conciliaciones bancarias e informes contables.", estado=models.EstadoVacanteEnum.Abierta
+    )
+    en_revision = models.Vacante(
+        id_empresa=empresa_id, titulo_vacante="Ingeniero de Software Junior",
+        descripcion_funciones="Software para la facultad de ingenierías.", estado=models.EstadoVacanteEnum.En_Revision
+    )
+    db_session.add_all([afin, ajena, en_revision])
+    db_session.commit()
+    afin_id, en_revision_id = afin.id_vacante, en_revision.id_vacante
+
+    login = client.post("/api/auth/login", data={
+        "username": "estudiante.fixture@ucn.edu.co",
+        "password": "studentpass"
+    })
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers_admin = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    # 1. La vacante afín al programa va primero; la que está en revisión no aparece
+    response = client.get("/api/estudiantes/vacantes/recomendadas", headers=headers)
+    assert response.status_code == 200
+    ids = [r["vacante"]["id_vacante"] for r in response.json()]
+    assert ids[0] == afin_id
+    assert en_revision_id not in ids
+
+    # 2. Al postularse, deja de recomendarse
+    db_session.add(models.Postulacion(id_estudiante=estudiante_id, id_vacante=afin_id))
+    db_session.commit()
+    response = client.get("/api/estudiantes/vacantes/recomendadas", headers=headers)
+    assert afin_id not in [r["vacante"]["id_vacante"] for r in response.json()]
+
+    # 3. El admin aprueba la vacante en revisión: entra al modelo sin reconstruirlo
+    response = client.patch(f"/api/admin/vacantes/{en_revision_id}/aprobar", headers=headers_admin)
+    assert response.status_code == 200
+    response = client.get("/api/estudiantes/vacantes/recomendadas", headers=headers)
+    assert response.json()[0]["vacante"]["id_vacante"] == en_revision_id
+
+# --- ¡PRUEBA 21! ---
+
+def test_exportar_practicas(client, db_session, test_admin, test_empresa, test_student):
+    """
+    Caso de Prueba 21: [ADMIN]
+    La exportación trae las prácticas del Seguimiento con una fila por cada
+    registro de su historial, en CSV y en XLSX.
+    """
+    import csv
+    import io
+    from app import models
+
+    vacante = models.Vacante(
+        id_empresa=test_empresa.id_empresa, titulo_vacante="Vacante Exportada",
+        descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.Cubierta
+    )
+    db_session.add(vacante)
+    db_session.commit()
+    aprobada = models.Postulacion(
+        id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante,
+        estado_actual=models.EstadoPostulacionEnum.Aprobada
+    )
+    db_session.add(aprobada)
+    db_session.commit()
+    db_session.add_all([
+        models.HistorialEstadoPostulacion(id_postulacion=aprobada.id_postulacion, estado=models.EstadoPostulacionEnum.Recibida,
+                                          comentarios="Postulación recibida.", id_actor_estudiante=test_student.id_estudiante),
+        models.HistorialEstadoPostulacion(id_postulacion=aprobada.id_postulacion, estado=models.EstadoPostulacionEnum.Aprobada,
+                                          comentarios="Práctica aprobada.", id_actor_universidad=test_admin.id_usuario),
+    ])
+    db_session.commit()
+
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    # 1. CSV: encabezado + una fila por registro del historial
+    response = client.get("/api/admin/practicas/export?format=csv", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    filas = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert len(filas) == 2
+    assert [f["comentarios"] for f in filas] == ["Postulación recibida.", "Práctica aprobada."]
+    assert filas[1]["tipo_actor"] == "universidad"
+    assert filas[1]["actor"] == "Admin de Prueba Fixture"
+    assert filas[0]["estado_actual"] == "Aprobada"
+
+    # 2. XLSX (un archivo ZIP)
+    response = client.get("/api/admin/practicas/export?format=xlsx", headers=headers)
+    assert response.status_code == 200
+    assert response.content[:2] == b"PK"
+
+    # 3. Un estado que no es del Seguimiento se rechaza
+    response = client.get("/api/admin/practicas/export?estado=Recibida", headers=headers)
+    assert response.status_code == 400
+
+# --- ¡PRUEBA 22! ---
+
+def test_importar_estudiantes_csv(client, test_admin, test_student, test_programa):
+    """
+    Caso de Prueba 22: [ADMIN]
+    La importación masiva crea las filas válidas y reporta (sin crearlas) las que
+    tienen errores: correo inválido, programa inexistente, repetidos y ya registrados.
+    """
+    id_programa = test_programa.id_programa
+    contenido = (
+        "nombre;apellido;email_institucional;password;programa\n"
+        "Ana;Gómez;ana.importada@ucn.edu.co;clave123;Ingeniería de Software (Prueba)\n"
+        f"Luis;Pérez;luis.importado@ucn.edu.co;clave123;{id_programa}\n"
+        "Mal;Correo;no-es-un-correo;clave123;Ingeniería de Software (Prueba)\n"
+        "Sin;Programa;sin.programa@ucn.edu.co;clave123;Medicina\n"
+        f"Ana;Repetida;ANA.importada@ucn.edu.co;clave123;{id_programa}\n"
+        f"Ya;Existe;estudiante.fixture@ucn.edu.co;clave123;{id_programa}\n"
+    ).encode("utf-8")
+
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    response = client.post(
+        "/api/admin/estudiantes/import",
+        files={"archivo": ("estudiantes.csv", contenido, "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["creados"] == 2
+    assert [e["fila"] for e in data["errores"]] == [4, 5, 6, 7]
+
+    # Los estudiantes importados pueden iniciar sesión
+    login = client.post("/api/auth/login", data={
+        "username": "luis.importado@ucn.edu.co",
+        "password": "clave123"
+    })
+    assert login.status_code == 200
+
+    # Un archivo sin las columnas requeridas se rechaza completo
+    response = client.post(
+        "/api/admin/estudiantes/import",
+        files={"archivo": ("estudiantes.csv", b"nombre,apellido\nA,B\n", "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 400
+
+# --- ¡PRUEBA 23! ---
+
+def test_revision_en_lote(client, db_session, test_admin, test_empresa, test_student):
+    """
+    Caso de Prueba 23: [ADMIN]
+    La aprobación en lote aplica solo las transiciones válidas y reporta el
+    resultado de cada elemento (en el orden de la petición).
+    """
+    from app import models
+
+    vacantes = [
+        models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante=f"Vacante Lote {i}",
+                       descripcion_funciones="Funciones de prueba.", estado=estado)
+        for i, estado in enumerate([models.EstadoVacanteEnum.En_Revision, models.EstadoVacanteEnum.En_Revision,
+                                    models.EstadoVacanteEnum.Abierta])
+    ]
+    db_session.add_all(vacantes)
+    db_session.commit()
+    ids_vacantes = [v.id_vacante for v in vacantes]
+    en_proceso = [
+        models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante=f"Vacante En Proceso {i}",
+                       descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.En_Proceso)
+        for i in range(3)
+    ]
+    db_session.add_all(en_proceso)
+    db_session.commit()
+    postulaciones = [
+        models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante, estado_actual=estado)
+        for vacante, estado in zip(en_proceso, [models.EstadoPostulacionEnum.En_Revision_Universidad,
+                                                models.EstadoPostulacionEnum.En_Revision_Universidad,
+                                                models.EstadoPostulacionEnum.Recibida])
+    ]
+    db_session.add_all(postulaciones)
+    db_session.commit()
+    ids_postulaciones = [p.id_postulacion for p in postulaciones]
+
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    # 1. Vacantes: dos en revisión, una ya abierta y una que no existe
+    response = client.patch("/api/admin/vacantes/aprobar-lote", json={
+        "ids_vacantes": ids_vacantes + [999999]
+    }, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["aplicados"] == 2
+    assert [r["ok"] for r in data["resultados"]] == [True, True, False, False]
+
+    # 2. Postulaciones: aprobar la primera y rechazar la segunda; la tercera no está en revisión
+    response = client.patch("/api/admin/postulaciones/aprobar-lote", json={"postulaciones": [
+        {"id_postulacion": ids_postulaciones[0], "fecha_inicio_practica": "2025-01-15T00:00:00",
+         "fecha_fin_practica": "2025-06-15T00:00:00", "comentarios": "Aprobada en lote."},
+        {"id_postulacion": ids_postulaciones[2], "fecha_inicio_practica": "2025-01-15T00:00:00",
+         "fecha_fin_practica": "2025-06-15T00:00:00"},
+    ]}, headers=headers)
+    assert [r["ok"] for r in response.json()["resultados"]] == [True, False]
+
+    response = client.patch("/api/admin/postulaciones/rechazar-lote", json={"postulaciones": [
+        {"id_postulacion": ids_postulaciones[1], "comentarios": "No cumple el perfil."},
+        {"id_postulacion": ids_postulaciones[0], "comentarios": "Ya fue aprobada."},
+    ]}, headers=headers)
+    assert [r["ok"] for r in response.json()["resultados"]] == [True, False]
+
+    db_session.expire_all()
+    aprobada = db_session.get(models.Postulacion, ids_postulaciones[0])
+    assert aprobada.vacante.estado == models.EstadoVacanteEnum.Cubierta
+    assert aprobada.estado_actual == models.EstadoPostulacionEnum.Aprobada
+    assert aprobada.fecha_inicio_practica is not None
+    historial = db_session.query(models.HistorialEstadoPostulacion)\
+        .filter(models.HistorialEstadoPostulacion.id_postulacion.in_(ids_postulaciones)).all()
+    assert sorted(h.estado.value for h in historial) == ["Aprobada", "Rechazada por Universidad"]
+
+# --- ¡PRUEBA 24! ---
+
+def test_maquina_de_estados(client, db_session, test_admin, test_empresa, test_student):
+    """
+    Caso de Prueba 24: [EMPRESA] [ADMIN]
+    Toda transición deja su registro en el historial, las transiciones inválidas
+    se rechazan sin cambiar nada y la empresa solo mueve postulaciones de sus vacantes.
+    """
+    from app import models
+
+    otra_empresa = models.Empresa(razon_social="Otra Empresa S.A.S.", nit="999.999.999-9",
+                                  email_contacto="otra.empresa@test.com", hashed_password="x")
+    db_session.add(otra_empresa)
+    db_session.commit()
+    vacante = models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante="Vacante Estados",
+                             descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.Abierta)
+    ajena = models.Vacante(id_empresa=otra_empresa.id_empresa, titulo_vacante="Vacante Ajena",
+                           descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.Abierta)
+    db_session.add_all([vacante, ajena])
+    db_session.commit()
+    postulacion = models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante)
+    postulacion_ajena = models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=ajena.id_vacante)
+    db_session.add_all([postulacion, postulacion_ajena])
+    db_session.commit()
+    id_postulacion, id_ajena = postulacion.id_postulacion, postulacion_ajena.id_postulacion
+    id_empresa = test_empresa.id_empresa
+
+    login_empresa = client.post("/api/auth/login", data={
+        "username": "empresa.fixture@test.com",
+        "password": "empresapass"
+    })
+    headers_empresa = {"Authorization": f"Bearer {login_empresa.json()['access_token']}"}
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers_admin = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    # 1. La aprobación de la empresa ahora también queda en el historial
+    response = client.patch(f"/api/empresas/postulaciones/{id_postulacion}/aprobar", headers=headers_empresa)
+    assert response.status_code == 200
+    assert response.json()["estado_actual"] == "En Revisión Universidad"
+
+    # 2. Repetirla es una transición inválida
+    response = client.patch(f"/api/empresas/postulaciones/{id_postulacion}/aprobar", headers=headers_empresa)
+    assert response.status_code == 400
+
+    # 3. Una postulación de otra empresa, o una que no existe
+    response = client.patch(f"/api/empresas/postulaciones/{id_ajena}/aprobar", headers=headers_empresa)
+    assert response.status_code == 403
+    response = client.patch("/api/empresas/postulaciones/999999/aprobar", headers=headers_empresa)
+    assert response.status_code == 404
+
+    # 4. La aprobación final deja la vacante 'Cubierta' y guarda las fechas
+    response = client.patch(f"/api/admin/postulaciones/{id_postulacion}/aprobar", json={
+        "fecha_inicio_practica": "2025-01-15T00:00:00",
+        "fecha_fin_practica": "2025-06-15T00:00:00",
+        "comentarios": "Bienvenido."
+    }, headers=headers_admin)
+    assert response.status_code == 200
+    assert response.json()["vacante"]["estado"] == "Cubierta"
+    assert response.json()["fecha_inicio_practica"].startswith("2025-01-15")
+
+    db_session.expire_all()
+    historial = db_session.query(models.HistorialEstadoPostulacion)\
+        .filter(models.HistorialEstadoPostulacion.id_postulacion == id_postulacion)\
+        .order_by(models.HistorialEstadoPostulacion.id_historial).all()
+    assert [h.estado.value for h in historial] == ["En Revisión Universidad", "Aprobada"]
+    assert historial[0].id_actor_empresa == id_empresa
+    assert historial[1].comentarios == "Bienvenido."
+    assert db_session.get(models.Postulacion, id_ajena).estado_actual == models.EstadoPostulacionEnum.Recibida
+
+# --- ¡PRUEBA 25! ---
+
+def test_if_match_version(client, db_session, test_admin, test_empresa, test_student):
+    """
+    Caso de Prueba 25: [EMPRESA] [ADMIN]
+    Las modificaciones responden con ETag (la versión) y, con If-Match, solo se
+    aplican si nadie cambió la postulación/vacante entretanto (si no, 412).
+    """
+    from app import models
+
+    vacante = models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante="Vacante Versionada",
+                             descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.En_Revision)
+    db_session.add(vacante)
+    db_session.commit()
+    postulacion = models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante)
+    db_session.add(postulacion)
+    db_session.commit()
+    id_vacante, id_postulacion = vacante.id_vacante, postulacion.id_postulacion
+    assert postulacion.version == 1
+
+    login_empresa = client.post("/api/auth/login", data={
+        "username": "empresa.fixture@test.com",
+        "password": "empresapass"
+    })
+    headers_empresa = {"Authorization": f"Bearer {login_empresa.json()['access_token']}"}
+    login_admin = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers_admin = {"Authorization": f"Bearer {login_admin.json()['access_token']}"}
+
+    # 1. La lista trae la versión de cada postulación
+    response = client.get("/api/empresas/postulaciones", headers=headers_empresa)
+    assert response.json()[0]["version"] == 1
+
+    # 2. Con la versión correcta se aplica y responde la nueva etiqueta
+    response = client.patch(f"/api/empresas/postulaciones/{id_postulacion}/aprobar",
+                            headers={**headers_empresa, "If-Match": '"1"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+    assert response.json()["version"] == 2
+
+    # 3. Con una versión vieja: 412, y la postulación no cambia
+    response = client.patch(f"/api/admin/postulaciones/{id_postulacion}/rechazar", json={
+        "comentarios": "Decisión tomada sobre datos viejos."
+    }, headers={**headers_admin, "If-Match": '"1"'})
+    assert response.status_code == 412
+    db_session.expire_all()
+    assert db_session.get(models.Postulacion, id_postulacion).estado_actual == models.EstadoPostulacionEnum.En_Revision_Universidad
+
+    # 4. Vacantes (camino del ORM con version_id_col)
+    response = client.patch(f"/api/admin/vacantes/{id_vacante}/aprobar",
+                            headers={**headers_admin, "If-Match": '"7"'})
+    assert response.status_code == 412
+    response = client.patch(f"/api/admin/vacantes/{id_vacante}/aprobar",
+                            headers={**headers_admin, "If-Match": 'W/"1"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+
+# --- ¡PRUEBA 26! ---
+
+def test_colas_de_revision_repartidas(client, db_session, test_admin, test_empresa, test_student, monkeypatch):
+    """
+    Caso de Prueba 26: [ADMIN]
+    Dos coordinadores que piden trabajo reciben lotes disjuntos; al liberar,
+    los elementos vuelven a la cola. Un préstamo vigente de otro nunca se sobrescribe.
+    """
+    from sqlalchemy import select
+    from app import models, revisiones, security
+
+    coordinador = models.UsuarioUniversidad(
+        nombre="Coordinador Dos", email="coordinador.dos@ucn.edu.co",
+        rol=models.RolUniversidadEnum.Coordinador, hashed_password=security.hash_password("coordpass")
+    )
+    vacantes = [
+        models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante=f"Vacante Cola {i}",
+                       descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.En_Revision)
+        for i in range(4)
+    ]
+    db_session.add_all([coordinador, *vacantes])
+    db_session.commit()
+    db_session.add(models.Postulacion(
+        id_estudiante=test_student.id_estudiante, id_vacante=vacantes[0].id_vacante,
+        estado_actual=models.EstadoPostulacionEnum.En_Revision_Universidad
+    ))
+    db_session.commit()
+
+    def headers_de(email, password):
+        login = client.post("/api/auth/login", data={"username": email, "password": password})
+        return {"Authorization": f"Bearer {login.json()['access_token']}"}
+    headers_uno = headers_de("admin.fixture@ucn.edu.co", "adminpass")
+    headers_dos = headers_de("coordinador.dos@ucn.edu.co", "coordpass")
+
+    def ids(data):
+        return {("p", p["id_postulacion"]) for p in data["postulaciones"]} | {("v", v["id_vacante"]) for v in data["vacantes"]}
+
+    # 1. Lotes disjuntos entre los dos coordinadores (5 pendientes en total)
+    lote_uno = client.post("/api/admin/revisiones/claim?n=3", headers=headers_uno).json()
+    lote_dos = client.post("/api/admin/revisiones/claim?n=3", headers=headers_dos).json()
+    assert len(ids(lote_uno)) == 3
+    assert len(ids(lote_dos)) == 2
+    assert not ids(lote_uno) & ids(lote_dos)
+    assert lote_uno["expira"] is not None
+
+    # 2. Pedir de nuevo devuelve el mismo lote (renovado)
+    assert ids(client.post("/api/admin/revisiones/claim?n=3", headers=headers_uno).json()) == ids(lote_uno)
+    response = client.post("/api/admin/revisiones/renew", json={}, headers=headers_uno)
+    assert response.json()["renovadas"] == 3
+
+    # 3. Al liberar, el otro coordinador puede tomarlos
+    response = client.post("/api/admin/revisiones/release", json={}, headers=headers_uno)
+    assert response.json()["liberadas"] == 3
+    lote_dos = client.post("/api/admin/revisiones/claim?n=10", headers=headers_dos).json()
+    assert len(ids(lote_dos)) == 5
+
+    # 4. Carrera: las candidatas se leyeron antes del commit del otro coordinador
+    #    (READ COMMITTED no lo ve). Su préstamo vigente se respeta y no se entrega nada.
+    def candidatas_sin_filtro(db, tipo, id_coordinador, n):
+        _, columna_id, columna_fecha, pendiente = revisiones.COLAS[tipo]
+        return db.execute(select(columna_id.label("id_item"), columna_fecha.label("fecha")).filter(pendiente).limit(n)).all()
+    monkeypatch.setattr(revisiones, "_candidatas", candidatas_sin_filtro)
+    lote_uno = client.post("/api/admin/revisiones/claim?n=10", headers=headers_uno).json()
+    assert ids(lote_uno) == set()
+    assert lote_uno["expira"] is None
+    assert ids(client.post("/api/admin/revisiones/claim?n=10", headers=headers_dos).json()) == ids(lote_dos)
+
+# --- ¡PRUEBA 27! ---
+
+def test_eventos_en_tiempo_real(client, db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 27: [ESTUDIANTE] [EMPRESA]
+    /api/events exige autenticación (en la URL, solo un token de eventos de corta
+    duración); los comentarios y los cambios de estado llegan (por LISTEN/NOTIFY)
+    solo a las suscripciones de los involucrados.
+    """
+    import asyncio
+    from datetime import timedelta
+    import pytest
+    from fastapi import HTTPException
+    from app import escucha, eventos, models, security
+
+    vacante = models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante="Vacante Eventos",
+                             descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.Abierta)
+    db_session.add(vacante)
+    db_session.commit()
+    postulacion = models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante)
+    db_session.add(postulacion)
+    db_session.commit()
+    id_postulacion, id_estudiante, id_empresa = postulacion.id_postulacion, test_student.id_estudiante, test_empresa.id_empresa
+
+    # 1. Sin token no hay flujo de eventos
+    assert client.get("/api/events").status_code == 401
+
+    login_empresa = client.post("/api/auth/login", data={
+        "username": "empresa.fixture@test.com",
+        "password": "empresapass"
+    })
+    token_empresa = login_empresa.json()["access_token"]
+    headers_empresa = {"Authorization": f"Bearer {token_empresa}"}
+
+    # 2. El token de acceso normal no se acepta en la URL: se pide un token de eventos
+    assert client.get("/api/events", params={"access_token": token_empresa}).status_code == 401
+    response = client.post("/api/events/token", headers=headers_empresa)
+    assert response.status_code == 200
+    token_eventos = response.json()["access_token"]
+    usuario = security.get_current_user_stream(None, token_eventos, db_session)
+    assert isinstance(usuario, models.Empresa) and usuario.id_empresa == id_empresa
+    # ...que no sirve para ningún otro endpoint
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {token_eventos}"}).status_code == 401
+    assert client.post("/api/events/token", headers={"Authorization": f"Bearer {token_eventos}"}).status_code == 401
+    # ...y caduca pronto
+    vencido = security.create_access_token(
+        data={"sub": "empresa.fixture@test.com", "rol": "empresa", "uid": id_empresa, "scope": security.ALCANCE_EVENTOS},
+        expires_delta=timedelta(seconds=-1)
+    )
+    with pytest.raises(HTTPException):
+        security.get_current_user_stream(None, vencido, db_session)
+
+    async def escuchar():
+        assert escucha.iniciar(db_session.get_bind()).escuchando.wait(10)
+        del_estudiante = eventos.bus.suscribir("estudiante", id_estudiante)
+        de_otro = eventos.bus.suscribir("estudiante", id_estudiante + 1000)
+        try:
+            # 3. La empresa comenta y luego aprueba la postulación
+            response = await asyncio.to_thread(
+                client.post, f"/api/postulaciones/{id_postulacion}/comentarios",
+                json={"comentarios": "Te llamaremos."}, headers=headers_empresa
+            )
+            assert response.status_code == 200
+            response = await asyncio.to_thread(
+                client.patch, f"/api/empresas/postulaciones/{id_postulacion}/aprobar", headers=headers_empresa
+            )
+            assert response.status_code == 200
+
+            recibidos = [await asyncio.wait_for(del_estudiante.cola.get(), timeout=10) for _ in range(2)]
+            assert de_otro.cola.empty()
+            return recibidos
+        finally:
+            eventos.bus.cancelar(del_estudiante)
+            eventos.bus.cancelar(de_otro)
+
+    comentario, cambio = asyncio.run(escuchar())
+    assert comentario["tipo"] == "comentario"
+    assert comentario["datos"]["id_postulacion"] == id_postulacion
+    assert cambio["tipo"] == "cambio_estado"
+    assert cambio["datos"]["estado"] == "En Revisión Universidad"
+    assert "event: cambio_estado" in eventos.formato_sse(cambio)
+
+# --- ¡PRUEBA 28! ---
+
+def test_invalidacion_entre_workers(client, db_session):
+    """
+    Caso de Prueba 28: [SISTEMA]
+    Un aviso de invalidación publicado por otro worker (NOTIFY) borra las llaves
+    en las cachés de este; los avisos propios se ignoran.
+    """
+    import json
+    import time
+    from sqlalchemy import text
+    from app import escucha, invalidacion
+    from app.crud import stats_cache
+    from app.security import principal_cache
+
+    assert escucha.iniciar(db_session.get_bind()).escuchando.wait(10)
+    stats_cache.set("stats:admin", "viejo")
+    stats_cache.set("stats:estudiante:1", "viejo")
+    stats_cache.set("stats:estudiante:2", "viejo")
+    principal_cache.set("principal:empresa:42", "viejo")
+    principal_cache.set("principal:empresa:43", "viejo")
+
+    def notificar(origen, llaves):
+        db_session.execute(text("SELECT pg_notify(:canal, :payload)"), {
+            "canal": invalidacion.CANAL, "payload": json.dumps({"origen": origen, "llaves": llaves})
+        })
+        db_session.commit()
+
+    # 1. Un aviso propio no borra nada (este worker ya lo hizo al escribir)
+    notificar(invalidacion.ORIGEN, ["principal:empresa:43"])
+    # 2. El de otro worker sí: llaves exactas y prefijos con '*'
+    notificar("otro-worker", ["stats:admin", "stats:estudiante:*", "principal:empresa:42"])
+
+    limite = time.monotonic() + 10
+    while stats_cache.get("stats:admin") is not None and time.monotonic() < limite:
+        time.sleep(0.05)
+    assert stats_cache.get("stats:admin") is None
+    assert stats_cache.get("stats:estudiante:1") is None
+    assert stats_cache.get("stats:estudiante:2") is None
+    assert principal_cache.get("principal:empresa:42") is None
+    assert principal_cache.get("principal:empresa:43") == "viejo"
+
+# --- ¡PRUEBA 29! ---
+
+def test_catalogos_en_cache(client, db_session, test_admin, test_programa, test_empresa, monkeypatch):
+    """
+    Caso de Prueba 29: [ADMIN]
+    Programas y empresas salen de la caché de catálogos con ETag; con If-None-Match
+    vigente se responde 304, y crear/activar/inactivar invalida el catálogo.
+    Sin invalidación, el catálogo igual se recarga al caducar.
+    """
+    from app import catalogos, models
+
+    id_empresa = test_empresa.id_empresa
+    login = client.post("/api/auth/login", data={
+        "username": "admin.fixture@ucn.edu.co",
+        "password": "adminpass"
+    })
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    # 1. Primera carga: el catálogo con su ETag
+    response = client.get("/api/admin/programas", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert [p["nombre_programa"] for p in response.json()] == ["Ingeniería de Software (Prueba)"]
+
+    # 2. Misma versión: 304 sin cuerpo
+    response = client.get("/api/admin/programas", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # 3. Un cambio hecho por fuera de la API no se ve: la respuesta sale de la caché
+    db_session.add(models.ProgramaAcademico(nombre_programa="Programa Directo", facultad="Ciencias"))
+    db_session.commit()
+    assert client.get("/api/admin/programas", headers={**headers, "If-None-Match": etag}).status_code == 304
+    # ...hasta que caduca (por si se perdió el aviso de otro worker)
+    monkeypatch.setattr(catalogos.programas, "ttl", 0)
+    response = client.get("/api/admin/programas", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    monkeypatch.setattr(catalogos.programas, "ttl", catalogos.CATALOGO_TTL)
+
+    # 4. Crear por la API invalida el catálogo: nueva etiqueta y los dos programas nuevos
+    response = client.post("/api/admin/programas", headers=headers, json={"nombre_programa": "Medicina", "facultad": "Salud"})
+    assert response.status_code == 201
+    response = client.get("/api/admin/programas", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 3
+
+    # 5. Empresas: la lista completa también tiene ETag y se invalida al inactivar
+    response = client.get("/api/admin/empresas", headers=headers)
+    etag_empresas = response.headers["ETag"]
+    assert response.json()[0]["esta_activo"] is True
+    client.patch(f"/api/admin/empresas/{id_empresa}/inactivar", headers=headers)
+    response = client.get("/api/admin/empresas", headers={**headers, "If-None-Match": etag_empresas})
+    assert response.status_code == 200
+    assert response.json()[0]["esta_activo"] is False
+
+    # 6. Paginada sigue yendo a la BD, como antes
+    response = client.get("/api/admin/empresas?limit=1", headers=headers)
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+# --- ¡PRUEBA 30! ---
+
+def test_listas_condicionales(client, db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 30: [ESTUDIANTE] [EMPRESA]
+    Las listas por usuario responden con ETag; una recarga sin cambios (If-None-Match)
+    recibe 304, y un comentario o un cambio de estado cambian la etiqueta.
+    """
+    from app import models
+
+    vacante = models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante="Vacante Condicional",
+                             descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.Abierta)
+    db_session.add(vacante)
+    db_session.commit()
+    postulacion = models.Postulacion(id_estudiante=test_student.id_estudiante, id_vacante=vacante.id_vacante)
+    db_session.add(postulacion)
+    db_session.commit()
+    id_postulacion = postulacion.id_postulacion
+
+    def headers_de(email, password):
+        login = client.post("/api/auth/login", data={"username": email, "password": password})
+        return {"Authorization": f"Bearer {login.json()['access_token']}"}
+    headers_estudiante = headers_de("estudiante.fixture@ucn.edu.co", "studentpass")
+    headers_empresa = headers_de("empresa.fixture@test.com", "empresapass")
+
+    urls = [
+        ("/api/estudiantes/postulaciones/me", headers_estudiante),
+        ("/api/empresas/vacantes/me", headers_empresa),
+        ("/api/empresas/postulaciones", headers_empresa),
+        ("/api/empresas/postulaciones?formato=normalizado", headers_empresa),
+        (f"/api/postulaciones/{id_postulacion}/historial", headers_estudiante),
+    ]
+
+    # 1. Primera carga con ETag; la recarga sin cambios es un 304 sin cuerpo
+    etiquetas = {}
+    for url, headers in urls:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        etiquetas[url] = response.headers["ETag"]
+        response = client.get(url, headers={**headers, "If-None-Match": etiquetas[url]})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    # 2. Un comentario cambia el historial (pero no las listas)
+    client.post(f"/api/postulaciones/{id_postulacion}/comentarios", json={"comentarios": "Hola"}, headers=headers_empresa)
+    url_historial = f"/api/postulaciones/{id_postulacion}/historial"
+    response = client.get(url_historial, headers={**headers_estudiante, "If-None-Match": etiquetas[url_historial]})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert client.get("/api/empresas/postulaciones",
+                      headers={**headers_empresa, "If-None-Match": etiquetas["/api/empresas/postulaciones"]}).status_code == 304
+
+    # 3. Un cambio de estado cambia las listas de postulaciones de los dos
+    client.patch(f"/api/empresas/postulaciones/{id_postulacion}/aprobar", headers=headers_empresa)
+    for url, headers in urls[:1] + urls[2:4]:
+        response = client.get(url, headers={**headers, "If-None-Match": etiquetas[url]})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etiquetas[url]
+
+    # 4. Una vacante nueva cambia la lista de vacantes de la empresa
+    client.post("/api/empresas/vacantes", json={"titulo_vacante": "Otra", "descripcion_funciones": "Más funciones."},
+                headers=headers_empresa)
+    response = client.get("/api/empresas/vacantes/me",
+                          headers={**headers_empresa, "If-None-Match": etiquetas["/api/empresas/vacantes/me"]})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+# --- ¡PRUEBA 31! ---
+
+def test_esquema_se_actualiza_solo(db_session, caplog):
+    """
+    Caso de Prueba 31: [BD]
+    Con el esquema al día no hay ningún DDL que ejecutar al iniciar; a una BD
+    anterior se le agregan solo las columnas e índices que le faltan, y cada
+    restricción que le falte queda en el log.
+    """
+    import logging
+    from sqlalchemy import text
+    from app import esquema
+
+    # 1. Recién creada: nada pendiente (ni avisos)
+    with caplog.at_level(logging.WARNING, logger="app.esquema"):
+        assert esquema.pendientes(db_session) == []
+    assert caplog.records == []
+
+    # 2. Una BD de antes del control de versiones y de los índices de los tableros
+    db_session.execute(text("ALTER TABLE vacantes DROP COLUMN version"))
+    db_session.execute(text("DROP INDEX ix_postulaciones_estudiante_fecha"))
+    db_session.commit()
+    ddl = [str(d.compile(dialect=db_session.get_bind().dialect)) for d in esquema.pendientes(db_session)]
+    assert len(ddl) == 2
+    assert any("ALTER TABLE vacantes ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 1 NOT NULL" in d for d in ddl)
+    assert any("CREATE INDEX IF NOT EXISTS ix_postulaciones_estudiante_fecha" in d for d in ddl)
+
+    # 3. Se agregan y queda al día
+    esquema.actualizar(db_session)
+    assert esquema.pendientes(db_session) == []
+
+    # 4. Una restricción que falta no se agrega, pero se avisa al iniciar
+    db_session.execute(text("ALTER TABLE postulaciones DROP CONSTRAINT postulaciones_id_vacante_fkey"))
+    db_session.commit()
+    with caplog.at_level(logging.WARNING, logger="app.esquema"):
+        esquema.pendientes(db_session)
+    assert any("ForeignKeyConstraint" in r.getMessage() and "postulaciones(id_vacante)" in r.getMessage() for r in caplog.records)
+
+# --- ¡PRUEBA 32! ---
+
+def test_esquema_agrega_restriccion_unica(db_session, test_empresa, test_student):
+    """
+    Caso de Prueba 32: [BD]
+    En una BD de antes de la restricción única de postulaciones, el arranque la
+    agrega (y con ella funciona el ON CONFLICT de las postulaciones). Si hay
+    postulaciones repetidas, no arranca hasta que se limpien.
+    """
+    import pytest
+    from sqlalchemy import text
+    from app import crud, esquema, models
+
+    vacante = models.Vacante(id_empresa=test_empresa.id_empresa, titulo_vacante="Vacante Esquema",
+                             descripcion_funciones="Funciones de prueba.", estado=models.EstadoVacanteEnum.Abierta)
+    db_session.add(vacante)
+    db_session.commit()
+    id_vacante, id_estudiante = vacante.id_vacante, test_student.id_estudiante
+
+    # 1. Una BD anterior: sin la restricción y con una postulación repetida
+    db_session.execute(text("ALTER TABLE postulaciones DROP CONSTRAINT uq_postulacion_estudiante_vacante"))
+    for _ in range(2):
+        db_session.add(models.Postulacion(id_estudiante=id_estudiante, id_vacante=id_vacante))
+    db_session.commit()
+    with pytest.raises(esquema.RestriccionConDuplicados):
+        esquema.actualizar(db_session)
+
+    # 2. Limpiada (con la consulta del README), se agrega: índice concurrente y luego la restricción
+    db_session.execute(text(
+        "DELETE FROM postulaciones p USING postulaciones q"
+        " WHERE p.id_estudiante = q.id_estudiante AND p.id_vacante = q.id_vacante AND p.id_postulacion > q.id_postulacion"
+    ))
+    db_session.commit()
+    ddl = [str(d.compile(dialect=db_session.get_bind().dialect)) for d in esquema.pendientes(db_session)]
+    assert ddl == [
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_postulacion_estudiante_vacante ON postulaciones (id_estudiante, id_vacante)",
+        "ALTER TABLE postulaciones ADD CONSTRAINT uq_postulacion_estudiante_vacante UNIQUE USING INDEX uq_postulacion_estudiante_vacante",
+    ]
+    esquema.actualizar(db_session)
+    assert esquema.pendientes(db_session) == []
+    assert db_session.scalar(text(
+        "SELECT count(*) FROM pg_constraint WHERE conname = 'uq_postulacion_estudiante_vacante' AND contype = 'u'"
+    )) == 1
+
+    # 3. El ON CONFLICT ya tiene su restricción: la postulación repetida no se inserta
+    assert crud.create_postulacion(db_session, id_estudiante, id_vacante) is None
+
+    # 4. Si un arranque anterior dejó el índice creado pero no la restricción, solo falta la restricción
+    db_session.execute(text("ALTER TABLE postulaciones DROP CONSTRAINT uq_postulacion_estudiante_vacante"))
+    db_session.execute(text("CREATE UNIQUE INDEX uq_postulacion_estudiante_vacante ON postulaciones (id_estudiante, id_vacante)"))
+    db_session.commit()
+    assert len(esquema.pendientes(db_session)) == 1
+    esquema.actualizar(db_session)
+    assert esquema.pendientes(db_session) == []
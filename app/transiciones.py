@@ -0,0 +1,273 @@
+# /app/transiciones.py
+# Máquina de estados de las postulaciones: el único lugar donde cambia estado_actual.
+# - Cada transición declara de qué estados sale, a cuál llega, qué rol la puede hacer
+#   y sus efectos (ej. dejar la vacante 'Cubierta').
+# - Se ejecuta para una o muchas postulaciones con UNA sola sentencia:
+#     WITH actualizadas AS (UPDATE postulaciones ... WHERE estado_actual IN (:origenes) RETURNING ...),
+#          historial AS (INSERT INTO historial_estados_postulacion SELECT ... FROM actualizadas),
+#          vacantes AS (UPDATE vacantes SET estado = 'Cubierta' WHERE id_vacante IN (SELECT ... FROM actualizadas))
+#     SELECT ... FROM actualizadas
+#   La condición sobre el estado hace la transición atómica sin bloquear filas: si otra
+#   petición la cambió primero, la fila simplemente no se actualiza. Si el cliente envió
+#   la versión que vio (If-Match), también se exige esa versión (ver concurrencia.py).
+# - Toda transición deja su registro en el historial (con o sin comentario).
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Integer, Text, cast, column, insert, literal, or_, select, update, values
+from sqlalchemy.orm import Session
+
+from . import eventos, models, recomendaciones, security
+from .crud import CARGA_POSTULACION, invalidar_stats_admin, invalidar_stats_estudiante
+
+Estado = models.EstadoPostulacionEnum
+
+# Columna del historial que guarda al actor, según su rol
+COLUMNA_ACTOR = {
+    "admin": "id_actor_universidad",
+    "empresa": "id_actor_empresa",
+    "estudiante": "id_actor_estudiante",
+}
+
+
+class Transicion:
+    """Una arista del grafo de estados."""
+
+    def __init__(
+        self,
+        nombre: str,
+        origenes: Iterable[Estado],
+        destino: Estado,
+        rol: str,
+        mensaje_estado: str,
+        cubre_vacante: bool = False,
+        con_fechas: bool = False
+    ):
+        self.nombre = nombre
+        self.origenes = tuple(origenes)
+        self.destino = destino
+        self.rol = rol                       # 'admin' o 'empresa' (la empresa solo sobre sus vacantes)
+        self.mensaje_estado = mensaje_estado # Error si la postulación no está en un estado de origen
+        self.cubre_vacante = cubre_vacante   # La vacante queda 'Cubierta'
+        self.con_fechas = con_fechas         # Guarda fecha_inicio_practica / fecha_fin_practica
+        # Cambia el conteo de pendientes del admin (postulaciones 'En Revisión Universidad')
+        self.afecta_stats_admin = Estado.En_Revision_Universidad in (*self.origenes, destino)
+
+
+# --- El grafo ---
+
+APROBAR_EMPRESA = Transicion(
+    "aprobar_empresa", [Estado.Recibida], Estado.En_Revision_Universidad, "empresa",
+    "La postulación no está en estado 'Recibida'. Estado actual: {estado}"
+)
+RECHAZAR_EMPRESA = Transicion(
+    "rechazar_empresa", [Estado.Recibida, Estado.En_Revision_Empresa, Estado.En_Revision_Universidad],
+    Estado.Rechazada_por_Empresa, "empresa",
+    "Solo se pueden rechazar postulaciones que aún están en revisión. Estado actual: {estado}"
+)
+COMPLETAR_EMPRESA = Transicion(
+    "completar_empresa", [Estado.Aprobada], Estado.Completada_por_Empresa, "empresa",
+    "Solo se pueden completar prácticas 'Aprobadas'."
+)
+CANCELAR_EMPRESA = Transicion(
+    "cancelar_empresa", [Estado.Aprobada], Estado.Cancelada, "empresa",
+    "Solo se pueden cancelar prácticas 'Aprobadas'."
+)
+APROBAR_UNIVERSIDAD = Transicion(
+    "aprobar_universidad", [Estado.En_Revision_Universidad], Estado.Aprobada, "admin",
+    "La postulación no está pendiente de revisión por la universidad.",
+    cubre_vacante=True, con_fechas=True
+)
+RECHAZAR_UNIVERSIDAD = Transicion(
+    "rechazar_universidad", [Estado.En_Revision_Universidad], Estado.Rechazada_por_Universidad, "admin",
+    "La postulación no está pendiente de revisión por la universidad."
+)
+CANCELAR_UNIVERSIDAD = Transicion(
+    "cancelar_universidad", [Estado.Aprobada], Estado.Cancelada, "admin",
+    "Solo se pueden cancelar prácticas que ya están 'Aprobadas'."
+)
+FINALIZAR_UNIVERSIDAD = Transicion(
+    "finalizar_universidad", [Estado.Completada_por_Empresa], Estado.Completada_Final, "admin",
+    "La práctica debe ser marcada como 'Completada por Empresa' primero."
+)
+
+TRANSICIONES: Dict[str, Transicion] = {t.nombre: t for t in (
+    APROBAR_EMPRESA, RECHAZAR_EMPRESA, COMPLETAR_EMPRESA, CANCELAR_EMPRESA,
+    APROBAR_UNIVERSIDAD, RECHAZAR_UNIVERSIDAD, CANCELAR_UNIVERSIDAD, FINALIZAR_UNIVERSIDAD,
+)}
+
+
+# --- Ejecución ---
+
+class Cambio:
+    """Los datos de una postulación dentro de una transición (el comentario va al historial)."""
+
+    def __init__(
+        self,
+        id_postulacion: int,
+        comentarios: Optional[str] = None,
+        fecha_inicio_practica: Optional[datetime] = None,
+        fecha_fin_practica: Optional[datetime] = None,
+        version: Optional[int] = None # La versión que vio el cliente (If-Match); None: sin condición
+    ):
+        self.id_postulacion = id_postulacion
+        self.comentarios = comentarios
+        self.fecha_inicio_practica = fecha_inicio_practica
+        self.fecha_fin_practica = fecha_fin_practica
+        self.version = version
+
+
+def _condicion_permiso(rol: str, actor_id: int):
+    """La empresa solo puede mover postulaciones de sus propias vacantes."""
+    if rol == "empresa":
+        return models.Postulacion.id_vacante.in_(
+            select(models.Vacante.id_vacante).filter(models.Vacante.id_empresa == actor_id)
+        )
+    return None
+
+def sql_transicion(transicion: Transicion, actor_id: int, cambios: List[Cambio]):
+    """La transición completa (UPDATE + historial + vacantes) como una sola sentencia."""
+    tipo_fecha = DateTime(timezone=True)
+    datos = values(
+        column("id_postulacion", Integer),
+        column("comentarios", Text),
+        column("fecha_inicio_practica", tipo_fecha),
+        column("fecha_fin_practica", tipo_fecha),
+        column("version", Integer),
+        name="datos"
+    ).data([
+        (c.id_postulacion, c.comentarios, c.fecha_inicio_practica, c.fecha_fin_practica, c.version) for c in cambios
+    ])
+
+    nuevos_valores = {"estado_actual": transicion.destino, "version": models.Postulacion.version + 1}
+    if transicion.con_fechas:
+        # El CAST es necesario: en un VALUES con solo NULLs, Postgres asume 'text'
+        nuevos_valores["fecha_inicio_practica"] = cast(datos.c.fecha_inicio_practica, tipo_fecha)
+        nuevos_valores["fecha_fin_practica"] = cast(datos.c.fecha_fin_practica, tipo_fecha)
+    condiciones = [
+        models.Postulacion.id_postulacion == datos.c.id_postulacion,
+        models.Postulacion.estado_actual.in_(transicion.origenes),
+        or_(datos.c.version.is_(None), models.Postulacion.version == cast(datos.c.version, Integer)),
+    ]
+    permiso = _condicion_permiso(transicion.rol, actor_id)
+    if permiso is not None:
+        condiciones.append(permiso)
+
+    actualizadas = update(models.Postulacion)\
+        .where(*condiciones)\
+        .values(**nuevos_valores)\
+        .returning(models.Postulacion.id_postulacion, models.Postulacion.id_vacante,
+                   models.Postulacion.id_estudiante, datos.c.comentarios)\
+        .cte("actualizadas")
+
+    historial = models.HistorialEstadoPostulacion
+    registro_historial = insert(historial)\
+        .from_select(
+            ["id_postulacion", "estado", COLUMNA_ACTOR[transicion.rol], "comentarios"],
+            select(
+                actualizadas.c.id_postulacion,
+                literal(transicion.destino, historial.__table__.c.estado.type),
+                literal(actor_id, Integer),
+                cast(actualizadas.c.comentarios, Text),
+            )
+        )\
+        .cte("registro_historial")
+
+    stmt = select(actualizadas.c.id_postulacion, actualizadas.c.id_vacante, actualizadas.c.id_estudiante,
+                  models.Vacante.id_empresa)\
+        .join_from(actualizadas, models.Vacante, models.Vacante.id_vacante == actualizadas.c.id_vacante)\
+        .add_cte(registro_historial)
+    if transicion.cubre_vacante:
+        stmt = stmt.add_cte(
+            update(models.Vacante)
+            .where(models.Vacante.id_vacante.in_(select(actualizadas.c.id_vacante)))
+            .values(estado=models.EstadoVacanteEnum.Cubierta, version=models.Vacante.version + 1)
+            .cte("vacantes_cubiertas")
+        )
+    return stmt
+
+def _diagnosticar(db: Session, transicion: Transicion, actor_id: int, cambios: List[Cambio]) -> Dict[int, Tuple[int, str]]:
+    """Por qué no se aplicó la transición a cada postulación: (código HTTP, detalle). Solo corre si algo falló."""
+    filas = db.execute(
+        select(models.Postulacion.id_postulacion, models.Postulacion.estado_actual,
+               models.Postulacion.version, models.Vacante.id_empresa)
+        .join(models.Postulacion.vacante)
+        .filter(models.Postulacion.id_postulacion.in_([c.id_postulacion for c in cambios]))
+    ).all()
+    por_id = {f.id_postulacion: f for f in filas}
+
+    errores = {}
+    for cambio in cambios:
+        id_postulacion = cambio.id_postulacion
+        fila = por_id.get(id_postulacion)
+        if fila is None:
+            errores[id_postulacion] = (status.HTTP_404_NOT_FOUND, "Postulación no encontrada.")
+        elif transicion.rol == "empresa" and fila.id_empresa != actor_id:
+            errores[id_postulacion] = (status.HTTP_403_FORBIDDEN, "No tiene permisos sobre esta postulación.")
+        elif cambio.version is not None and fila.version != cambio.version:
+            errores[id_postulacion] = (
+                status.HTTP_412_PRECONDITION_FAILED,
+                f"La postulación cambió desde que se consultó (versión actual {fila.version}). Vuelva a cargarla."
+            )
+        else:
+            estado = Estado(fila.estado_actual).value
+            errores[id_postulacion] = (status.HTTP_400_BAD_REQUEST, transicion.mensaje_estado.format(estado=estado))
+    return errores
+
+def _evento(transicion: Transicion, fila) -> dict:
+    """Avisa al estudiante, a la empresa y (si le cambia la cola de revisión) a la universidad."""
+    para = [eventos.destinatario("estudiante", fila.id_estudiante), eventos.destinatario("empresa", fila.id_empresa)]
+    if transicion.afecta_stats_admin:
+        para.append(eventos.destinatario("admin"))
+    return eventos.evento(
+        eventos.CAMBIO_ESTADO, para,
+        id_postulacion=fila.id_postulacion, id_vacante=fila.id_vacante, estado=transicion.destino.value
+    )
+
+def ejecutar(db: Session, transicion: Transicion, actor, cambios: List[Cambio]):
+    """
+    Aplica la transición a las postulaciones de 'cambios' (un id repetido cuenta una vez) y hace commit.
+    Devuelve (filas aplicadas: id_postulacion, id_vacante, id_estudiante, id_empresa; errores por id: (código, detalle)).
+    """
+    if security.get_principal_role(actor) != transicion.rol:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permisos para realizar esta acción.")
+    actor_id = security.get_principal_id(actor)
+
+    unicos: Dict[int, Cambio] = {}
+    for cambio in cambios:
+        unicos.setdefault(cambio.id_postulacion, cambio)
+    if not unicos:
+        return [], {}
+
+    aplicadas = db.execute(sql_transicion(transicion, actor_id, list(unicos.values()))).all()
+    eventos.publicar(db, [_evento(transicion, fila) for fila in aplicadas])
+    db.commit()
+
+    aplicadas_ids = {f.id_postulacion for f in aplicadas}
+    fallidas = [c for id_, c in unicos.items() if id_ not in aplicadas_ids]
+    errores = _diagnosticar(db, transicion, actor_id, fallidas) if fallidas else {}
+
+    # Efectos fuera de la BD (cachés y recomendaciones), después del commit
+    if aplicadas:
+        if transicion.afecta_stats_admin:
+            invalidar_stats_admin()
+        if transicion.cubre_vacante:
+            invalidar_stats_estudiante() # Cambió el catálogo de vacantes abiertas
+            recomendaciones.motor.quitar_vacantes({f.id_vacante for f in aplicadas})
+        else:
+            for fila in aplicadas:
+                invalidar_stats_estudiante(fila.id_estudiante)
+    return aplicadas, errores
+
+def ejecutar_una(db: Session, transicion: Transicion, actor, cambio: Cambio) -> models.Postulacion:
+    """Aplica la transición a una sola postulación (o responde el error) y la retorna ya actualizada."""
+    _, errores = ejecutar(db, transicion, actor, [cambio])
+    if errores:
+        codigo, detalle = errores[cambio.id_postulacion]
+        raise HTTPException(status_code=codigo, detail=detalle)
+    return db.scalars(
+        select(models.Postulacion)
+        .options(*CARGA_POSTULACION)
+        .filter(models.Postulacion.id_postulacion == cambio.id_postulacion)
+    ).one()